@@ -0,0 +1,211 @@
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Mantém os microssegundos das datas (o DjangoJSONEncoder os trunca)."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(ValueError):
+    """Cursor de paginação malformado ou adulterado."""
+
+    pass
+
+
+def estimate_count(queryset):
+    """
+    Estimativa de linhas do planejador do PostgreSQL (EXPLAIN), sem
+    executar a consulta. Ordenação é descartada por não alterar a contagem.
+    """
+    queryset = queryset.order_by()
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CursorPaginator:
+    """
+    Paginação por cursor (keyset): cada página filtra a partir da última
+    linha da anterior em vez de usar OFFSET, então o custo não cresce com o
+    número da página.
+
+    A contagem total é exata quando o resultado é pequeno (até
+    `exact_count_threshold`); acima disso é exibida a estimativa.
+
+    `ordering` deve identificar cada linha de forma única (inclua "pk" como
+    desempate) e usar apenas campos não nulos. Ex: ["-created_at", "-pk"].
+    """
+
+    def __init__(self, queryset, per_page, ordering, exact_count_threshold=1000):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = list(ordering)
+        self.exact_count_threshold = exact_count_threshold
+
+    @cached_property
+    def _count_info(self):
+        # Contagem limitada: percorre no máximo threshold + 1 linhas e não
+        # depende das estatísticas do planejador (que podem estar defasadas)
+        bounded = self.queryset.order_by()[: self.exact_count_threshold + 1].count()
+        if bounded <= self.exact_count_threshold:
+            return bounded, False
+        return max(estimate_count(self.queryset), bounded), True
+
+    @property
+    def count(self):
+        return self._count_info[0]
+
+    @property
+    def count_is_estimate(self):
+        return self._count_info[1]
+
+    # Cursor
+    def _field(self, name):
+        opts = self.queryset.model._meta
+        return opts.pk if name == "pk" else opts.get_field(name)
+
+    def encode_cursor(self, obj, direction):
+        values = [getattr(obj, name.lstrip("-")) for name in self.ordering]
+        payload = json.dumps([direction, values], cls=CursorEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            direction, raw_values = json.loads(base64.urlsafe_b64decode(padded))
+            if direction not in ("next", "previous") or len(raw_values) != len(self.ordering):
+                raise InvalidCursor(cursor)
+            values = [
+                self._field(name.lstrip("-")).to_python(value)
+                for name, value in zip(self.ordering, raw_values)
+            ]
+        except InvalidCursor:
+            raise
+        except Exception as exc:
+            raise InvalidCursor(cursor) from exc
+        return direction, values
+
+    def _after(self, values, reverse=False):
+        """Filtro lexicográfico: linhas depois (ou antes) da posição do cursor."""
+        condition = Q()
+        equal_so_far = Q()
+        for name, value in zip(self.ordering, values):
+            field = name.lstrip("-")
+            descending = name.startswith("-") != reverse
+            lookup = "lt" if descending else "gt"
+            condition |= equal_so_far & Q(**{f"{field}__{lookup}": value})
+            equal_so_far &= Q(**{field: value})
+        return condition
+
+    def get_page(self, cursor=None):
+        """Retorna a página do cursor informado (ou a primeira, se inválido)."""
+        direction, values = "next", None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = "next", None
+
+        backwards = direction == "previous"
+        ordering = self.ordering
+        if backwards:
+            ordering = [name[1:] if name.startswith("-") else f"-{name}" for name in ordering]
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse=backwards))
+
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        if backwards and not has_more:
+            # Voltou até o início: exibe a primeira página completa
+            return self.get_page()
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+
+        return CursorPage(
+            rows,
+            paginator=self,
+            has_next=True if backwards else has_more,
+            has_previous=True if backwards else values is not None,
+        )
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    def __repr__(self):
+        return f"<CursorPage de {len(self)} itens>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], "next")
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], "previous")
+
+
+class CursorPaginationMixin:
+    """
+    Substitui a paginação por OFFSET das ListViews pela paginação por cursor.
+    Defina `cursor_ordering` na view; o cursor vem do parâmetro GET "cursor".
+    """
+
+    cursor_ordering = ["pk"]
+    cursor_param = "cursor"
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size, self.cursor_ordering)
+        page = paginator.get_page(self.request.GET.get(self.cursor_param))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Parâmetros atuais (busca/filtros) para montar os links de navegação
+        params = self.request.GET.copy()
+        params.pop(self.cursor_param, None)
+        context["pagination_query"] = params.urlencode()
+        return context
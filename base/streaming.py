@@ -0,0 +1,20 @@
+import csv
+
+
+class _Echo:
+    """Pseudo-buffer: o csv.writer devolve a linha formatada em vez de gravá-la."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows, delimiter=";"):
+    """
+    Gera um CSV linha a linha, para StreamingHttpResponse ou gravação em
+    arquivo: o cabeçalho `columns` (com BOM, para abrir direto no Excel)
+    seguido das linhas de `rows`, consumidas sob demanda.
+    """
+    writer = csv.writer(_Echo(), delimiter=delimiter)
+    yield "\ufeff" + writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
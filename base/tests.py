@@ -1,3 +1,127 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from base import versions
+from base.pagination import CursorPaginator
+from base.versions import SharedVersion
+from customer.models import Customer
+from sales.models import Sale
+from user.models import UserGesthar
+
+
+class CursorPaginatorTests(TestCase):
+    """Testes da paginação por cursor"""
+
+    def setUp(self):
+        self.user = UserGesthar.objects.create_user(
+            email="paginacao@exemplo.com", password="senha123"
+        )
+        now = timezone.now()
+        self.sales = []
+        for i in range(7):
+            sale = Sale.objects.create(user=self.user, net_amount=Decimal(i))
+            self.sales.append(sale)
+        # Datas iguais em pares para exercitar o desempate por pk
+        for i, sale in enumerate(self.sales):
+            Sale.objects.filter(pk=sale.pk).update(
+                created_at=now - timedelta(microseconds=(i // 2) * 7)
+            )
+
+    def _paginator(self, per_page=3):
+        return CursorPaginator(Sale.objects.all(), per_page, ["-created_at", "-pk"])
+
+    def test_percorre_todas_as_paginas_sem_repetir(self):
+        """Teste que avançar pelos cursores visita cada linha uma única vez"""
+        paginator = self._paginator()
+        expected = list(
+            Sale.objects.order_by("-created_at", "-pk").values_list("pk", flat=True)
+        )
+
+        seen = []
+        page = paginator.get_page()
+        while True:
+            seen += [sale.pk for sale in page]
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor)
+
+        self.assertEqual(seen, expected)
+
+    def test_cursor_anterior_volta_a_pagina(self):
+        """Teste que o cursor 'anterior' retorna exatamente a página anterior"""
+        paginator = self._paginator()
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+
+        back = paginator.get_page(third.previous_cursor)
+        self.assertEqual([s.pk for s in back], [s.pk for s in second])
+        self.assertTrue(back.has_next())
+
+    def test_cursor_invalido_retorna_primeira_pagina(self):
+        """Teste que um cursor adulterado não quebra a listagem"""
+        page = self._paginator().get_page("nao-e-um-cursor")
+        self.assertEqual(len(page), 3)
+        self.assertFalse(page.has_previous())
+
+    def test_contagem_exata_para_resultados_pequenos(self):
+        """Teste que resultados pequenos usam contagem exata"""
+        paginator = self._paginator()
+        self.assertEqual(paginator.count, 7)
+        self.assertFalse(paginator.count_is_estimate)
+
+    def test_contagem_estimada_para_resultados_grandes(self):
+        """Teste que acima do limite a contagem vem do planejador"""
+        paginator = CursorPaginator(
+            Customer.objects.all(), 10, ["name", "pk"], exact_count_threshold=-1
+        )
+        self.assertTrue(paginator.count_is_estimate)
+        self.assertGreaterEqual(paginator.count, 0)
+
+
+class SharedVersionTests(TestCase):
+    """Testes dos contadores de versão no cache compartilhado"""
+
+    def setUp(self):
+        cache.delete("teste:versao")
+        self.clock = 1000.0
+        patcher = mock.patch.object(versions, "time", mock.Mock(monotonic=lambda: self.clock))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_leitura_guardada_no_processo_ate_o_intervalo(self):
+        """Teste que a versão alterada por outro worker aparece só após o intervalo"""
+        version = SharedVersion("teste:versao", interval=5)
+        first = version.get()
+
+        # Outro worker incrementa a versão
+        cache.incr("teste:versao")
+        with mock.patch.object(versions.cache, "get") as cache_get:
+            self.assertEqual(version.get(), first)
+        cache_get.assert_not_called()
+
+        self.clock += 5
+        self.assertEqual(version.get(), first + 1)
+
+    def test_incremento_vale_na_hora_no_proprio_processo(self):
+        """Teste que o incremento local não espera o intervalo"""
+        version = SharedVersion("teste:versao", interval=5)
+        first = version.get()
+        self.assertEqual(version.increment(), first + 1)
+        self.assertEqual(version.get(), first + 1)
+        self.assertEqual(SharedVersion("teste:versao").get(), first + 1)
+
+    def test_versao_perdida_recomeca_sem_repetir(self):
+        """Teste que a versão não expira e, se sumir do cache, não volta a um valor antigo"""
+        version = SharedVersion("teste:versao", interval=0)
+        with mock.patch.object(versions.cache, "add", wraps=cache.add) as cache_add:
+            first = version.get()
+        self.assertIsNone(cache_add.call_args.kwargs["timeout"])
 
-# Create your tests here.
+        cache.delete("teste:versao")
+        self.assertNotIn(version.increment(), (first, first + 1))
@@ -0,0 +1,63 @@
+"""
+Contadores de versão no cache compartilhado (CACHES em core/settings.py).
+
+Servem para invalidar dados guardados na memória de cada processo (índices
+do catálogo, listas de referência): quem altera os dados incrementa a
+versão e os demais workers remontam os seus ao perceber a mudança.
+
+A leitura da versão fica guardada no processo por VERSION_CHECK_INTERVAL
+segundos, então o caminho quente (autocomplete a cada tecla, defaults de
+variações) não consulta o cache compartilhado a cada chamada. Alterações
+feitas no próprio processo valem na hora; as dos demais workers aparecem
+em até um intervalo.
+
+As versões não expiram e começam de um valor aleatório: se a chave sumir
+do cache (expulsa ou limpa), a versão recomeça sem repetir uma anterior.
+"""
+import random
+import time
+
+from django.core.cache import cache
+
+VERSION_CHECK_INTERVAL = 5
+
+
+def start_version(key):
+    """Cria a versão de `key` (se outro processo não criou antes) e a retorna."""
+    version = random.getrandbits(48)
+    cache.add(key, version, timeout=None)
+    return cache.get(key, version)
+
+
+def read_version(key):
+    version = cache.get(key)
+    return start_version(key) if version is None else version
+
+
+def increment_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return start_version(key)
+
+
+class SharedVersion:
+    def __init__(self, key, interval=VERSION_CHECK_INTERVAL):
+        self.key = key
+        self.interval = interval
+        # (versão, instante da leitura) numa única tupla: trocada de uma vez
+        self._read = None
+
+    def get(self):
+        read = self._read
+        now = time.monotonic()
+        if read is not None and now - read[1] < self.interval:
+            return read[0]
+        version = read_version(self.key)
+        self._read = (version, now)
+        return version
+
+    def increment(self):
+        version = increment_version(self.key)
+        self._read = (version, time.monotonic())
+        return version
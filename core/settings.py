@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "product",
     "customer",
     "accounts",
@@ -99,6 +100,31 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# Os índices em memória (autocomplete, facetas, grade de estoque, listas de
+# referência) são invalidados por contadores de versão neste cache, então ele
+# precisa ser compartilhado entre os workers: o padrão é a tabela no próprio
+# PostgreSQL (criada pela migração base.0001_cache_table). A versão lida fica
+# alguns segundos no processo (base.versions). Com Redis disponível, aponte
+# REDIS_URL para ele (requer o pacote `redis`).
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Customer, Address
+from .validators import only_digits
 
 
 class AddressInline(admin.TabularInline):
@@ -33,7 +34,6 @@ class CustomerAdmin(admin.ModelAdmin):
     
     search_fields = [
         'name',
-        'cpf_cnpj',
         'email',
         'phone'
     ]
@@ -62,6 +62,20 @@ class CustomerAdmin(admin.ModelAdmin):
     
     ordering = ['-created_at']
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Soma à busca padrão o prefixo do CPF/CNPJ sem máscara (usa o índice).
+        """
+        # Guarda o queryset recebido: já traz os filtros laterais (list_filter)
+        original = queryset
+        queryset, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        digits = only_digits(search_term)
+        if digits:
+            queryset |= original.filter(document_digits__startswith=digits)
+        return queryset, may_have_duplicates
+
 
 @admin.register(Address)
 class AddressAdmin(admin.ModelAdmin):
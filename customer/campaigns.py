@@ -0,0 +1,130 @@
+# customer/campaigns.py
+"""
+Listas de campanha pela data prevista do parto.
+
+Dois recortes, ambos viram um intervalo de datas sobre `baby_due_date`
+(varredura de faixa no índice customer_due_date_idx, já na ordem de saída):
+
+- Parto previsto entre duas datas (ex: gestantes do próximo mês).
+- Bebê com N meses hoje (a data prevista é usada como nascimento).
+
+O intervalo pode ser cruzado com o tamanho preferido e com as compras
+recentes (lidas de CustomerStats, sem agregar as vendas). A lista sai em
+CSV, gerado em fluxo.
+"""
+import calendar
+import re
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from base.streaming import stream_csv
+
+from .models import Customer
+
+CAMPAIGN_COLUMNS = [
+    "Nome",
+    "E-mail",
+    "Telefone",
+    "Data Prevista do Parto",
+    "Meses do Bebê",
+    "Preferências de Tamanho",
+    "Compras",
+    "Valor Total",
+    "Última Compra",
+]
+
+# Filtro pelas compras recentes
+PURCHASED = "com"
+NOT_PURCHASED = "sem"
+
+
+def add_months(day, months):
+    """Soma (ou subtrai) meses a uma data, limitando ao último dia do mês."""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def baby_age_window(months, today=None):
+    """
+    Intervalo de datas de nascimento de quem tem exatamente `months` meses
+    completos em `today`.
+    """
+    today = today or timezone.localdate()
+    return add_months(today, -(months + 1)) + timedelta(days=1), add_months(today, -months)
+
+
+def months_between(start, end):
+    """
+    Meses completos de `start` até `end` (negativo antes do nascimento),
+    com a mesma regra de baby_age_window.
+    """
+    months = (end.year - start.year) * 12 + end.month - start.month
+    if add_months(end, -months) < start:
+        months -= 1
+    return months
+
+
+def campaign_customers(start, end, size="", purchase="", days=90, now=None):
+    """
+    Clientes com parto previsto entre `start` e `end` (inclusive), na ordem
+    da data prevista.
+
+    Args:
+        size: Tamanho que deve constar em `size_preferences` (ex: "M").
+        purchase: PURCHASED / NOT_PURCHASED para manter só quem comprou (ou
+            não) nos últimos `days` dias; vazio ignora as compras.
+    """
+    queryset = Customer.objects.filter(baby_due_date__range=(start, end))
+    if size:
+        # Tamanho como palavra inteira: "G" não casa com "GG"
+        queryset = queryset.filter(size_preferences__iregex=rf"\m{re.escape(size)}\M")
+    if purchase:
+        since = (now or timezone.now()) - timedelta(days=days)
+        recent = Q(stats__last_purchase_at__gte=since)
+        queryset = queryset.filter(recent if purchase == PURCHASED else ~recent)
+    return queryset.order_by("baby_due_date", "pk")
+
+
+def iter_campaign_rows(queryset, today=None, chunk_size=2000):
+    """Gera as linhas da lista (na ordem de CAMPAIGN_COLUMNS) via cursor."""
+    today = today or timezone.localdate()
+    rows = queryset.values_list(
+        "name",
+        "email",
+        "phone",
+        "baby_due_date",
+        "size_preferences",
+        "stats__total_purchases",
+        "stats__total_spent",
+        "stats__last_purchase_at",
+    )
+    for (
+        name,
+        email,
+        phone,
+        due_date,
+        size_preferences,
+        purchases,
+        spent,
+        last_purchase,
+    ) in rows.iterator(chunk_size=chunk_size):
+        baby_months = months_between(due_date, today)
+        yield [
+            name,
+            email,
+            phone or "",
+            f"{due_date:%d/%m/%Y}",
+            baby_months if baby_months >= 0 else "",
+            size_preferences or "",
+            purchases or 0,
+            f"{spent or 0:.2f}",
+            f"{timezone.localtime(last_purchase):%d/%m/%Y}" if last_purchase else "",
+        ]
+
+
+def iter_campaign_csv(rows, delimiter=";"):
+    """Gera o CSV (com BOM, para abrir direto no Excel) linha a linha."""
+    return stream_csv(CAMPAIGN_COLUMNS, rows, delimiter)
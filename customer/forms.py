@@ -1,7 +1,9 @@
 from django import forms
 from django.forms import inlineformset_factory
 from datetime import date, timedelta
+from .campaigns import NOT_PURCHASED, PURCHASED, baby_age_window
 from .models import Customer, Address
+from .validators import only_digits
 
 
 class CustomerForm(forms.ModelForm):
@@ -78,12 +80,16 @@ class CustomerForm(forms.ModelForm):
     def clean_cpf_cnpj(self):
         """
         Remove caracteres não numéricos do CPF/CNPJ antes de validar.
+        A unicidade é conferida sem a máscara (cadastros antigos podem ter
+        o documento gravado com pontuação).
         """
-        import re
-
-        cpf_cnpj = self.cleaned_data.get("cpf_cnpj", "")
-        # Remove pontos, traços e barras
-        cpf_cnpj_limpo = re.sub(r"[^0-9]", "", cpf_cnpj)
+        cpf_cnpj_limpo = only_digits(self.cleaned_data.get("cpf_cnpj", ""))
+        duplicates = Customer.objects.filter(document_digits=cpf_cnpj_limpo)
+        if self.instance.pk:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if cpf_cnpj_limpo and duplicates.exists():
+            raise forms.ValidationError("Já existe um cliente com este CPF/CNPJ.")
+        self.instance.document_digits = cpf_cnpj_limpo
         return cpf_cnpj_limpo
 
     def clean_phone(self):
@@ -100,6 +106,109 @@ class CustomerForm(forms.ModelForm):
         return phone
 
 
+class CustomerImportForm(forms.Form):
+    """
+    Formulário para importação de clientes em lote (CSV).
+    """
+
+    file = forms.FileField(
+        label="Arquivo",
+        help_text="CSV (separado por vírgula ou ponto e vírgula), um cliente por linha.",
+        widget=forms.ClearableFileInput(attrs={"accept": ".csv"}),
+    )
+
+    def clean_file(self):
+        upload = self.cleaned_data["file"]
+        if not upload.name.lower().endswith(".csv"):
+            raise forms.ValidationError("Envie um arquivo .csv.")
+        return upload
+
+
+class CampaignForm(forms.Form):
+    """
+    Filtros da lista de campanha: parto previsto em um intervalo ou bebê com
+    N meses, cruzados com o tamanho preferido e as compras recentes.
+    """
+
+    DUE_DATE = "parto"
+    BABY_AGE = "idade"
+    MODE_CHOICES = [
+        (DUE_DATE, "Parto previsto entre"),
+        (BABY_AGE, "Bebê com (meses)"),
+    ]
+    PURCHASE_CHOICES = [
+        ("", "Todos"),
+        (PURCHASED, "Compraram no período"),
+        (NOT_PURCHASED, "Não compraram no período"),
+    ]
+
+    mode = forms.ChoiceField(
+        label="Recorte",
+        choices=MODE_CHOICES,
+        initial=DUE_DATE,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    start = forms.DateField(
+        label="De",
+        required=False,
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+    end = forms.DateField(
+        label="Até",
+        required=False,
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+    months = forms.IntegerField(
+        label="Meses do bebê",
+        required=False,
+        min_value=0,
+        max_value=60,
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+    )
+    size = forms.CharField(
+        label="Tamanho",
+        required=False,
+        max_length=10,
+        widget=forms.TextInput(attrs={"class": "form-control", "placeholder": "Ex: M"}),
+    )
+    purchase = forms.ChoiceField(
+        label="Compras",
+        required=False,
+        choices=PURCHASE_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    days = forms.IntegerField(
+        label="Período (dias)",
+        required=False,
+        initial=90,
+        min_value=1,
+        max_value=3650,
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("mode") == self.BABY_AGE:
+            if cleaned_data.get("months") is None:
+                self.add_error("months", "Informe a idade do bebê em meses.")
+        else:
+            start, end = cleaned_data.get("start"), cleaned_data.get("end")
+            if not start or not end:
+                raise forms.ValidationError("Informe o intervalo da data prevista do parto.")
+            if start > end:
+                raise forms.ValidationError("A data inicial deve ser anterior à final.")
+        cleaned_data["size"] = cleaned_data.get("size", "").strip()
+        if not cleaned_data.get("days"):
+            cleaned_data["days"] = 90
+        return cleaned_data
+
+    def date_window(self, today=None):
+        """Intervalo (início, fim) da data prevista do parto."""
+        if self.cleaned_data["mode"] == self.BABY_AGE:
+            return baby_age_window(self.cleaned_data["months"], today)
+        return self.cleaned_data["start"], self.cleaned_data["end"]
+
+
 # Siglas dos estados brasileiros em ordem alfabética
 ESTADOS_BRASILEIROS = [
     ("", "Selecione..."),
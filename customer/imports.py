@@ -0,0 +1,308 @@
+# customer/imports.py
+"""
+Importação de clientes em lote (CSV), para migração de outros sistemas.
+
+O arquivo é lido em fluxo e gravado em lotes:
+
+- Os CPFs/CNPJs do lote são validados de uma vez (validate_documents).
+- Telefone e e-mail são normalizados (só dígitos / minúsculas).
+- Os clientes já cadastrados com os mesmos documentos ou e-mails são
+  buscados com uma consulta por lote.
+- O lote é gravado com um upsert (bulk_create com update_conflicts) pelo
+  documento sem máscara. Colunas opcionais ausentes ou em branco mantêm o
+  valor já cadastrado.
+
+Linhas com erro são reportadas sem interromper o restante do arquivo; se a
+gravação do lote falhar, ele é regravado linha a linha.
+"""
+import csv
+import io
+import itertools
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Customer
+from .validators import only_digits, validate_documents
+
+CUSTOMER_COLUMNS = [
+    "nome",
+    "cpf_cnpj",
+    "email",
+    "telefone",
+    "data_nascimento",
+    "data_parto",
+    "preferencias_tamanho",
+    "observacoes",
+]
+
+REQUIRED_COLUMNS = {"nome", "cpf_cnpj", "email"}
+
+# Campos sobrescritos quando o cliente já existe (o documento é a chave)
+UPDATE_FIELDS = [
+    "name",
+    "email",
+    "phone",
+    "birth_date",
+    "baby_due_date",
+    "size_preferences",
+    "note",
+    "updated_at",
+]
+
+# Campos opcionais: em branco no arquivo, mantêm o valor do cliente existente
+KEPT_WHEN_BLANK = ["phone", "birth_date", "baby_due_date", "size_preferences", "note"]
+
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d")
+
+# Limite de erros guardados no resultado (os demais só entram na contagem)
+MAX_REPORTED_ERRORS = 1000
+
+
+class CustomerImportFormatError(ValueError):
+    """Arquivo sem as colunas obrigatórias."""
+
+    pass
+
+
+class CustomerRowError(ValueError):
+    """Linha do arquivo com dados inválidos."""
+
+    pass
+
+
+def iter_customer_file(file):
+    """
+    Percorre o CSV linha a linha, retornando (número da linha, dados).
+    `file` pode ser binário ou texto (UTF-8, com ou sem BOM).
+    """
+    if not isinstance(file, io.TextIOBase):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    first_line = file.readline()
+    if not first_line:
+        return
+    # Planilhas em pt-BR costumam exportar CSV separado por ";"
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    reader = csv.reader(itertools.chain([first_line], file), delimiter=delimiter)
+    header = [name.strip().lower() for name in next(reader)]
+    missing = REQUIRED_COLUMNS - set(header)
+    if missing:
+        raise CustomerImportFormatError(
+            f"Colunas obrigatórias ausentes: {', '.join(sorted(missing))}."
+        )
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        yield reader.line_num, dict(zip(header, values))
+
+
+# Normalização
+def normalize_phone(value):
+    """Só os dígitos, sem o código do país (55) quando presente."""
+    digits = only_digits(value)
+    if len(digits) in (12, 13) and digits.startswith("55"):
+        digits = digits[2:]
+    if digits and len(digits) not in (10, 11):
+        raise CustomerRowError(f"Telefone inválido: '{value.strip()}' (use DDD + número).")
+    return digits or None
+
+
+def normalize_email(value):
+    email = value.strip().lower()
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise CustomerRowError(f"E-mail inválido: '{value.strip()}'.")
+    return email
+
+
+def _parse_date(value, label):
+    text = value.strip()
+    if not text:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    raise CustomerRowError(f"{label} inválida: '{text}' (use dd/mm/aaaa).")
+
+
+def parse_customer_row(raw):
+    """
+    Normaliza uma linha do arquivo. Levanta CustomerRowError. O documento
+    volta só com os dígitos e é validado depois, junto com o lote.
+    """
+    name = raw.get("nome", "").strip()
+    if not name:
+        raise CustomerRowError("O nome é obrigatório.")
+    document = only_digits(raw.get("cpf_cnpj"))
+    if not document:
+        raise CustomerRowError("O CPF/CNPJ é obrigatório.")
+    birth_date = _parse_date(raw.get("data_nascimento", ""), "Data de nascimento")
+    if birth_date and birth_date > date.today():
+        raise CustomerRowError("A data de nascimento não pode estar no futuro.")
+
+    return {
+        "name": name,
+        "document": document,
+        "email": normalize_email(raw.get("email", "")),
+        "phone": normalize_phone(raw.get("telefone", "")),
+        "birth_date": birth_date,
+        "baby_due_date": _parse_date(raw.get("data_parto", ""), "Data prevista do parto"),
+        "size_preferences": raw.get("preferencias_tamanho", "").strip() or None,
+        "note": raw.get("observacoes", "").strip() or None,
+    }
+
+
+# Importação
+class CustomerImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def imported_rows(self):
+        return self.rows - self.error_count
+
+
+def import_customers(file, batch_size=1000):
+    """
+    Importa os clientes do CSV em lotes de `batch_size` linhas.
+    Retorna um CustomerImportResult.
+
+    Raises:
+        CustomerImportFormatError: Colunas obrigatórias ausentes.
+    """
+    result = CustomerImportResult()
+    batch = []
+
+    for line, raw in iter_customer_file(file):
+        result.rows += 1
+        try:
+            row = parse_customer_row(raw)
+        except CustomerRowError as e:
+            result.add_error(line, str(e))
+            continue
+        row["line"] = line
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _import_batch(batch, result)
+            batch = []
+
+    if batch:
+        _import_batch(batch, result)
+    # Erros de leitura e de gravação (por lote) na ordem das linhas
+    result.errors.sort()
+    return result
+
+
+def _import_batch(rows, result):
+    try:
+        with transaction.atomic():
+            created, updated, row_errors = _write_batch(rows)
+    except DatabaseError as e:
+        if len(rows) > 1:
+            # Regrava linha a linha para reportar só as linhas com problema
+            for row in rows:
+                _import_batch([row], result)
+        else:
+            result.add_error(rows[0]["line"], f"Linha não gravada: {e}")
+        return
+
+    for line, message in row_errors:
+        result.add_error(line, message)
+    result.created += created
+    result.updated += updated
+
+
+def _write_batch(rows):
+    errors = []
+
+    # Dígitos verificadores do lote inteiro de uma vez
+    valid_rows = []
+    for row, error in zip(rows, validate_documents([row["document"] for row in rows])):
+        if error:
+            errors.append((row["line"], error))
+        else:
+            valid_rows.append(row)
+
+    # Clientes já cadastrados com os documentos ou e-mails do lote: uma consulta.
+    # cpf_cnpj também é único: um cadastro sem o documento normalizado (ex:
+    # duplicado deixado sem dígitos na migração) bloquearia o lote inteiro.
+    documents = {row["document"] for row in valid_rows}
+    emails = {row["email"] for row in valid_rows}
+    existing, by_email, by_cpf_cnpj = {}, {}, {}
+    for values in Customer.objects.filter(
+        Q(document_digits__in=documents) | Q(email__in=emails) | Q(cpf_cnpj__in=documents)
+    ).values("pk", "document_digits", "cpf_cnpj", "email", *KEPT_WHEN_BLANK):
+        if values["document_digits"]:
+            existing[values["document_digits"]] = values
+        by_email[values["email"]] = values["pk"]
+        by_cpf_cnpj[values["cpf_cnpj"]] = values["pk"]
+
+    now = timezone.now()
+    seen_documents, seen_emails = set(), set()
+    customers = []
+    updated = 0
+    for row in valid_rows:
+        document, email = row["document"], row["email"]
+        if document in seen_documents:
+            errors.append((row["line"], "CPF/CNPJ repetido no arquivo."))
+            continue
+        if email in seen_emails:
+            errors.append((row["line"], "E-mail repetido no arquivo."))
+            continue
+        current = existing.get(document)
+        current_pk = current["pk"] if current else None
+        owner = by_email.get(email)
+        if owner is not None and owner != current_pk:
+            errors.append((row["line"], f"O e-mail {email} pertence a outro cliente."))
+            continue
+        owner = by_cpf_cnpj.get(document)
+        if owner is not None and owner != current_pk:
+            errors.append((row["line"], f"O CPF/CNPJ {document} já está em outro cadastro."))
+            continue
+        seen_documents.add(document)
+        seen_emails.add(email)
+        if current:
+            updated += 1
+            for field in KEPT_WHEN_BLANK:
+                if row[field] is None:
+                    row[field] = current[field]
+
+        customers.append(
+            Customer(
+                name=row["name"],
+                cpf_cnpj=document,
+                document_digits=document,
+                email=email,
+                phone=row["phone"],
+                birth_date=row["birth_date"],
+                baby_due_date=row["baby_due_date"],
+                size_preferences=row["size_preferences"],
+                note=row["note"],
+                created_at=now,
+                updated_at=now,
+            )
+        )
+
+    Customer.objects.bulk_create(
+        customers,
+        update_conflicts=True,
+        unique_fields=["document_digits"],
+        update_fields=UPDATE_FIELDS,
+    )
+    return len(customers) - updated, updated, sorted(errors)
@@ -0,0 +1,17 @@
+# customer/management/commands/compute_customer_segments.py
+from django.core.management.base import BaseCommand
+
+from customer.segments import compute_customer_segments
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula a segmentação RFM (recência, frequência e valor) de todos "
+        "os clientes com compras. Indicado para execução noturna (cron)."
+    )
+
+    def handle(self, *args, **options):
+        count = compute_customer_segments()
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {count} cliente(s) segmentado(s).")
+        )
@@ -0,0 +1,88 @@
+# customer/management/commands/export_campaign_list.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customer.campaigns import (
+    NOT_PURCHASED,
+    PURCHASED,
+    baby_age_window,
+    campaign_customers,
+    iter_campaign_csv,
+    iter_campaign_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera em CSV a lista de campanha pela data prevista do parto "
+        "(intervalo de datas ou idade do bebê em meses), opcionalmente "
+        "filtrada por tamanho e compras recentes. Indicado para a geração "
+        "semanal (cron)."
+    )
+
+    def add_arguments(self, parser):
+        window = parser.add_mutually_exclusive_group(required=True)
+        window.add_argument(
+            "--due-between",
+            nargs=2,
+            metavar=("INICIO", "FIM"),
+            type=date.fromisoformat,
+            help="Parto previsto entre as datas (aaaa-mm-dd)",
+        )
+        window.add_argument(
+            "--baby-months", type=int, help="Bebê com N meses completos hoje"
+        )
+        parser.add_argument("--size", default="", help="Tamanho preferido (ex: M)")
+        parser.add_argument(
+            "--purchase",
+            choices=[PURCHASED, NOT_PURCHASED],
+            default="",
+            help="Só quem comprou (com) ou não comprou (sem) nos últimos --days dias",
+        )
+        parser.add_argument(
+            "--days", type=int, default=90, help="Período das compras recentes (padrão: 90)"
+        )
+        parser.add_argument(
+            "--output", help="Arquivo .csv de saída (padrão: saída padrão)"
+        )
+
+    def handle(self, *args, **options):
+        if options["baby_months"] is not None:
+            if options["baby_months"] < 0:
+                raise CommandError("--baby-months deve ser maior ou igual a zero.")
+            start, end = baby_age_window(options["baby_months"])
+        else:
+            start, end = options["due_between"]
+            if start > end:
+                raise CommandError("A data inicial deve ser anterior à final.")
+
+        customers = campaign_customers(
+            start,
+            end,
+            size=options["size"].strip(),
+            purchase=options["purchase"],
+            days=options["days"],
+        )
+        chunks = iter_campaign_csv(iter_campaign_rows(customers))
+
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        count = -1  # cabeçalho
+        try:
+            with open(options["output"], "w", encoding="utf-8", newline="") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    count += 1
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {count} cliente(s) com parto previsto entre "
+                f"{start:%d/%m/%Y} e {end:%d/%m/%Y} exportado(s) para {options['output']}."
+            )
+        )
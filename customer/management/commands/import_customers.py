@@ -0,0 +1,42 @@
+# customer/management/commands/import_customers.py
+from django.core.management.base import BaseCommand, CommandError
+
+from customer.imports import CustomerImportFormatError, import_customers
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa clientes de um arquivo CSV (migração de outro sistema), "
+        "gravando em lotes. Clientes com o mesmo CPF/CNPJ são atualizados e "
+        "linhas com erro são reportadas sem interromper a importação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo .csv")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Linhas gravadas por lote (padrão: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], "rb") as file:
+                result = import_customers(file, batch_size=options["batch_size"])
+        except (OSError, CustomerImportFormatError) as e:
+            raise CommandError(str(e))
+
+        for line, message in result.errors:
+            self.stderr.write(f"Linha {line}: {message}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(
+                f"... e mais {result.error_count - len(result.errors)} erro(s)."
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {result.imported_rows} de {result.rows} linha(s) importada(s): "
+                f"{result.created} cliente(s) criado(s), {result.updated} atualizado(s)."
+            )
+        )
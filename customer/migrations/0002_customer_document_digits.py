@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-19 05:53
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_document_digits(apps, schema_editor):
+    """Grava o CPF/CNPJ sem máscara dos clientes existentes, em lotes."""
+    Customer = apps.get_model("customer", "Customer")
+    batch_size = 1000
+    last_pk = 0
+    seen = set()
+
+    while True:
+        rows = list(
+            Customer.objects.filter(pk__gt=last_pk)
+            .values_list("pk", "cpf_cnpj")
+            .order_by("pk")[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+
+        customers = []
+        for pk, cpf_cnpj in rows:
+            digits = re.sub(r"[^0-9]", "", cpf_cnpj or "")
+            # O mesmo documento gravado com e sem máscara: só o cadastro mais
+            # antigo recebe os dígitos (os demais ficam para revisão manual)
+            if not digits or len(digits) > 14 or digits in seen:
+                continue
+            seen.add(digits)
+            customers.append(Customer(pk=pk, document_digits=digits))
+        Customer.objects.bulk_update(customers, ["document_digits"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='document_digits',
+            field=models.CharField(blank=True, editable=False, max_length=14, null=True, unique=True, verbose_name='CPF/CNPJ (somente dígitos)'),
+        ),
+        migrations.RunPython(backfill_document_digits, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['document_digits'], name='customer_document_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-19 05:56
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+import django.db.models.deletion
+
+
+def backfill_customer_stats(apps, schema_editor):
+    """Gera o resumo de compras dos clientes a partir das vendas concluídas."""
+    Sale = apps.get_model("sales", "Sale")
+    CustomerStats = apps.get_model("customer", "CustomerStats")
+    rows = (
+        Sale.objects.filter(status="COMPLETED", is_active=True, customer__isnull=False)
+        .order_by()
+        .values("customer_id")
+        .annotate(
+            total_purchases=Count("pk"),
+            total_spent=Sum("net_amount"),
+            first_purchase_at=Min("completed_at"),
+            last_purchase_at=Max("completed_at"),
+        )
+    )
+    CustomerStats.objects.bulk_create(
+        (CustomerStats(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0002_customer_document_digits'),
+        ('sales', '0003_sale_open_draft_user_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='customer.customer', verbose_name='Cliente')),
+                ('total_purchases', models.PositiveIntegerField(default=0, verbose_name='Total de Compras')),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor Total Gasto')),
+                ('first_purchase_at', models.DateTimeField(blank=True, null=True, verbose_name='Primeira Compra')),
+                ('last_purchase_at', models.DateTimeField(blank=True, null=True, verbose_name='Última Compra')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Compras do Cliente',
+                'verbose_name_plural': 'Resumos de Compras dos Clientes',
+            },
+        ),
+        migrations.RunPython(backfill_customer_stats, migrations.RunPython.noop),
+    ]
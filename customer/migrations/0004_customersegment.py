@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-19 06:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0003_customerstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSegment',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='segment', serialize=False, to='customer.customer', verbose_name='Cliente')),
+                ('segment', models.CharField(choices=[('CAMPEOES', 'Campeões'), ('FIEIS', 'Fiéis'), ('PROMISSORES', 'Novos/Promissores'), ('ATENCAO', 'Precisam de Atenção'), ('EM_RISCO', 'Em Risco'), ('HIBERNANDO', 'Hibernando')], db_index=True, max_length=20, verbose_name='Segmento')),
+                ('recency_score', models.PositiveSmallIntegerField(verbose_name='Recência (1-5)')),
+                ('frequency_score', models.PositiveSmallIntegerField(verbose_name='Frequência (1-5)')),
+                ('monetary_score', models.PositiveSmallIntegerField(verbose_name='Valor (1-5)')),
+                ('computed_at', models.DateTimeField(verbose_name='Calculado em')),
+            ],
+            options={
+                'verbose_name': 'Segmento RFM do Cliente',
+                'verbose_name_plural': 'Segmentos RFM dos Clientes',
+            },
+        ),
+    ]
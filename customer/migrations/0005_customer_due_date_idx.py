@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-19 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0004_customersegment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(condition=models.Q(('baby_due_date__isnull', False)), fields=['baby_due_date'], name='customer_due_date_idx'),
+        ),
+    ]
@@ -1,5 +1,9 @@
+from decimal import Decimal
+
 from django.db import models
-from .validators import validate_cpf_cnpj
+from django.utils import timezone
+
+from .validators import only_digits, validate_cpf_cnpj
 
 
 class Customer(models.Model):
@@ -11,6 +15,15 @@ class Customer(models.Model):
         validators=[validate_cpf_cnpj],
         help_text="Informe CPF (11 dígitos) ou CNPJ (14 dígitos)"
     )
+    # CPF/CNPJ sem máscara: identificação no PDV por igualdade e busca por prefixo
+    document_digits = models.CharField(
+        max_length=14,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="CPF/CNPJ (somente dígitos)",
+    )
     birth_date = models.DateField(blank=True, null=True, verbose_name="Data de Nascimento")
     email = models.EmailField(unique=True, verbose_name="E-mail")
     phone = models.CharField(max_length=20, blank=True, null=True, verbose_name="Telefone/WhatsApp")
@@ -32,53 +45,195 @@ class Customer(models.Model):
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ["name"]
+        indexes = [
+            # Busca por prefixo (LIKE 'dígitos%') do typeahead de clientes
+            models.Index(
+                fields=["document_digits"],
+                name="customer_document_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            # Listas de campanha por faixa da data prevista do parto
+            models.Index(
+                fields=["baby_due_date"],
+                name="customer_due_date_idx",
+                condition=models.Q(baby_due_date__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
-    def get_purchase_history(self):
+    def save(self, *args, **kwargs):
+        self.document_digits = only_digits(self.cpf_cnpj) or None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "cpf_cnpj" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "document_digits"}
+        super().save(*args, **kwargs)
+
+    def completed_purchases(self):
+        """Vendas concluídas (e não canceladas) do cliente."""
+        from sales.models import Sale
+
+        return self.purchases.filter(status=Sale.Status.COMPLETED)
+
+    def get_purchase_history(self, limit=10):
         """
-        Retorna o histórico de compras do cliente.
-        TODO: Implementar quando o módulo de vendas/PDV estiver disponível.
+        Retorna as últimas compras do cliente (data, quantidade de itens e
+        valor), em uma consulta agrupada.
         """
-        # Placeholder: quando o modelo Sale existir, usar:
-        # return self.sales.all().order_by('-sale_date')
-        return []
+        return list(
+            self.completed_purchases()
+            .order_by("-completed_at", "-pk")
+            .annotate(items_count=models.Sum("items__quantity"))
+            .values(
+                "pk",
+                "items_count",
+                date=models.F("completed_at"),
+                total=models.F("net_amount"),
+            )[:limit]
+        )
+
+    def get_purchase_summary(self):
+        """Quantidade, valor total e datas da primeira e da última compra."""
+        return self.completed_purchases().aggregate(
+            total_purchases=models.Count("pk"),
+            total_spent=models.Sum("net_amount"),
+            first_purchase_at=models.Min("completed_at"),
+            last_purchase_at=models.Max("completed_at"),
+        )
 
     def get_total_spent(self):
         """
         Retorna o valor total gasto pelo cliente.
-        TODO: Implementar quando o módulo de vendas/PDV estiver disponível.
         """
-        # Placeholder: quando o modelo Sale existir, usar:
-        # from django.db.models import Sum
-        # return self.sales.aggregate(total=Sum('total_amount'))['total'] or 0
-        return 0
+        return self.get_purchase_summary()["total_spent"] or Decimal("0.00")
 
     def get_purchase_frequency(self):
         """
         Retorna a frequência de compras (número de compras por mês).
-        TODO: Implementar quando o módulo de vendas/PDV estiver disponível.
         """
-        # Placeholder: quando o modelo Sale existir, calcular:
-        # - Total de compras
-        # - Período desde primeira compra
-        # - Retornar média mensal
-        return {
-            'total_purchases': 0,
-            'months_active': 0,
-            'average_per_month': 0
-        }
+        summary = self.get_purchase_summary()
+        return purchase_frequency(summary["total_purchases"], summary["first_purchase_at"])
 
     def get_favorite_products(self, limit=5):
         """
-        Retorna os produtos mais comprados pelo cliente.
-        TODO: Implementar quando o módulo de vendas/PDV estiver disponível.
+        Retorna os produtos mais comprados pelo cliente (em quantas compras
+        cada um apareceu), em uma consulta agrupada.
         """
-        # Placeholder: quando o modelo SaleItem existir, usar:
-        # from django.db.models import Count, Sum
-        # return produtos mais frequentes nas vendas deste cliente
-        return []
+        from sales.models import Sale, SaleItem
+
+        return list(
+            SaleItem.objects.filter(
+                sale__customer=self,
+                sale__status=Sale.Status.COMPLETED,
+                sale__is_active=True,
+            )
+            .values("variation__product_id")
+            .annotate(
+                name=models.F("variation__product__name"),
+                purchase_count=models.Count("sale", distinct=True),
+                units=models.Sum("quantity"),
+            )
+            .order_by("-purchase_count", "-units", "name")[:limit]
+        )
+
+
+def purchase_frequency(total_purchases, first_purchase_at, now=None):
+    """
+    Compras por mês desde a primeira compra (o mês corrente conta como um).
+    """
+    if not total_purchases or first_purchase_at is None:
+        return {'total_purchases': 0, 'months_active': 0, 'average_per_month': 0}
+
+    now = now or timezone.now()
+    months_active = (
+        (now.year - first_purchase_at.year) * 12 + now.month - first_purchase_at.month + 1
+    )
+    return {
+        'total_purchases': total_purchases,
+        'months_active': months_active,
+        'average_per_month': total_purchases / months_active,
+    }
+
+
+class CustomerStats(models.Model):
+    """
+    Resumo das compras do cliente, mantido por customer.stats na conclusão e
+    no cancelamento das vendas. O detalhe do cliente lê esta linha em vez de
+    agregar o histórico a cada acesso.
+    """
+
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Cliente",
+    )
+    total_purchases = models.PositiveIntegerField(default=0, verbose_name="Total de Compras")
+    total_spent = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Valor Total Gasto"
+    )
+    first_purchase_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Primeira Compra"
+    )
+    last_purchase_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Última Compra"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Resumo de Compras do Cliente"
+        verbose_name_plural = "Resumos de Compras dos Clientes"
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.total_purchases} compra(s)"
+
+    @property
+    def purchase_frequency(self):
+        return purchase_frequency(self.total_purchases, self.first_purchase_at)
+
+
+class CustomerSegment(models.Model):
+    """
+    Segmento RFM (recência, frequência e valor) do cliente, recalculado
+    todas as noites por customer.segments. Só clientes com compras têm
+    segmento.
+    """
+
+    class Segment(models.TextChoices):
+        CAMPEOES = "CAMPEOES", "Campeões"
+        FIEIS = "FIEIS", "Fiéis"
+        PROMISSORES = "PROMISSORES", "Novos/Promissores"
+        ATENCAO = "ATENCAO", "Precisam de Atenção"
+        EM_RISCO = "EM_RISCO", "Em Risco"
+        HIBERNANDO = "HIBERNANDO", "Hibernando"
+
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="segment",
+        verbose_name="Cliente",
+    )
+    segment = models.CharField(
+        max_length=20, choices=Segment.choices, db_index=True, verbose_name="Segmento"
+    )
+    recency_score = models.PositiveSmallIntegerField(verbose_name="Recência (1-5)")
+    frequency_score = models.PositiveSmallIntegerField(verbose_name="Frequência (1-5)")
+    monetary_score = models.PositiveSmallIntegerField(verbose_name="Valor (1-5)")
+    computed_at = models.DateTimeField(verbose_name="Calculado em")
+
+    class Meta:
+        verbose_name = "Segmento RFM do Cliente"
+        verbose_name_plural = "Segmentos RFM dos Clientes"
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.get_segment_display()}"
+
+    @property
+    def rfm_code(self):
+        return f"{self.recency_score}{self.frequency_score}{self.monetary_score}"
 
 
 class Address(models.Model):
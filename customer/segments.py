@@ -0,0 +1,165 @@
+# customer/segments.py
+"""
+Segmentação RFM dos clientes (recência, frequência e valor).
+
+Uma única consulta sobre CustomerStats (já agregado por cliente a partir
+das vendas concluídas) traz, para cada cliente com compras, a posição
+relativa (CUME_DIST) da última compra, da quantidade de compras e do valor
+gasto. A nota de 1 a 5 é o quintil dessa posição; valores empatados ficam
+na mesma nota. O segmento sai das notas de recência e frequência.
+
+O recálculo completo é feito à noite pelo comando
+`compute_customer_segments`, gravando em lotes com upsert.
+"""
+from math import ceil
+
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import CumeDist
+from django.utils import timezone
+
+from base.streaming import stream_csv
+
+from .models import CustomerSegment, CustomerStats
+
+# Notas de 1 a RFM_SCORES (quintis)
+RFM_SCORES = 5
+
+SEGMENT_COLUMNS = [
+    "Nome",
+    "CPF/CNPJ",
+    "E-mail",
+    "Telefone",
+    "Segmento",
+    "RFM",
+    "Compras",
+    "Valor Total",
+    "Última Compra",
+]
+
+
+def score(cume_dist):
+    """Quintil de uma posição relativa em (0, 1]."""
+    # Arredonda antes do teto: 3/5 em ponto flutuante não pode virar nota 4
+    return min(RFM_SCORES, max(1, ceil(round(cume_dist * RFM_SCORES, 9))))
+
+
+def rfm_segment(recency, frequency):
+    """Segmento a partir das notas de recência e frequência."""
+    Segment = CustomerSegment.Segment
+    if recency >= 4 and frequency >= 4:
+        return Segment.CAMPEOES
+    if recency >= 3 and frequency >= 3:
+        return Segment.FIEIS
+    if recency >= 4:
+        return Segment.PROMISSORES
+    if frequency >= 3:
+        return Segment.EM_RISCO
+    if recency <= 2:
+        return Segment.HIBERNANDO
+    return Segment.ATENCAO
+
+
+@transaction.atomic
+def compute_customer_segments(batch_size=5000, now=None):
+    """
+    Recalcula o segmento de todos os clientes com compras e remove o dos
+    clientes que não têm mais compras (ex: cancelamentos).
+    Retorna a quantidade de clientes segmentados.
+    """
+    now = now or timezone.now()
+    rows = (
+        CustomerStats.objects.filter(total_purchases__gt=0)
+        .annotate(
+            recency=Window(CumeDist(), order_by=F("last_purchase_at").asc()),
+            frequency=Window(CumeDist(), order_by=F("total_purchases").asc()),
+            monetary=Window(CumeDist(), order_by=F("total_spent").asc()),
+        )
+        .order_by()
+        .values_list("customer_id", "recency", "frequency", "monetary")
+    )
+
+    segments = []
+    count = 0
+    for customer_id, recency, frequency, monetary in rows.iterator(chunk_size=batch_size):
+        recency, frequency = score(recency), score(frequency)
+        segments.append(
+            CustomerSegment(
+                customer_id=customer_id,
+                segment=rfm_segment(recency, frequency),
+                recency_score=recency,
+                frequency_score=frequency,
+                monetary_score=score(monetary),
+                computed_at=now,
+            )
+        )
+        if len(segments) >= batch_size:
+            count += _write(segments)
+            segments = []
+    count += _write(segments)
+
+    CustomerSegment.objects.filter(computed_at__lt=now).delete()
+    return count
+
+
+def _write(segments):
+    CustomerSegment.objects.bulk_create(
+        segments,
+        update_conflicts=True,
+        unique_fields=["customer"],
+        update_fields=[
+            "segment",
+            "recency_score",
+            "frequency_score",
+            "monetary_score",
+            "computed_at",
+        ],
+    )
+    return len(segments)
+
+
+def iter_segment_rows(queryset, chunk_size=2000):
+    """Gera as linhas da exportação (na ordem de SEGMENT_COLUMNS) via cursor."""
+    labels = dict(CustomerSegment.Segment.choices)
+    rows = queryset.values_list(
+        "name",
+        "cpf_cnpj",
+        "email",
+        "phone",
+        "segment__segment",
+        "segment__recency_score",
+        "segment__frequency_score",
+        "segment__monetary_score",
+        "stats__total_purchases",
+        "stats__total_spent",
+        "stats__last_purchase_at",
+    )
+    for (
+        name,
+        cpf_cnpj,
+        email,
+        phone,
+        segment,
+        recency,
+        frequency,
+        monetary,
+        purchases,
+        spent,
+        last_purchase,
+    ) in rows.iterator(chunk_size=chunk_size):
+        yield [
+            name,
+            cpf_cnpj,
+            email,
+            phone or "",
+            labels.get(segment, ""),
+            f"{recency}{frequency}{monetary}" if segment else "",
+            purchases or 0,
+            f"{spent or 0:.2f}",
+            f"{timezone.localtime(last_purchase):%d/%m/%Y}" if last_purchase else "",
+        ]
+
+
+def iter_segment_csv(rows, delimiter=";"):
+    """Gera o CSV (com BOM, para abrir direto no Excel) linha a linha."""
+    return stream_csv(SEGMENT_COLUMNS, rows, delimiter)
@@ -0,0 +1,89 @@
+# customer/stats.py
+"""
+Resumo de compras por cliente (CustomerStats).
+
+A conclusão de uma venda soma a compra ao resumo com um único UPDATE
+(quantidade, valor e data da última compra). O cancelamento não tem como
+desfazer as datas de forma incremental, então recalcula o resumo daquele
+cliente a partir das vendas: uma agregação pelo índice de cliente.
+"""
+from django.db.models import Count, DateTimeField, F, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from .models import CustomerStats
+
+
+def _completed_sales():
+    from sales.models import Sale
+
+    return Sale.objects.filter(status=Sale.Status.COMPLETED)
+
+
+def refresh_customer_stats(customer_ids):
+    """
+    Recalcula os resumos dos clientes informados em uma consulta agrupada.
+    Clientes sem compras ficam com o resumo zerado.
+    """
+    customer_ids = set(customer_ids)
+    if not customer_ids:
+        return
+    rows = {
+        row["customer_id"]: row
+        for row in _completed_sales()
+        .filter(customer_id__in=customer_ids)
+        .order_by()
+        .values("customer_id")
+        .annotate(
+            total_purchases=Count("pk"),
+            total_spent=Sum("net_amount"),
+            first_purchase_at=Min("completed_at"),
+            last_purchase_at=Max("completed_at"),
+        )
+    }
+    stats = []
+    for customer_id in customer_ids:
+        row = rows.get(customer_id, {})
+        stats.append(
+            CustomerStats(
+                customer_id=customer_id,
+                total_purchases=row.get("total_purchases", 0),
+                total_spent=row.get("total_spent") or 0,
+                first_purchase_at=row.get("first_purchase_at"),
+                last_purchase_at=row.get("last_purchase_at"),
+            )
+        )
+    CustomerStats.objects.bulk_create(
+        stats,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["customer"],
+        update_fields=[
+            "total_purchases",
+            "total_spent",
+            "first_purchase_at",
+            "last_purchase_at",
+            "updated_at",
+        ],
+    )
+
+
+def record_purchase(sale):
+    """Soma a venda concluída ao resumo do cliente."""
+    if not sale.customer_id:
+        return
+    completed_at = Value(sale.completed_at, output_field=DateTimeField())
+    updated = CustomerStats.objects.filter(customer_id=sale.customer_id).update(
+        total_purchases=F("total_purchases") + 1,
+        total_spent=F("total_spent") + sale.net_amount,
+        first_purchase_at=Least(Coalesce("first_purchase_at", completed_at), completed_at),
+        last_purchase_at=Greatest(Coalesce("last_purchase_at", completed_at), completed_at),
+    )
+    if not updated:
+        # Primeira compra registrada (ou resumo ainda não criado)
+        refresh_customer_stats([sale.customer_id])
+
+
+def record_cancellation(sale):
+    """Tira a venda cancelada do resumo do cliente."""
+    if sale.customer_id:
+        refresh_customer_stats([sale.customer_id])
@@ -1,3 +1,543 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from customer.campaigns import (
+    NOT_PURCHASED,
+    PURCHASED,
+    baby_age_window,
+    campaign_customers,
+    months_between,
+)
+from customer.forms import CustomerForm
+from customer.imports import import_customers
+from customer.models import Customer, CustomerSegment, CustomerStats
+from customer.segments import compute_customer_segments, rfm_segment
+from customer.stats import refresh_customer_stats
+from customer.validators import validate_cpf_cnpj, validate_documents
+from product.models import Category, Product, ProductVariation
+from sales.forms import IdentifyCustomerForm
+from sales.models import CashRegister, Sale, SaleItem, SalePayment
+from stock.services import add_stock
+from user.models import UserGesthar
+
+
+class CustomerDocumentTests(TestCase):
+    """Testes do CPF/CNPJ sem máscara (identificação e busca por prefixo)"""
+
+    def setUp(self):
+        self.user = UserGesthar.objects.create_user(
+            email="caixa@exemplo.com", password="senha123"
+        )
+        self.maria = Customer.objects.create(
+            name="Maria Silva", cpf_cnpj="529.982.247-25", email="maria@exemplo.com"
+        )
+        self.ana = Customer.objects.create(
+            name="Ana Souza", cpf_cnpj="52998224700", email="ana@exemplo.com"
+        )
+
+    def test_documento_gravado_sem_mascara(self):
+        """Teste que o save e o formulário gravam só os dígitos"""
+        self.assertEqual(self.maria.document_digits, "52998224725")
+
+        self.maria.cpf_cnpj = "11.222.333/0001-81"
+        self.maria.save(update_fields=["cpf_cnpj"])
+        self.maria.refresh_from_db()
+        self.assertEqual(self.maria.document_digits, "11222333000181")
+
+        form = CustomerForm(
+            data={"name": "Joana", "cpf_cnpj": "11.222.333/0001-81", "email": "joana@exemplo.com"}
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("cpf_cnpj", form.errors)
+
+    def test_identificacao_no_pdv_por_igualdade(self):
+        """Teste que a identificação não casa documentos parciais"""
+        with self.assertNumQueries(1):
+            form = IdentifyCustomerForm(data={"cpf_cnpj": "529.982.247-25"})
+            self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data["cpf_cnpj"], self.maria)
+
+        # Um trecho do documento não identifica ninguém (antes casava com icontains)
+        form = IdentifyCustomerForm(data={"cpf_cnpj": "5299822"})
+        self.assertFalse(form.is_valid())
+        form = IdentifyCustomerForm(data={"cpf_cnpj": "11144477735"})
+        self.assertFalse(form.is_valid())
+
+    def test_busca_por_prefixo_na_api_e_na_lista(self):
+        """Teste o typeahead e a busca da lista pelo prefixo do documento"""
+        self.client.force_login(self.user)
+        url = reverse("customer:api-search-customers")
+
+        response = self.client.get(url, {"term": "529.982"})
+        self.assertEqual(
+            [item["label"] for item in response.json()], ["Ana Souza", "Maria Silva"]
+        )
+        response = self.client.get(url, {"term": "5299822472"})
+        self.assertEqual(response.json(), [
+            {"value": "52998224725", "label": "Maria Silva", "document": "529.982.247-25"}
+        ])
+        # Menos de 3 dígitos: sem busca
+        self.assertEqual(self.client.get(url, {"term": "52"}).json(), [])
+
+        response = self.client.get(reverse("customer:customer_list"), {"search": "529.982.247"})
+        self.assertEqual(
+            [customer.name for customer in response.context["customers"]],
+            ["Ana Souza", "Maria Silva"],
+        )
+
+    def test_busca_do_admin_respeita_os_filtros_laterais(self):
+        """Teste que o prefixo do documento no admin não ignora o list_filter"""
+        Customer.objects.filter(pk=self.ana.pk).update(baby_due_date=date(2030, 1, 10))
+        admin_user = UserGesthar.objects.create_superuser(
+            email="admin@exemplo.com", password="senha123"
+        )
+        self.client.force_login(admin_user)
+
+        response = self.client.get(
+            reverse("admin:customer_customer_changelist"),
+            {"q": "529.982", "baby_due_date__gte": "2030-01-01"},
+        )
+        self.assertEqual(
+            [customer.name for customer in response.context["cl"].result_list], ["Ana Souza"]
+        )
+
+
+class CustomerStatsTests(TestCase):
+    """Testes do resumo de compras do cliente"""
+
+    def setUp(self):
+        self.user = UserGesthar.objects.create_user(
+            email="caixa@exemplo.com", password="senha123"
+        )
+        self.customer = Customer.objects.create(
+            name="Maria Silva", cpf_cnpj="52998224725", email="maria@exemplo.com"
+        )
+        category = Category.objects.create(name="Lingerie")
+        self.bra = ProductVariation.objects.create(
+            product=Product.objects.create(
+                name="Sutiã Amamentação", category=category, selling_price=Decimal("90.00")
+            )
+        )
+        self.panty = ProductVariation.objects.create(
+            product=Product.objects.create(
+                name="Calcinha Pós-Parto", category=category, selling_price=Decimal("40.00")
+            )
+        )
+        for variation in (self.bra, self.panty):
+            add_stock(variation.pk, 20, self.user, Decimal("20.00"))
+        self.register = CashRegister.objects.create(
+            user=self.user, opening_balance=Decimal("0.00")
+        )
+
+    def _sell(self, *lines):
+        sale = Sale.objects.create(
+            user=self.user, cash_register_session=self.register, customer=self.customer
+        )
+        for variation, quantity in lines:
+            SaleItem.objects.create(sale=sale, variation=variation, quantity=quantity)
+        sale.calculate_totals()
+        SalePayment.objects.create(sale=sale, amount=sale.net_amount)
+        sale.complete_sale()
+        return sale
+
+    def _stats(self):
+        stats = CustomerStats.objects.get(customer=self.customer)
+        return stats.total_purchases, stats.total_spent
+
+    def test_resumo_incremental_na_conclusao_e_no_cancelamento(self):
+        """Teste que o resumo acompanha as vendas concluídas e canceladas"""
+        first = self._sell((self.bra, 1), (self.panty, 2))
+        last = self._sell((self.panty, 1))
+        self.assertEqual(self._stats(), (2, Decimal("210.00")))
+        stats = self.customer.stats
+        self.assertEqual(stats.first_purchase_at, first.completed_at)
+        self.assertEqual(stats.last_purchase_at, last.completed_at)
+
+        Sale.objects.get(pk=last.pk).cancel_sale()
+        self.assertEqual(self._stats(), (1, Decimal("170.00")))
+        self.customer.stats.refresh_from_db()
+        self.assertEqual(self.customer.stats.last_purchase_at, first.completed_at)
+
+        # O recálculo a partir das vendas coincide com o incremental
+        CustomerStats.objects.all().delete()
+        refresh_customer_stats([self.customer.pk])
+        self.assertEqual(self._stats(), (1, Decimal("170.00")))
+
+    def test_agregacoes_do_cliente(self):
+        """Teste histórico, total, frequência e favoritos a partir das vendas"""
+        sale = self._sell((self.bra, 1), (self.panty, 2))
+        self._sell((self.panty, 1))
+        Sale.objects.filter(pk=sale.pk).update(completed_at=timezone.now() - timedelta(days=62))
+
+        with self.assertNumQueries(1):
+            favorites = self.customer.get_favorite_products()
+        self.assertEqual(
+            [(product["name"], product["purchase_count"]) for product in favorites],
+            [("Calcinha Pós-Parto", 2), ("Sutiã Amamentação", 1)],
+        )
+        history = self.customer.get_purchase_history()
+        self.assertEqual(
+            [(row["items_count"], row["total"]) for row in history],
+            [(1, Decimal("40.00")), (3, Decimal("170.00"))],
+        )
+        self.assertEqual(self.customer.get_total_spent(), Decimal("210.00"))
+        frequency = self.customer.get_purchase_frequency()
+        self.assertEqual(frequency["total_purchases"], 2)
+        self.assertIn(frequency["months_active"], (3, 4))
+
+    def test_detalhe_le_o_resumo(self):
+        """Teste que o detalhe do cliente usa o resumo gravado"""
+        self._sell((self.bra, 2))
+        self.client.force_login(self.user)
+        # Resumo divergente de propósito: a view não agrega as vendas
+        CustomerStats.objects.filter(customer=self.customer).update(total_spent=Decimal("999.00"))
+
+        response = self.client.get(reverse("customer:customer_detail", args=[self.customer.pk]))
+        self.assertEqual(response.context["total_spent"], Decimal("999.00"))
+        self.assertEqual(response.context["purchase_frequency"]["total_purchases"], 1)
+        # A linha do tempo é carregada à parte
+        self.assertContains(response, reverse("customer:customer_purchases", args=[self.customer.pk]))
+
+    def test_linha_do_tempo_paginada_por_cursor(self):
+        """Teste a paginação da linha do tempo com número constante de consultas"""
+        sales = [self._sell((self.bra, 1), (self.panty, 1)) for _ in range(12)]
+        self._sell((self.panty, 1)).cancel_sale()
+        self.client.force_login(self.user)
+        url = reverse("customer:customer_purchases", args=[self.customer.pk])
+        self.client.get(url)  # Sessão e usuário já em cache
+
+        with self.assertNumQueries(4):
+            # Sessão, usuário, vendas da página e itens (prefetch)
+            response = self.client.get(url)
+        page = response.context["page"]
+        self.assertEqual([sale.pk for sale in page], [sale.pk for sale in sales[::-1][:10]])
+        self.assertContains(response, "Sutiã Amamentação", count=10)
+        self.assertTrue(page.has_next())
+
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {"cursor": page.next_cursor})
+        page = response.context["page"]
+        self.assertEqual([sale.pk for sale in page], [sales[1].pk, sales[0].pk])
+        self.assertFalse(page.has_next())
+        self.assertNotContains(response, "Carregar mais")
+
+
+class CustomerImportTests(TestCase):
+    """Testes da importação de clientes em lote (CSV)"""
+
+    HEADER = "nome;cpf_cnpj;email;telefone;data_nascimento;data_parto\n"
+
+    def setUp(self):
+        self.maria = Customer.objects.create(
+            name="Maria Silva",
+            cpf_cnpj="529.982.247-25",
+            email="maria@exemplo.com",
+            phone="11999990000",
+        )
+
+    def _import(self, body, **kwargs):
+        return import_customers(BytesIO((self.HEADER + body).encode("utf-8-sig")), **kwargs)
+
+    def test_validacao_em_lote_igual_a_individual(self):
+        """Teste que a validação em lote segue as mesmas regras da individual"""
+        documents = ["52998224725", "11222333000181", "11111111111", "52998224726", "123", "11222333000180"]
+        expected = []
+        for document in documents:
+            try:
+                validate_cpf_cnpj(document)
+                expected.append(None)
+            except ValidationError as e:
+                expected.append(e.messages[0])
+        self.assertEqual(validate_documents(documents), expected)
+
+    def test_upsert_normalizacao_e_erros_por_linha(self):
+        """Teste a criação, a atualização pelo documento e os erros de cada linha"""
+        result = self._import(
+            "Maria S. Oliveira;52998224725;MARIA@exemplo.com;+55 (11) 98888-7777;;\n"
+            "Ana Souza;11.222.333/0001-81; ana@exemplo.com ;(21) 3333-4444;05/03/1990;2026-12-01\n"
+            "Joana;12345678900;joana@exemplo.com;;;\n"
+            "Ana Repetida;11222333000181;ana2@exemplo.com;;;\n"
+            "Bia;39053344705;maria@exemplo.com;;;\n"
+            "Carla;39053344705;carla@;;;\n",
+            batch_size=4,
+        )
+
+        self.assertEqual((result.rows, result.created, result.updated), (6, 1, 1))
+        self.assertEqual(
+            [line for line, _message in result.errors], [4, 5, 6, 7]
+        )
+        messages = dict(result.errors)
+        self.assertEqual(messages[4], "CPF inválido.")
+        self.assertEqual(messages[5], "CPF/CNPJ repetido no arquivo.")
+        self.assertIn("pertence a outro cliente", messages[6])
+        self.assertIn("E-mail inválido", messages[7])
+
+        self.maria.refresh_from_db()
+        self.assertEqual(self.maria.name, "Maria S. Oliveira")
+        self.assertEqual(self.maria.phone, "11988887777")
+        # O documento original (com máscara) é mantido
+        self.assertEqual(self.maria.cpf_cnpj, "529.982.247-25")
+
+        ana = Customer.objects.get(document_digits="11222333000181")
+        self.assertEqual((ana.email, ana.phone), ("ana@exemplo.com", "2133334444"))
+        self.assertEqual(str(ana.birth_date), "1990-03-05")
+
+    def test_reimportacao_sem_colunas_opcionais_mantem_os_dados(self):
+        """Teste que colunas opcionais ausentes ou em branco não apagam o cadastro"""
+        Customer.objects.filter(pk=self.maria.pk).update(
+            baby_due_date=date(2026, 12, 1), size_preferences="M", note="Prefere WhatsApp"
+        )
+
+        result = import_customers(
+            BytesIO(b"nome;cpf_cnpj;email\nMaria S. Oliveira;52998224725;maria@exemplo.com\n")
+        )
+        self.assertEqual((result.updated, result.error_count), (1, 0))
+        result = self._import("Maria Silva;52998224725;maria@exemplo.com;;;\n")
+        self.assertEqual((result.updated, result.error_count), (1, 0))
+
+        self.maria.refresh_from_db()
+        self.assertEqual(self.maria.name, "Maria Silva")
+        self.assertEqual(
+            (self.maria.phone, self.maria.baby_due_date, self.maria.size_preferences, self.maria.note),
+            ("11999990000", date(2026, 12, 1), "M", "Prefere WhatsApp"),
+        )
+
+    def test_conflito_em_uma_linha_nao_descarta_o_lote(self):
+        """Teste que só a linha com conflito (ou falha ao gravar) é reportada"""
+        # Duplicado sem o documento normalizado (como a migração 0002 deixa)
+        duplicate = Customer.objects.create(
+            name="Ana Antiga", cpf_cnpj="39053344705", email="ana.antiga@exemplo.com"
+        )
+        Customer.objects.filter(pk=duplicate.pk).update(document_digits=None)
+
+        result = self._import(
+            "Ana Souza;39053344705;ana@exemplo.com;;;\n"
+            f"{'Nome muito longo ' * 20};11222333000181;empresa@exemplo.com;;;\n"
+            "Bia Lima;11144477735;bia@exemplo.com;;;\n"
+        )
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line for line, _message in result.errors], [2, 3])
+        messages = dict(result.errors)
+        self.assertIn("já está em outro cadastro", messages[2])
+        self.assertIn("Linha não gravada", messages[3])
+        self.assertTrue(Customer.objects.filter(email="bia@exemplo.com").exists())
+
+    def test_view_de_importacao(self):
+        """Teste o envio do arquivo pela tela e o aviso de colunas ausentes"""
+        user = UserGesthar.objects.create_user(email="caixa@exemplo.com", password="senha123")
+        self.client.force_login(user)
+        url = reverse("customer:customer-import")
+
+        upload = SimpleUploadedFile(
+            "clientes.csv", (self.HEADER + "Ana;39053344705;ana@exemplo.com;;;\n").encode()
+        )
+        response = self.client.post(url, {"file": upload})
+        self.assertEqual(response.context["result"].created, 1)
+
+        upload = SimpleUploadedFile("clientes.csv", b"nome;email\nAna;ana@exemplo.com\n")
+        response = self.client.post(url, {"file": upload})
+        self.assertIsNone(response.context["result"])
+        self.assertContains(response, "Colunas obrigatórias ausentes: cpf_cnpj.")
+
+
+class CustomerSegmentTests(TestCase):
+    """Testes da segmentação RFM"""
+
+    def setUp(self):
+        now = timezone.now()
+        self.customers = {}
+        # nome: (dias desde a última compra, compras, valor gasto)
+        for name, document, days, purchases, spent in (
+            ("Ana", "52998224725", 1, 10, "1000.00"),
+            ("Bia", "39053344705", 5, 6, "500.00"),
+            ("Carla", "11144477735", 30, 3, "300.00"),
+            ("Dora", "12345678909", 200, 8, "800.00"),
+            ("Eva", "98765432100", 400, 1, "50.00"),
+            ("Fabi", "11222333000181", 10, 0, "0.00"),
+        ):
+            customer = Customer.objects.create(
+                name=name, cpf_cnpj=document, email=f"{name.lower()}@exemplo.com"
+            )
+            CustomerStats.objects.create(
+                customer=customer,
+                total_purchases=purchases,
+                total_spent=Decimal(spent),
+                first_purchase_at=now - timedelta(days=days + 30) if purchases else None,
+                last_purchase_at=now - timedelta(days=days) if purchases else None,
+            )
+            self.customers[name] = customer
+
+    def _segments(self):
+        return {
+            segment.customer.name: (segment.segment, segment.rfm_code)
+            for segment in CustomerSegment.objects.select_related("customer")
+        }
+
+    def test_notas_e_segmentos(self):
+        """Teste as notas por quintil e os segmentos, removendo os sem compras"""
+        # Segmento antigo de quem não tem mais compras (ex: venda cancelada)
+        CustomerSegment.objects.create(
+            customer=self.customers["Fabi"],
+            segment=CustomerSegment.Segment.FIEIS,
+            recency_score=3,
+            frequency_score=3,
+            monetary_score=3,
+            computed_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.assertEqual(compute_customer_segments(batch_size=2), 5)
+
+        Segment = CustomerSegment.Segment
+        self.assertEqual(
+            self._segments(),
+            {
+                "Ana": (Segment.CAMPEOES, "555"),
+                "Bia": (Segment.FIEIS, "433"),
+                "Carla": (Segment.ATENCAO, "322"),
+                "Dora": (Segment.EM_RISCO, "244"),
+                "Eva": (Segment.HIBERNANDO, "111"),
+            },
+        )
+        self.assertEqual(rfm_segment(5, 1), Segment.PROMISSORES)
+
+        # Recalcular não duplica nem muda nada
+        compute_customer_segments()
+        self.assertEqual(CustomerSegment.objects.count(), 5)
+
+    def test_filtro_na_lista_e_exportacao(self):
+        """Teste o filtro por segmento na lista e a exportação em CSV"""
+        compute_customer_segments()
+        user = UserGesthar.objects.create_user(email="caixa@exemplo.com", password="senha123")
+        self.client.force_login(user)
+
+        response = self.client.get(reverse("customer:customer_list"), {"segment": "EM_RISCO"})
+        self.assertEqual([c.name for c in response.context["customers"]], ["Dora"])
+        self.assertContains(response, "Em Risco")
+
+        response = self.client.get(reverse("customer:customer-export"), {"segment": "CAMPEOES"})
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="clientes-campeoes-', response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("Nome;CPF/CNPJ;"))
+        self.assertTrue(lines[1].startswith("Ana;52998224725;ana@exemplo.com;;Campeões;555;10;1000.00;"))
+
+        # Sem filtro, exporta todos (inclusive os sem segmento)
+        response = self.client.get(reverse("customer:customer-export"))
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 7)
+
+        # Segmento desconhecido não filtra nem entra no nome do arquivo
+        response = self.client.get(
+            reverse("customer:customer-export"), {"segment": 'x"\r\nSet-Cookie: a=1'}
+        )
+        self.assertIn('filename="clientes-todos-', response["Content-Disposition"])
+        self.assertNotIn("Set-Cookie", response["Content-Disposition"])
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 7)
+
+
+class CustomerCampaignTests(TestCase):
+    """Testes das listas de campanha pela data prevista do parto"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.customers = {}
+        # nome: (dias até o parto, tamanhos, dias desde a última compra)
+        for name, document, days, sizes, purchased in (
+            ("Ana", "52998224725", 10, "P, M", 5),
+            ("Bia", "39053344705", 20, "GG", None),
+            ("Carla", "11144477735", 25, "M", 200),
+            ("Dora", "12345678909", 90, "M", None),
+            ("Eva", "98765432100", None, "M", None),
+        ):
+            customer = Customer.objects.create(
+                name=name,
+                cpf_cnpj=document,
+                email=f"{name.lower()}@exemplo.com",
+                baby_due_date=self.today + timedelta(days=days) if days is not None else None,
+                size_preferences=sizes,
+            )
+            if purchased is not None:
+                CustomerStats.objects.create(
+                    customer=customer,
+                    total_purchases=2,
+                    total_spent=Decimal("150.00"),
+                    first_purchase_at=timezone.now() - timedelta(days=purchased + 10),
+                    last_purchase_at=timezone.now() - timedelta(days=purchased),
+                )
+            self.customers[name] = customer
+
+    def _names(self, queryset):
+        return list(queryset.values_list("name", flat=True))
+
+    def test_idade_do_bebe_igual_a_janela(self):
+        """Teste que a janela de N meses e a idade calculada seguem a mesma regra"""
+        today = date(2026, 3, 31)
+        self.assertEqual(baby_age_window(1, today), (date(2026, 2, 1), date(2026, 2, 28)))
+        self.assertEqual(baby_age_window(0, today), (date(2026, 3, 1), date(2026, 3, 31)))
+        for offset in range(800):
+            birth = today - timedelta(days=offset)
+            start, end = baby_age_window(months_between(birth, today), today)
+            self.assertTrue(start <= birth <= end, birth)
+        self.assertEqual(months_between(date(2026, 4, 1), today), -1)
+
+    def test_filtros_de_tamanho_e_compras(self):
+        """Teste a janela de datas cruzada com o tamanho e as compras recentes"""
+        start, end = self.today, self.today + timedelta(days=30)
+        self.assertEqual(
+            self._names(campaign_customers(start, end)), ["Ana", "Bia", "Carla"]
+        )
+        # "M" como tamanho inteiro, sem casar com "GG"
+        self.assertEqual(self._names(campaign_customers(start, end, size="m")), ["Ana", "Carla"])
+        self.assertEqual(
+            self._names(campaign_customers(start, end, purchase=PURCHASED, days=30)), ["Ana"]
+        )
+        self.assertEqual(
+            self._names(campaign_customers(start, end, purchase=NOT_PURCHASED, days=30)),
+            ["Bia", "Carla"],
+        )
+
+    def test_tela_e_comando_exportam_csv(self):
+        """Teste a prévia, o CSV da tela e o comando de geração semanal"""
+        user = UserGesthar.objects.create_user(email="caixa@exemplo.com", password="senha123")
+        self.client.force_login(user)
+        url = reverse("customer:customer-campaign")
+        params = {
+            "mode": "parto",
+            "start": self.today.isoformat(),
+            "end": (self.today + timedelta(days=30)).isoformat(),
+            "size": "M",
+        }
+
+        response = self.client.get(url, params)
+        self.assertEqual(response.context["total"], 2)
+        self.assertEqual([row[0] for row in response.context["rows"]], ["Ana", "Carla"])
+
+        response = self.client.get(url, {**params, "export": "csv"})
+        lines = b"".join(response.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(lines[0].split(";")[:4], ["Nome", "E-mail", "Telefone", "Data Prevista do Parto"])
+        self.assertEqual([line.split(";")[0] for line in lines[1:]], ["Ana", "Carla"])
+        self.assertEqual(lines[1].split(";")[6:8], ["2", "150.00"])
+
+        response = self.client.get(url, {"mode": "parto", "start": params["end"], "end": params["start"]})
+        self.assertContains(response, "A data inicial deve ser anterior à final.")
 
-# Create your tests here.
+        out = StringIO()
+        call_command(
+            "export_campaign_list",
+            "--due-between", params["start"], params["end"],
+            "--purchase", NOT_PURCHASED,
+            stdout=out,
+        )
+        self.assertEqual(
+            [line.split(";")[0] for line in out.getvalue().lstrip("\ufeff").splitlines()[1:]],
+            ["Bia", "Carla"],
+        )
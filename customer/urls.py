@@ -6,8 +6,13 @@ app_name = 'customer'
 urlpatterns = [
     path('', views.CustomerListView.as_view(), name='customer_list'),
     path('novo/', views.CustomerCreateView.as_view(), name='customer-create'),
+    path('importar/', views.customer_import_view, name='customer-import'),
+    path('exportar/', views.customer_export_view, name='customer-export'),
+    path('campanhas/', views.customer_campaign_view, name='customer-campaign'),
     path('<int:pk>/', views.CustomerDetailView.as_view(), name='customer_detail'),
     path('<int:pk>/editar/', views.CustomerUpdateView.as_view(), name='customer_update'),
     path('<int:pk>/deletar/', views.CustomerDeleteView.as_view(), name='customer_delete'),
+    path('<int:pk>/compras/', views.customer_purchases_view, name='customer_purchases'),
+    path('api/search/', views.search_customers_api, name='api-search-customers'),
 ]
 
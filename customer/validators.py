@@ -1,14 +1,22 @@
 from django.core.exceptions import ValidationError
+from operator import mul
 import re
 
 
+def only_digits(value):
+    """
+    Remove a máscara do CPF/CNPJ (pontos, traços e barras).
+    """
+    return re.sub(r'[^0-9]', '', value or '')
+
+
 def validate_cpf_cnpj(value):
     """
     Valida CPF ou CNPJ.
     Aceita formatos com ou sem máscara.
     """
     # Remove caracteres não numéricos
-    value = re.sub(r'[^0-9]', '', value)
+    value = only_digits(value)
     
     # Verifica se é CPF (11 dígitos) ou CNPJ (14 dígitos)
     if len(value) == 11:
@@ -82,3 +90,51 @@ def validate_cnpj(cnpj):
     
     return cnpj
 
+
+
+# Pesos dos dígitos verificadores (1º e 2º) de CPF e CNPJ
+_CPF_WEIGHTS = (tuple(range(10, 1, -1)), tuple(range(11, 1, -1)))
+_CNPJ_WEIGHTS = (
+    (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2),
+    (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2),
+)
+
+
+def _weighted_digits(code, weights):
+    """
+    Soma ponderada dos dígitos de `code` (bytes ASCII): os bytes entram
+    direto no produto e o deslocamento de ord("0") é descontado uma vez.
+    """
+    return sum(map(mul, code, weights)) - 48 * sum(weights)
+
+
+def _check_digit(total):
+    resto = total % 11
+    return 0 if resto < 2 else 11 - resto
+
+
+def validate_documents(documents):
+    """
+    Valida uma lista de CPFs/CNPJs já sem máscara de uma vez (importação
+    em lote). Retorna uma lista alinhada com a entrada: None para os
+    válidos ou a mensagem de erro. Mesmas regras de validate_cpf_cnpj.
+    """
+    errors = []
+    for document in documents:
+        if len(document) == 11:
+            label, (first, second) = 'CPF', _CPF_WEIGHTS
+        elif len(document) == 14:
+            label, (first, second) = 'CNPJ', _CNPJ_WEIGHTS
+        else:
+            errors.append('CPF deve ter 11 dígitos ou CNPJ deve ter 14 dígitos.')
+            continue
+
+        code = document.encode()
+        if document == document[0] * len(document) or (
+            code[-2] - 48 != _check_digit(_weighted_digits(code, first))
+            or code[-1] - 48 != _check_digit(_weighted_digits(code, second))
+        ):
+            errors.append(f'{label} inválido.')
+        else:
+            errors.append(None)
+    return errors
@@ -2,41 +2,76 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from .models import Customer, Address
-from .forms import CustomerForm, AddressFormSet
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from base.pagination import CursorPaginationMixin, CursorPaginator
+from product.recommendations import recommend_for_customer
+from sales.models import Sale, SaleItem
+from .models import Customer, CustomerSegment, CustomerStats, Address
+from .forms import CampaignForm, CustomerForm, CustomerImportForm, AddressFormSet
+from .campaigns import CAMPAIGN_COLUMNS, campaign_customers, iter_campaign_csv, iter_campaign_rows
+from .imports import CustomerImportFormatError, import_customers
+from .segments import iter_segment_csv, iter_segment_rows
+from .validators import only_digits
 
+# Dígitos mínimos para a busca por prefixo do typeahead
+SEARCH_MIN_DIGITS = 3
 
-class CustomerListView(LoginRequiredMixin, ListView):
+# Compras por página na linha do tempo do cliente
+TIMELINE_PAGE_SIZE = 10
+
+# Clientes exibidos na prévia da lista de campanha (o CSV traz todos)
+CAMPAIGN_PREVIEW_SIZE = 50
+
+
+class CustomerListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """
-    View para listagem de clientes com busca e paginação.
+    View para listagem de clientes com busca e paginação por cursor.
     """
     model = Customer
     template_name = 'customer/customer_list.html'
     context_object_name = 'customers'
     paginate_by = 20
+    cursor_ordering = ['name', 'pk']
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        search = self.request.GET.get('search', '')
-        
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(cpf_cnpj__icontains=search) |
-                Q(email__icontains=search) |
-                Q(phone__icontains=search)
-            )
-        
-        return queryset
+        return filter_customers(
+            super().get_queryset().select_related('segment'),
+            self.request.GET.get('search', ''),
+            self.request.GET.get('segment', ''),
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search'] = self.request.GET.get('search', '')
+        context['segment'] = self.request.GET.get('segment', '')
+        context['segment_choices'] = CustomerSegment.Segment.choices
         return context
 
 
+def filter_customers(queryset, search='', segment=''):
+    """Busca por nome/e-mail/telefone/prefixo do CPF-CNPJ e filtro por segmento RFM."""
+    if search:
+        condition = (
+            Q(name__icontains=search) |
+            Q(email__icontains=search) |
+            Q(phone__icontains=search)
+        )
+        # CPF/CNPJ: prefixo do documento sem máscara (usa o índice)
+        digits = only_digits(search)
+        if digits:
+            condition |= Q(document_digits__startswith=digits)
+        queryset = queryset.filter(condition)
+
+    if segment in CustomerSegment.Segment.values:
+        queryset = queryset.filter(segment__segment=segment)
+
+    return queryset
+
+
 class CustomerDetailView(LoginRequiredMixin, DetailView):
     """
     View para exibir detalhes do cliente e histórico.
@@ -47,13 +82,18 @@ class CustomerDetailView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        customer = self.get_object()
+        customer = self.object
         
-        # Adiciona informações de histórico (placeholder)
-        context['purchase_history'] = customer.get_purchase_history()
-        context['total_spent'] = customer.get_total_spent()
-        context['purchase_frequency'] = customer.get_purchase_frequency()
+        # Totais e frequência: resumo mantido na conclusão/cancelamento das vendas
+        try:
+            stats = customer.stats
+        except CustomerStats.DoesNotExist:
+            stats = CustomerStats(customer=customer)
+        context['stats'] = stats
+        context['total_spent'] = stats.total_spent
+        context['purchase_frequency'] = stats.purchase_frequency
         context['favorite_products'] = customer.get_favorite_products()
+        context['recommended_products'] = recommend_for_customer(customer)
         
         # Adiciona endereços
         context['addresses'] = customer.addresses.all()
@@ -168,3 +208,148 @@ class CustomerDeleteView(LoginRequiredMixin, DeleteView):
         customer = self.get_object()
         messages.success(request, f'Cliente "{customer.name}" removido com sucesso!')
         return super().delete(request, *args, **kwargs)
+
+
+@login_required
+def search_customers_api(request):
+    """Typeahead de clientes: prefixo do CPF/CNPJ (sem máscara) em JSON."""
+    digits = only_digits(request.GET.get('term', ''))
+    results = []
+
+    if len(digits) >= SEARCH_MIN_DIGITS:
+        customers = (
+            Customer.objects.filter(document_digits__startswith=digits)
+            .order_by('document_digits')
+            .values_list('document_digits', 'name', 'cpf_cnpj')[:10]
+        )
+        results = [
+            {'value': document, 'label': name, 'document': cpf_cnpj}
+            for document, name, cpf_cnpj in customers
+        ]
+
+    return JsonResponse(results, safe=False)
+
+
+@login_required
+def customer_purchases_view(request, pk):
+    """
+    Linha do tempo de compras do cliente (fragmento HTML carregado pelo
+    detalhe do cliente). Paginação por cursor sobre o índice (cliente,
+    criação) e itens pré-carregados: cada página custa duas consultas.
+    """
+    purchases = Sale.objects.filter(
+        customer_id=pk, status=Sale.Status.COMPLETED
+    ).prefetch_related(
+        Prefetch(
+            'items',
+            queryset=SaleItem.objects.only(
+                'sale_id',
+                'product_name_snapshot',
+                'product_sku_snapshot',
+                'quantity',
+                'total_price',
+            ).order_by('pk'),
+        )
+    )
+    paginator = CursorPaginator(purchases, TIMELINE_PAGE_SIZE, ['-created_at', '-pk'])
+    page = paginator.get_page(request.GET.get('cursor'))
+    return render(request, 'customer/purchase_timeline.html', {
+        'customer_id': pk,
+        'page': page,
+        'is_first_page': not request.GET.get('cursor'),
+    })
+
+
+@login_required
+def customer_import_view(request):
+    """Importa clientes de um arquivo CSV e exibe o resumo com os erros por linha."""
+    result = None
+
+    if request.method == 'POST':
+        form = CustomerImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = import_customers(form.cleaned_data['file'].file)
+            except CustomerImportFormatError as e:
+                messages.error(request, str(e))
+            else:
+                if result.error_count:
+                    messages.error(
+                        request,
+                        f'{result.error_count} linha(s) com erro não foram importadas.',
+                    )
+                messages.success(
+                    request,
+                    f'{result.imported_rows} de {result.rows} cliente(s) importado(s).',
+                )
+        else:
+            messages.error(request, 'Por favor, corrija os erros abaixo.')
+    else:
+        form = CustomerImportForm()
+
+    return render(request, 'customer/customer_import.html', {
+        'form': form,
+        'result': result,
+        'page_title': 'Importar Clientes',
+    })
+
+
+@login_required
+def customer_export_view(request):
+    """Exporta em CSV (streaming) os clientes da busca/segmento atuais, com as notas RFM."""
+    segment = request.GET.get('segment', '')
+    queryset = filter_customers(
+        Customer.objects.order_by('name', 'pk'),
+        request.GET.get('search', ''),
+        segment,
+    )
+    # O nome do arquivo só usa segmentos conhecidos (o valor vai no cabeçalho)
+    if segment not in CustomerSegment.Segment.values:
+        segment = 'todos'
+    filename = f"clientes-{segment.lower()}-{timezone.localdate():%Y%m%d}"
+    response = StreamingHttpResponse(
+        iter_segment_csv(iter_segment_rows(queryset)), content_type='text/csv; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+@login_required
+def customer_campaign_view(request):
+    """
+    Monta a lista de campanha pela data prevista do parto: prévia na tela e
+    CSV (streaming) completo com ?export=csv.
+    """
+    form = CampaignForm(request.GET or None)
+    context = {'form': form, 'page_title': 'Lista de Campanha'}
+
+    if form.is_valid():
+        start, end = form.date_window()
+        customers = campaign_customers(
+            start,
+            end,
+            size=form.cleaned_data['size'],
+            purchase=form.cleaned_data['purchase'],
+            days=form.cleaned_data['days'],
+        )
+        if request.GET.get('export') == 'csv':
+            filename = f"campanha-{start:%Y%m%d}-{end:%Y%m%d}"
+            response = StreamingHttpResponse(
+                iter_campaign_csv(iter_campaign_rows(customers)),
+                content_type='text/csv; charset=utf-8',
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+            return response
+
+        query = request.GET.copy()
+        query['export'] = 'csv'
+        context.update({
+            'start': start,
+            'end': end,
+            'total': customers.count(),
+            'rows': list(iter_campaign_rows(customers[:CAMPAIGN_PREVIEW_SIZE])),
+            'columns': CAMPAIGN_COLUMNS,
+            'export_query': query.urlencode(),
+        })
+
+    return render(request, 'customer/customer_campaign.html', context)
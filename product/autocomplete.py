@@ -0,0 +1,177 @@
+# product/autocomplete.py
+"""
+Índice em memória (por processo) para o autocomplete de produtos do PDV.
+
+O índice mapeia prefixos de termos (nome sem acentos, SKU e suas partes,
+cor e tamanho) para as variações ativas, com o rótulo de exibição já
+montado. Uma consulta não toca o banco de dados. Os resultados saem das
+mais vendidas nos últimos 30 dias para as menos vendidas (contadores de
+product.best_sellers, lidos na montagem do índice; o recálculo noturno
+invalida o índice).
+
+A invalidação usa um contador de versão no cache do Django, incrementado
+pelos signals do catálogo após o commit (base.versions): no mesmo processo
+a invalidação é imediata; os demais workers remontam o índice em até
+VERSION_CHECK_INTERVAL segundos, sem consultar o cache a cada busca.
+"""
+import threading
+
+from django.db import connection, transaction
+
+from base.versions import SharedVersion
+
+from .models import ProductVariation
+from .utils import normalize_search_text
+
+CATALOG_VERSION_KEY = "product:catalog-version"
+
+# Prefixos maiores que isso não ajudam a filtrar e só ocupam memória
+MAX_PREFIX_LENGTH = 20
+
+NOT_APPLICABLE = "N/A"
+
+
+catalog_version = SharedVersion(CATALOG_VERSION_KEY)
+
+
+def get_catalog_version():
+    return catalog_version.get()
+
+
+def _increment_catalog_version():
+    catalog_version.increment()
+
+
+def invalidate_catalog():
+    """
+    Invalida o índice deste processo imediatamente e, após o commit, publica
+    uma nova versão do catálogo para os demais workers.
+    """
+    global _index
+    with _lock:
+        _index = None
+    transaction.on_commit(_increment_catalog_version)
+
+
+def build_label(product_name, color_name, size_name):
+    """Ex: "Sutiã Amamentação - Vermelho M" (ignora cor/tamanho "N/A")."""
+    details = [
+        name
+        for name in (color_name, size_name)
+        if name and name.upper() != NOT_APPLICABLE
+    ]
+    if details:
+        return f"{product_name} - {' '.join(details)}"
+    return product_name
+
+
+def _prefixes(token):
+    return (token[:length] for length in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1))
+
+
+class VariationSearchIndex:
+    def __init__(self, rows):
+        # Entradas ordenadas pelas mais vendidas e depois pelo rótulo: a posição
+        # na lista já é a ordem do resultado
+        self.entries = sorted(
+            (self._entry(row) for row in rows),
+            key=lambda entry: (-entry["units_sold"], entry["label"].lower(), entry["value"]),
+        )
+
+        # prefixo -> posições em ordem crescente (cada entrada uma única vez)
+        self.prefix_map = {}
+        for position, entry in enumerate(self.entries):
+            prefixes = set()
+            for token in entry["tokens"]:
+                prefixes.update(_prefixes(token))
+            for prefix in prefixes:
+                self.prefix_map.setdefault(prefix, []).append(position)
+
+    @staticmethod
+    def _entry(row):
+        sku = (row["sku"] or "").lower()
+        tokens = set(
+            " ".join(
+                normalize_search_text(row[field])
+                for field in ("product__name", "color__name", "size__name")
+            ).split()
+        )
+        if sku:
+            tokens.add(sku)
+            tokens.update(part for part in sku.split("-") if part)
+        return {
+            "label": build_label(row["product__name"], row["color__name"], row["size__name"]),
+            "value": row["sku"],
+            "price": float(row["product__selling_price"]),
+            "units_sold": row["units_sold_30d"],
+            "tokens": tuple(tokens),
+        }
+
+    @classmethod
+    def from_database(cls):
+        rows = ProductVariation.active.values(
+            "sku",
+            "product__name",
+            "product__selling_price",
+            "color__name",
+            "size__name",
+            "units_sold_30d",
+        ).order_by()
+        return cls(rows)
+
+    def search(self, term, limit=10):
+        tokens = normalize_search_text(term).split()
+        if not tokens:
+            return []
+
+        candidates = None
+        for token in tokens:
+            positions = self.prefix_map.get(token[:MAX_PREFIX_LENGTH])
+            if not positions:
+                return []
+            if candidates is None or len(positions) < len(candidates):
+                candidates = positions
+
+        # Percorre a menor lista (já na ordem do resultado) conferindo os
+        # demais termos na própria entrada, até completar o limite
+        results = []
+        for position in candidates:
+            entry = self.entries[position]
+            if all(
+                any(entry_token.startswith(token) for entry_token in entry["tokens"])
+                for token in tokens
+            ):
+                results.append(
+                    {"label": entry["label"], "value": entry["value"], "price": entry["price"]}
+                )
+                if len(results) >= limit:
+                    break
+        return results
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_search_index():
+    """
+    Retorna o índice do processo, reconstruindo-o quando a versão do catálogo
+    mudou. Dentro de uma transação o índice montado não é guardado, pois
+    pode conter dados ainda não confirmados.
+    """
+    global _index, _index_version
+    version = get_catalog_version()
+    with _lock:
+        if _index is not None and _index_version == version:
+            return _index
+
+    index = VariationSearchIndex.from_database()
+    if not connection.in_atomic_block:
+        with _lock:
+            _index, _index_version = index, version
+    return index
+
+
+def search_variations(term, limit=10):
+    return get_search_index().search(term, limit=limit)
@@ -0,0 +1,128 @@
+# product/best_sellers.py
+"""
+Contadores de mais vendidos.
+
+Cada variação guarda as unidades vendidas nos últimos 30 dias e no total;
+o produto guarda a soma das suas variações. Os contadores são atualizados
+de forma incremental na conclusão e no cancelamento de uma venda (um UPDATE
+por tabela) e recalculados todas as noites pelo comando
+`recompute_best_sellers`, que tira da janela as vendas com mais de 30 dias.
+
+Usam os contadores: a ordem do autocomplete do PDV, a ordenação "mais
+vendidos" da lista de produtos e o painel de mais vendidos do PDV.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .autocomplete import invalidate_catalog
+from .models import Product, ProductVariation
+
+SALES_WINDOW = timedelta(days=30)
+
+TOP_SELLERS_LIMIT = 8
+
+
+def _sold_items(since=None):
+    from sales.models import Sale, SaleItem
+
+    items = SaleItem.objects.filter(sale__status=Sale.Status.COMPLETED, sale__is_active=True)
+    if since is not None:
+        items = items.filter(sale__completed_at__gte=since)
+    return items
+
+
+def units_sold_subquery(since=None):
+    """Unidades vendidas (vendas concluídas e ativas) por variação, desde `since`."""
+    sold = (
+        _sold_items(since)
+        .filter(variation=OuterRef("pk"))
+        .order_by()
+        .values("variation")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    return Coalesce(Subquery(sold, output_field=IntegerField()), 0)
+
+
+def _delta(deltas):
+    return Case(
+        *(When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def record_units_sold(lines, sign=1, in_window=True):
+    """
+    Soma (ou, com sign=-1, subtrai) as unidades de `lines` = [(variation_id,
+    product_id, quantidade)] nos contadores das variações e dos produtos.
+    `in_window` indica se a venda ainda está na janela de 30 dias.
+    """
+    variation_deltas = {}
+    product_deltas = {}
+    for variation_id, product_id, quantity in lines:
+        variation_deltas[variation_id] = variation_deltas.get(variation_id, 0) + sign * quantity
+        product_deltas[product_id] = product_deltas.get(product_id, 0) + sign * quantity
+    if not variation_deltas:
+        return
+
+    for model, deltas in ((ProductVariation, variation_deltas), (Product, product_deltas)):
+        delta = _delta(deltas)
+        fields = ["units_sold_total"] + (["units_sold_30d"] if in_window else [])
+        model.objects.filter(pk__in=sorted(deltas)).update(
+            **{field: Greatest(F(field) + delta, 0) for field in fields}
+        )
+
+
+@transaction.atomic
+def recompute_best_sellers(full=False, now=None):
+    """
+    Recalcula a janela de 30 dias a partir das vendas (e, com `full`, também
+    o total). Só são gravadas as variações com contador ou vendas na janela.
+    Retorna a quantidade de variações recalculadas.
+    """
+    since = (now or timezone.now()) - SALES_WINDOW
+    if full:
+        variations = ProductVariation.objects.all()
+        updates = {
+            "units_sold_30d": units_sold_subquery(since),
+            "units_sold_total": units_sold_subquery(),
+        }
+    else:
+        variations = ProductVariation.objects.filter(
+            Q(units_sold_30d__gt=0) | Q(pk__in=_sold_items(since).values("variation_id"))
+        )
+        updates = {"units_sold_30d": units_sold_subquery(since)}
+    product_ids = list(variations.values_list("product_id", flat=True).distinct())
+    updated = variations.update(**updates)
+
+    # Produtos: soma das variações (todas, inclusive inativas)
+    def variation_sum(field):
+        total = (
+            ProductVariation.objects.filter(product=OuterRef("pk"))
+            .order_by()
+            .values("product")
+            .annotate(total=Sum(field))
+            .values("total")
+        )
+        return Coalesce(Subquery(total, output_field=IntegerField()), 0)
+
+    products = Product.objects.all() if full else Product.objects.filter(pk__in=product_ids)
+    products.update(**{field: variation_sum(field) for field in updates})
+
+    # A ordem do autocomplete acompanha os contadores
+    invalidate_catalog()
+    return updated
+
+
+def top_selling_variations(limit=TOP_SELLERS_LIMIT):
+    """Variações ativas e com estoque mais vendidas nos últimos 30 dias."""
+    return (
+        ProductVariation.active.filter(units_sold_30d__gt=0, stock__gt=0)
+        .select_related("product", "color", "size")
+        .order_by("-units_sold_30d", "pk")[:limit]
+    )
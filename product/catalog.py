@@ -0,0 +1,705 @@
+# product/catalog.py
+"""
+Importação e exportação do catálogo (produtos, variações, custos de
+fornecedores e estoque) em CSV ou XLSX.
+
+Uma linha por variação, com as colunas de CATALOG_COLUMNS. A coluna
+"fornecedores" traz os custos do produto no formato
+"Fornecedor A=35.00; Fornecedor B=38.50".
+
+- Importação: lê o arquivo em fluxo e grava em lotes (upsert), resolvendo
+  categorias/cores/tamanhos/fornecedores por mapas em memória. Linhas com
+  erro são reportadas sem interromper o restante do arquivo.
+- Exportação: percorre as variações com cursor do lado do servidor
+  (.iterator()) e gera as linhas sob demanda.
+
+CSV é nativo; XLSX usa o pacote openpyxl (requirements.txt).
+"""
+import csv
+import io
+import itertools
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.db import DatabaseError, transaction
+from django.db.models import CharField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from base.streaming import stream_csv
+from stock.models import StockMovement, StockReservation
+
+from .autocomplete import invalidate_catalog
+from .metrics import refresh_product_metrics
+from .models import Category, Color, Product, ProductSupplier, ProductVariation, Size, Supplier
+from .reference import DEFAULT_NAME, get_reference
+from .search import refresh_search_documents
+from .services import ServiceDuplicateError, allocate_skus
+from .utils import generate_sku_base, standardize_name
+
+CATALOG_COLUMNS = [
+    "produto",
+    "categoria",
+    "descricao",
+    "preco_venda",
+    "produto_ativo",
+    "sku",
+    "cor",
+    "tamanho",
+    "estoque",
+    "estoque_minimo",
+    "variacao_ativa",
+    "fornecedores",
+]
+
+REQUIRED_COLUMNS = {"produto", "categoria", "preco_venda"}
+
+CSV = "csv"
+XLSX = "xlsx"
+FORMATS = (CSV, XLSX)
+
+# Limite de erros guardados no resultado (os demais só entram na contagem)
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_NOTE = "Importação de catálogo"
+
+TRUE_VALUES = {"sim", "s", "1", "true", "verdadeiro", "ativo", "x"}
+FALSE_VALUES = {"nao", "não", "n", "0", "false", "falso", "inativo"}
+
+
+class CatalogFormatError(ValueError):
+    """Arquivo em formato não suportado ou sem as colunas obrigatórias."""
+
+    pass
+
+
+class CatalogRowError(ValueError):
+    """Linha do arquivo com dados inválidos."""
+
+    pass
+
+
+def _require_openpyxl():
+    try:
+        import openpyxl
+    except ImportError:
+        raise CatalogFormatError(
+            "O formato XLSX requer o pacote 'openpyxl'. Instale-o ou utilize CSV."
+        )
+    return openpyxl
+
+
+def detect_format(filename, default=CSV):
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    return extension if extension in FORMATS else default
+
+
+# Leitura
+def _normalize_header(header):
+    return [str(name or "").strip().lower() for name in header]
+
+
+def _check_header(header):
+    missing = REQUIRED_COLUMNS - set(header)
+    if missing:
+        raise CatalogFormatError(
+            f"Colunas obrigatórias ausentes: {', '.join(sorted(missing))}."
+        )
+
+
+def _iter_csv(stream):
+    first_line = stream.readline()
+    if not first_line:
+        return
+    # Planilhas em pt-BR costumam exportar CSV separado por ";"
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    reader = csv.reader(itertools.chain([first_line], stream), delimiter=delimiter)
+    header = _normalize_header(next(reader))
+    _check_header(header)
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        yield reader.line_num, dict(zip(header, values))
+
+
+def _iter_xlsx(file):
+    openpyxl = _require_openpyxl()
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _normalize_header(next(rows, []))
+        _check_header(header)
+        for line, values in enumerate(rows, start=2):
+            if not any(value not in (None, "") for value in values):
+                continue
+            yield line, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def iter_catalog_file(file, file_format=CSV):
+    """
+    Percorre o arquivo linha a linha, retornando (número da linha, dados).
+    Para CSV, `file` pode ser binário ou texto (UTF-8, com ou sem BOM).
+    """
+    if file_format == XLSX:
+        return _iter_xlsx(file)
+    if file_format != CSV:
+        raise CatalogFormatError(f"Formato não suportado: {file_format}.")
+    if not isinstance(file, io.TextIOBase):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    return _iter_csv(file)
+
+
+# Conversão dos valores
+def _text(value):
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def _parse_decimal(value, label):
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    text = _text(value).replace("R$", "").strip()
+    if "," in text:
+        # Formato brasileiro: 1.234,56
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        raise CatalogRowError(f"{label} inválido: '{_text(value)}'.")
+    if number < 0:
+        raise CatalogRowError(f"{label} não pode ser negativo.")
+    return number.quantize(Decimal("0.01"))
+
+
+def _parse_int(value, label):
+    text = _text(value)
+    if not text:
+        return None
+    try:
+        number = Decimal(text.replace(",", "."))
+    except InvalidOperation:
+        raise CatalogRowError(f"{label} inválido: '{text}'.")
+    if number < 0 or number != number.to_integral_value():
+        raise CatalogRowError(f"{label} deve ser um número inteiro não negativo.")
+    return int(number)
+
+
+def _parse_bool(value, label):
+    if isinstance(value, bool):
+        return value
+    text = _text(value).lower()
+    if not text:
+        return None
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise CatalogRowError(f"{label} inválido: '{text}' (use sim/não).")
+
+
+def _parse_suppliers(value):
+    """ "Fornecedor A=35.00; Fornecedor B=38,50" -> [("Fornecedor A", Decimal)]"""
+    text = _text(value)
+    if not text:
+        return None
+    suppliers = []
+    for item in text.split(";"):
+        if not item.strip():
+            continue
+        name, separator, cost = item.rpartition("=")
+        if not separator or not name.strip():
+            raise CatalogRowError(
+                f"Fornecedor inválido: '{item.strip()}' (use Nome=custo)."
+            )
+        suppliers.append((standardize_name(name), _parse_decimal(cost, "Custo do fornecedor")))
+    return suppliers
+
+
+def parse_catalog_row(raw):
+    """
+    Valida e normaliza uma linha do arquivo. Levanta CatalogRowError.
+
+    Colunas opcionais ausentes ou em branco viram None, que significa "manter
+    o valor atual" (ou o padrão, para registros novos).
+    """
+    name = _text(raw.get("produto"))
+    category = _text(raw.get("categoria"))
+    if not name:
+        raise CatalogRowError("O nome do produto é obrigatório.")
+    if not category:
+        raise CatalogRowError("A categoria é obrigatória.")
+    if _text(raw.get("preco_venda")) == "":
+        raise CatalogRowError("O preço de venda é obrigatório.")
+
+    return {
+        "name": standardize_name(name),
+        "category": standardize_name(category),
+        "description": _text(raw.get("descricao")) or None,
+        "selling_price": _parse_decimal(raw.get("preco_venda"), "Preço de venda"),
+        "product_active": _parse_bool(raw.get("produto_ativo"), "Produto ativo"),
+        "sku": _text(raw.get("sku")).upper(),
+        "color": standardize_name(_text(raw.get("cor")) or DEFAULT_NAME),
+        "size": standardize_name(_text(raw.get("tamanho")) or DEFAULT_NAME),
+        "stock": _parse_int(raw.get("estoque"), "Estoque"),
+        "minimum_stock": _parse_int(raw.get("estoque_minimo"), "Estoque mínimo"),
+        "variation_active": _parse_bool(raw.get("variacao_ativa"), "Variação ativa"),
+        "suppliers": _parse_suppliers(raw.get("fornecedores")),
+    }
+
+
+# Importação
+class CatalogImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.created_products = 0
+        self.updated_products = 0
+        self.created_variations = 0
+        self.updated_variations = 0
+        self.stock_adjustments = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def imported_rows(self):
+        return self.rows - self.error_count
+
+
+class _ReferenceMaps:
+    """
+    Mapas nome padronizado -> id de categorias, cores, tamanhos e
+    fornecedores, carregados do cache de referência e completados com os
+    registros criados durante a importação.
+    """
+
+    MODELS = (Category, Color, Size, Supplier)
+
+    def __init__(self):
+        self.reload()
+
+    def reload(self):
+        self.maps = {
+            model: {
+                standardize_name(obj.name): obj.pk for obj in get_reference(model).all()
+            }
+            for model in self.MODELS
+        }
+
+    def resolve(self, model, names):
+        ids = self.maps[model]
+        missing = {name for name in names if name not in ids}
+        if missing:
+            model.objects.bulk_create(
+                [model(name=name) for name in sorted(missing)], ignore_conflicts=True
+            )
+            ids.update(model.objects.filter(name__in=missing).values_list("name", "pk"))
+            # bulk_create não dispara signals
+            get_reference(model).invalidate()
+        return ids
+
+
+def import_catalog(file, user, file_format=CSV, batch_size=1000):
+    """
+    Importa o catálogo do arquivo em lotes de `batch_size` linhas.
+    Ajustes de estoque geram movimentos AJUSTE_ENTRADA/AJUSTE_SAIDA em nome
+    de `user`. Retorna um CatalogImportResult.
+
+    Raises:
+        CatalogFormatError: Formato não suportado ou colunas obrigatórias ausentes.
+    """
+    result = CatalogImportResult()
+    references = _ReferenceMaps()
+    batch = []
+
+    for line, raw in iter_catalog_file(file, file_format):
+        result.rows += 1
+        try:
+            row = parse_catalog_row(raw)
+        except CatalogRowError as e:
+            result.add_error(line, str(e))
+            continue
+        row["line"] = line
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _import_batch(batch, user, references, result)
+            batch = []
+
+    if batch:
+        _import_batch(batch, user, references, result)
+    return result
+
+
+def _import_batch(rows, user, references, result):
+    try:
+        with transaction.atomic():
+            counters, row_errors = _write_batch(rows, user, references)
+    except (DatabaseError, ServiceDuplicateError) as e:
+        # Registros criados pelo lote desfeito não existem mais
+        references.reload()
+        for row in rows:
+            result.add_error(row["line"], f"Lote não gravado: {e}")
+        return
+
+    for line, message in row_errors:
+        result.add_error(line, message)
+    for name, value in counters.items():
+        setattr(result, name, getattr(result, name) + value)
+
+
+def _write_batch(rows, user, references):
+    counters = dict.fromkeys(
+        [
+            "created_products",
+            "updated_products",
+            "created_variations",
+            "updated_variations",
+            "stock_adjustments",
+        ],
+        0,
+    )
+    errors = []
+    now = timezone.now()
+
+    category_ids = references.resolve(Category, {row["category"] for row in rows})
+    color_ids = references.resolve(Color, {row["color"] for row in rows})
+    size_ids = references.resolve(Size, {row["size"] for row in rows})
+    supplier_ids = references.resolve(
+        Supplier, {name for row in rows for name, _cost in row["suppliers"] or []}
+    )
+
+    # Produtos (os dados do produto vêm da primeira linha em que ele aparece)
+    product_rows = {}
+    for row in rows:
+        product_rows.setdefault(row["name"], row)
+
+    products = {
+        product.name: product
+        for product in Product.objects.filter(name__in=product_rows).only(
+            "pk", "name", "category_id", "description", "selling_price", "is_active", "average_cost"
+        )
+    }
+    product_fields = ["category_id", "description", "selling_price", "is_active"]
+    to_create, to_update = [], []
+    for name, row in product_rows.items():
+        values = {
+            "category_id": category_ids[row["category"]],
+            "selling_price": row["selling_price"],
+        }
+        if row["description"] is not None:
+            values["description"] = row["description"]
+        if row["product_active"] is not None:
+            values["is_active"] = row["product_active"]
+        product = products.get(name)
+        if product is None:
+            to_create.append(Product(name=name, **values))
+        elif any(getattr(product, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(product, field, value)
+            product.updated_at = now
+            to_update.append(product)
+
+    for product in Product.objects.bulk_create(to_create):
+        products[product.name] = product
+    Product.objects.bulk_update(to_update, product_fields + ["updated_at"])
+    counters["created_products"] = len(to_create)
+    counters["updated_products"] = len(to_update)
+
+    # Custo unitário das entradas de estoque, por produto
+    unit_costs = {
+        products[name].pk: _unit_cost(products[name], row["suppliers"])
+        for name, row in product_rows.items()
+    }
+
+    # Variações: por SKU (quando informado) ou por produto + cor + tamanho.
+    # As linhas ficam travadas até o fim do lote: uma venda concluída no meio
+    # da importação espera, e o ajuste sai do estoque lido aqui.
+    product_ids = {products[name].pk for name in product_rows}
+    row_skus = {row["sku"] for row in rows if row["sku"]}
+    variations = list(
+        ProductVariation.objects.filter(
+            Q(product_id__in=product_ids) | Q(sku__in=row_skus)
+        )
+        .select_for_update()
+        .order_by("pk")
+        .only("pk", "sku", "product_id", "color_id", "size_id", "stock", "minimum_stock", "is_active")
+    )
+    by_key = {(v.product_id, v.color_id, v.size_id): v for v in variations}
+    by_sku = {v.sku: v for v in variations}
+    # Unidades em carrinhos abertos (com a variação travada, não surgem novas)
+    reserved = dict(
+        StockReservation.objects.filter(
+            product_variation__in=variations, expires_at__gt=now
+        )
+        .values("product_variation_id")
+        .annotate(total=Sum("quantity"))
+        .values_list("product_variation_id", "total")
+    )
+
+    seen_keys = set()
+    seen_skus = set()
+    new_variations, new_rows = [], []
+    changed, movements = {}, []
+
+    for row in rows:
+        key = (
+            products[row["name"]].pk,
+            color_ids[row["color"]],
+            size_ids[row["size"]],
+        )
+        if key in seen_keys or (row["sku"] and row["sku"] in seen_skus):
+            errors.append((row["line"], "Variação repetida no arquivo."))
+            continue
+
+        variation = by_key.get(key)
+        if row["sku"]:
+            owner = by_sku.get(row["sku"])
+            if owner is not None and (owner.product_id, owner.color_id, owner.size_id) != key:
+                errors.append(
+                    (row["line"], f"O SKU {row['sku']} pertence a outra variação.")
+                )
+                continue
+            if variation is not None and variation.sku != row["sku"]:
+                errors.append(
+                    (row["line"], f"A variação já existe com o SKU {variation.sku}.")
+                )
+                continue
+        seen_keys.add(key)
+        if row["sku"]:
+            seen_skus.add(row["sku"])
+
+        if variation is None:
+            new_variations.append(
+                ProductVariation(
+                    product_id=key[0],
+                    color_id=key[1],
+                    size_id=key[2],
+                    sku=row["sku"],
+                    stock=row["stock"] or 0,
+                    minimum_stock=row["minimum_stock"] or 0,
+                    is_active=row["variation_active"] is not False,
+                )
+            )
+            new_rows.append(row)
+            continue
+
+        if row["stock"] is not None and row["stock"] < reserved.get(variation.pk, 0):
+            errors.append(
+                (
+                    row["line"],
+                    f"Estoque {row['stock']} abaixo das unidades reservadas em "
+                    f"carrinhos abertos ({reserved[variation.pk]}).",
+                )
+            )
+            continue
+
+        updated = False
+        if row["minimum_stock"] is not None and variation.minimum_stock != row["minimum_stock"]:
+            variation.minimum_stock = row["minimum_stock"]
+            updated = True
+        if row["variation_active"] is not None and variation.is_active != row["variation_active"]:
+            variation.is_active = row["variation_active"]
+            updated = True
+        if row["stock"] is not None and variation.stock != row["stock"]:
+            movements.append(
+                _adjustment(
+                    variation, row["stock"] - variation.stock, user, unit_costs[variation.product_id]
+                )
+            )
+            variation.stock = row["stock"]
+            updated = True
+        if updated:
+            variation.updated_at = now
+            changed[variation.pk] = variation
+
+    # SKUs gerados em memória para as variações novas sem SKU no arquivo
+    without_sku = [v for v in new_variations if not v.sku]
+    if without_sku:
+        names = {
+            "color": {pk: name for name, pk in color_ids.items()},
+            "size": {pk: name for name, pk in size_ids.items()},
+            "product": {product.pk: name for name, product in products.items()},
+        }
+        skus = allocate_skus(
+            [
+                generate_sku_base(
+                    names["product"][v.product_id],
+                    names["color"][v.color_id],
+                    names["size"][v.size_id],
+                )
+                for v in without_sku
+            ]
+        )
+        for variation, sku in zip(without_sku, skus):
+            variation.sku = sku
+
+    for variation in ProductVariation.objects.bulk_create(new_variations):
+        if variation.stock:
+            movements.append(
+                _adjustment(variation, variation.stock, user, unit_costs[variation.product_id])
+            )
+    ProductVariation.objects.bulk_update(
+        list(changed.values()), ["stock", "minimum_stock", "is_active", "updated_at"]
+    )
+    StockMovement.objects.bulk_create(movements)
+    counters["created_variations"] = len(new_variations)
+    counters["updated_variations"] = len(changed)
+    counters["stock_adjustments"] = len(movements)
+
+    # Custos dos fornecedores (upsert pelo par produto/fornecedor)
+    links = {}
+    for row in product_rows.values():
+        for name, cost in row["suppliers"] or []:
+            links[(products[row["name"]].pk, supplier_ids[name])] = cost
+    ProductSupplier.objects.bulk_create(
+        [
+            ProductSupplier(product_id=product_id, supplier_id=supplier_id, cost_price=cost)
+            for (product_id, supplier_id), cost in links.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["product", "supplier"],
+        update_fields=["cost_price", "updated_at"],
+    )
+
+    # Operações em lote não disparam signals
+    refresh_search_documents(product_ids)
+    refresh_product_metrics(product_ids)
+    invalidate_catalog()
+
+    return counters, errors
+
+
+def _unit_cost(product, suppliers):
+    """
+    Custo das entradas de estoque da importação: média dos custos dos
+    fornecedores da linha, o custo médio já gravado ou, sem nenhum custo, o
+    preço de venda (como na devolução de vendas canceladas).
+    """
+    costs = [cost for _name, cost in suppliers or [] if cost > 0]
+    if costs:
+        return (sum(costs) / len(costs)).quantize(Decimal("0.01"))
+    if product.average_cost:
+        return product.average_cost
+    return product.selling_price
+
+
+def _adjustment(variation, delta, user, unit_price):
+    return StockMovement(
+        product_variation_id=variation.pk,
+        movement_type=(
+            StockMovement.MovementType.AJUSTE_ENTRADA
+            if delta > 0
+            else StockMovement.MovementType.AJUSTE_SAIDA
+        ),
+        quantity=abs(delta),
+        user=user,
+        # Entradas exigem custo (StockMovement.clean); saídas não levam preço
+        unit_price=unit_price if delta > 0 else None,
+        notes=IMPORT_NOTE,
+    )
+
+
+# Exportação
+def _format_bool(value):
+    return "sim" if value else "não"
+
+
+def iter_catalog_rows(queryset=None, chunk_size=2000):
+    """
+    Gera as linhas do catálogo (listas na ordem de CATALOG_COLUMNS) usando
+    cursor do lado do servidor: a memória não cresce com o catálogo.
+    """
+    if queryset is None:
+        queryset = ProductVariation.objects.all()
+
+    supplier_costs = (
+        ProductSupplier.objects.filter(product=OuterRef("product"))
+        .order_by()
+        .values("product")
+        .annotate(
+            costs=StringAgg(
+                Concat(
+                    "supplier__name",
+                    Value("="),
+                    Cast("cost_price", output_field=CharField()),
+                    output_field=CharField(),
+                ),
+                delimiter="; ",
+                ordering="supplier__name",
+            )
+        )
+        .values("costs")
+    )
+
+    rows = (
+        queryset.annotate(supplier_costs=Subquery(supplier_costs, output_field=CharField()))
+        .values_list(
+            "product__name",
+            "product__category__name",
+            "product__description",
+            "product__selling_price",
+            "product__is_active",
+            "sku",
+            "color__name",
+            "size__name",
+            "stock",
+            "minimum_stock",
+            "is_active",
+            "supplier_costs",
+        )
+        .order_by("product__name", "pk")
+    )
+
+    for (
+        name,
+        category,
+        description,
+        selling_price,
+        product_active,
+        sku,
+        color,
+        size,
+        stock,
+        minimum_stock,
+        variation_active,
+        suppliers,
+    ) in rows.iterator(chunk_size=chunk_size):
+        yield [
+            name,
+            category,
+            description or "",
+            f"{selling_price:.2f}",
+            _format_bool(product_active),
+            sku,
+            color,
+            size,
+            stock,
+            minimum_stock,
+            _format_bool(variation_active),
+            suppliers or "",
+        ]
+
+
+def iter_catalog_csv(rows, delimiter=";"):
+    """Gera o CSV (com BOM, para abrir direto no Excel) linha a linha."""
+    return stream_csv(CATALOG_COLUMNS, rows, delimiter)
+
+
+def write_catalog_xlsx(rows, target):
+    """
+    Grava as linhas em uma planilha XLSX no modo write-only do openpyxl
+    (as linhas vão para disco à medida que são geradas).
+    """
+    openpyxl = _require_openpyxl()
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Catálogo")
+    sheet.append(CATALOG_COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(target)
@@ -0,0 +1,401 @@
+# product/facets.py
+"""
+Filtros facetados da lista de produtos: categoria, cor, tamanho, fornecedor,
+faixa de preço e "em estoque", com a contagem de produtos por valor.
+
+Cor, tamanho e estoque são avaliados na mesma variação: "Tamanho G, em
+estoque" encontra produtos com uma variação G com estoque, e não produtos
+com uma variação G e outra, de outro tamanho, com estoque.
+
+As contagens seguem o padrão de facetas disjuntivas: cada faceta aplica
+todos os filtros, menos o dela mesma (marcar "M" não zera a contagem de
+"G"). Elas saem de um índice em memória (FacetIndex), montado com duas
+consultas e mantido por processo, como o índice do autocomplete: cada valor
+de faceta vira um bitmap (int) sobre as posições dos produtos, e contar é
+combinar bitmaps com & / | e chamar int.bit_count(). Uma contagem sem
+filtros em um catálogo de 100 mil variações não percorre o banco.
+
+O índice é refeito quando muda a versão do catálogo ou a versão das facetas,
+incrementada pelos signals de variação/fornecedor (inclusive nas
+movimentações de estoque, que não alteram a versão do catálogo).
+"""
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from base.versions import SharedVersion
+
+from .autocomplete import get_catalog_version
+from .models import ProductSupplier, ProductVariation
+from .reference import categories, colors, sizes, suppliers
+from .search import search_product_ids
+
+FACET_VERSION_KEY = "product:facets:version"
+
+# Facetas de múltipla escolha (OU dentro da faceta, E entre facetas)
+CHOICE_FACETS = ("category", "color", "size", "supplier", "price")
+
+FACET_LABELS = {
+    "category": "Categoria",
+    "color": "Cor",
+    "size": "Tamanho",
+    "supplier": "Fornecedor",
+    "price": "Preço",
+}
+
+# Faixas de preço: (mínimo inclusivo, máximo exclusivo)
+PRICE_RANGES = (
+    (None, Decimal("50")),
+    (Decimal("50"), Decimal("100")),
+    (Decimal("100"), Decimal("200")),
+    (Decimal("200"), None),
+)
+
+REFERENCES = {
+    "category": categories,
+    "color": colors,
+    "size": sizes,
+    "supplier": suppliers,
+}
+
+
+def price_range_label(index):
+    low, high = PRICE_RANGES[index]
+    if low is None:
+        return f"Até R$ {high:.2f}"
+    if high is None:
+        return f"A partir de R$ {low:.2f}"
+    return f"R$ {low:.2f} a R$ {high:.2f}"
+
+
+def empty_filters():
+    return {**{name: [] for name in CHOICE_FACETS}, "in_stock": False}
+
+
+def parse_facet_filters(params):
+    """Lê os filtros de um QueryDict (ex: ?size=3&size=4&in_stock=1), ignorando valores inválidos."""
+    filters = empty_filters()
+    for name in CHOICE_FACETS:
+        values = set()
+        for value in params.getlist(name):
+            if value.isdigit():
+                values.add(int(value))
+        if name == "price":
+            values = {value for value in values if value < len(PRICE_RANGES)}
+        filters[name] = sorted(values)
+    filters["in_stock"] = params.get("in_stock") in ("1", "on", "true")
+    return filters
+
+
+def has_filters(filters):
+    return filters["in_stock"] or any(filters[name] for name in CHOICE_FACETS)
+
+
+def filters_querystring(filters):
+    """Pares (nome, valor) para montar links que preservam os filtros."""
+    pairs = [(name, value) for name in CHOICE_FACETS for value in filters[name]]
+    if filters["in_stock"]:
+        pairs.append(("in_stock", "1"))
+    return pairs
+
+
+def _price_condition(indexes):
+    condition = Q()
+    for index in indexes:
+        low, high = PRICE_RANGES[index]
+        bucket = Q()
+        if low is not None:
+            bucket &= Q(product__selling_price__gte=low)
+        if high is not None:
+            bucket &= Q(product__selling_price__lt=high)
+        condition |= bucket
+    return condition
+
+
+def variation_conditions(filters, query=""):
+    """Q sobre ProductVariation com os filtros (cor, tamanho e estoque na mesma variação)."""
+    condition = Q()
+    if query:
+        condition &= Q(product_id__in=search_product_ids(query))
+    if filters["category"]:
+        condition &= Q(product__category_id__in=filters["category"])
+    if filters["color"]:
+        condition &= Q(color_id__in=filters["color"])
+    if filters["size"]:
+        condition &= Q(size_id__in=filters["size"])
+    if filters["supplier"]:
+        condition &= Q(
+            product_id__in=ProductSupplier.objects.filter(
+                supplier_id__in=filters["supplier"]
+            ).values("product_id")
+        )
+    if filters["price"]:
+        condition &= _price_condition(filters["price"])
+    if filters["in_stock"]:
+        condition &= Q(stock__gt=0)
+    return condition
+
+
+def filter_products(products, filters, query=""):
+    """Restringe um queryset de produtos aos que têm variação ativa que atende aos filtros."""
+    if not has_filters(filters):
+        return products
+    return products.filter(
+        pk__in=ProductVariation.active.filter(variation_conditions(filters, query)).values(
+            "product_id"
+        )
+    )
+
+
+def price_bucket(price):
+    """Índice da faixa de PRICE_RANGES que contém o preço."""
+    for index, (low, high) in enumerate(PRICE_RANGES):
+        if (low is None or price >= low) and (high is None or price < high):
+            return index
+    return None
+
+
+# Versão das facetas
+facet_version = SharedVersion(FACET_VERSION_KEY)
+
+
+def get_facet_version():
+    return facet_version.get()
+
+
+def _increment_facet_version():
+    facet_version.increment()
+
+
+def invalidate_facets():
+    """
+    Descarta o índice do processo agora e publica a nova versão após o
+    commit (os demais processos refazem o índice na próxima leitura).
+    """
+    global _index
+    with _lock:
+        _index = None
+    transaction.on_commit(_increment_facet_version)
+
+
+# Índice
+def _bitmap(positions, size):
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, "little")
+
+
+class FacetIndex:
+    """
+    Bitmaps sobre as posições dos produtos ativos:
+
+    - por categoria, faixa de preço e fornecedor (atributos do produto);
+    - por par (cor, tamanho), um bitmap com todos os produtos que têm a
+      variação e outro só com os que a têm em estoque. Combinar pares mantém
+      cor, tamanho e estoque avaliados na mesma variação.
+    """
+
+    def __init__(self, variation_rows, supplier_rows):
+        self.positions = {}
+        product_values = {"category": defaultdict(set), "price": defaultdict(set)}
+        pairs = defaultdict(lambda: (set(), set()))
+
+        for product_id, category_id, price, color_id, size_id, stock in variation_rows:
+            position = self.positions.get(product_id)
+            if position is None:
+                position = self.positions[product_id] = len(self.positions)
+                product_values["category"][category_id].add(position)
+                product_values["price"][price_bucket(price)].add(position)
+            all_positions, in_stock = pairs[(color_id, size_id)]
+            all_positions.add(position)
+            if stock > 0:
+                in_stock.add(position)
+
+        product_values["supplier"] = defaultdict(set)
+        for product_id, supplier_id in supplier_rows:
+            position = self.positions.get(product_id)
+            if position is not None:
+                product_values["supplier"][supplier_id].add(position)
+
+        size = len(self.positions)
+        self.all = (1 << size) - 1
+        self.products = {
+            name: {
+                value: _bitmap(positions, size)
+                for value, positions in values.items()
+                if value is not None
+            }
+            for name, values in product_values.items()
+        }
+        # (cor, tamanho, todos, em estoque)
+        self.pairs = [
+            (color_id, size_id, _bitmap(all_positions, size), _bitmap(in_stock, size))
+            for (color_id, size_id), (all_positions, in_stock) in pairs.items()
+        ]
+
+    @classmethod
+    def from_database(cls):
+        variation_rows = ProductVariation.active.order_by().values_list(
+            "product_id",
+            "product__category_id",
+            "product__selling_price",
+            "color_id",
+            "size_id",
+            "stock",
+        )
+        supplier_rows = ProductSupplier.objects.order_by().values_list(
+            "product_id", "supplier_id"
+        )
+        return cls(variation_rows, supplier_rows)
+
+    def product_ids_bitmap(self, product_ids):
+        return _bitmap(
+            (self.positions[pk] for pk in product_ids if pk in self.positions),
+            len(self.positions),
+        )
+
+    def _product_filter(self, name, values):
+        masks = self.products[name]
+        bitmap = 0
+        for value in values:
+            bitmap |= masks.get(value, 0)
+        return bitmap
+
+    def _variations(self, filters, in_stock, skip=None, group_by=None):
+        """
+        União dos pares que atendem aos filtros de cor/tamanho (exceto `skip`).
+        Com `group_by` ("color" ou "size"), devolve {valor: bitmap}.
+        """
+        color_ids = set(filters["color"]) if skip != "color" else set()
+        size_ids = set(filters["size"]) if skip != "size" else set()
+        grouped = defaultdict(int)
+        for color_id, size_id, all_products, in_stock_products in self.pairs:
+            if color_ids and color_id not in color_ids:
+                continue
+            if size_ids and size_id not in size_ids:
+                continue
+            key = color_id if group_by == "color" else size_id if group_by == "size" else None
+            grouped[key] |= in_stock_products if in_stock else all_products
+        return grouped if group_by else grouped.get(None, 0)
+
+    def counts(self, filters, products=None):
+        """
+        Contagens disjuntivas: {faceta: {valor: produtos}} e "in_stock": produtos.
+        `products` restringe o universo (bitmap da busca textual).
+        """
+        base = self.all if products is None else products
+        product_filters = {
+            name: self._product_filter(name, filters[name])
+            for name in ("category", "supplier", "price")
+            if filters[name]
+        }
+
+        def products_except(skip=None):
+            bitmap = base
+            for name, mask in product_filters.items():
+                if name != skip:
+                    bitmap &= mask
+            return bitmap
+
+        in_stock = filters["in_stock"]
+        variations = self._variations(filters, in_stock)
+        matching = products_except()
+
+        counts = {}
+        for name in ("category", "supplier", "price"):
+            universe = variations & products_except(name)
+            counts[name] = {
+                value: total
+                for value, mask in self.products[name].items()
+                if (total := (mask & universe).bit_count())
+            }
+        for name in ("color", "size"):
+            grouped = self._variations(filters, in_stock, skip=name, group_by=name)
+            counts[name] = {
+                value: total
+                for value, mask in grouped.items()
+                if (total := (mask & matching).bit_count())
+            }
+        counts["in_stock"] = (self._variations(filters, True) & matching).bit_count()
+        return counts
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_facet_index():
+    """
+    Retorna o índice do processo, refeito quando a versão do catálogo ou das
+    facetas mudou. Dentro de uma transação o índice montado não é guardado.
+    """
+    global _index, _index_version
+    version = (get_catalog_version(), get_facet_version())
+    with _lock:
+        if _index is not None and _index_version == version:
+            return _index
+
+    index = FacetIndex.from_database()
+    if not connection.in_atomic_block:
+        with _lock:
+            _index, _index_version = index, version
+    return index
+
+
+def count_facets(filters, query=""):
+    """Contagens das facetas para os filtros e a busca: {faceta: {valor: produtos}}."""
+    index = get_facet_index()
+    products = None
+    if query:
+        products = index.product_ids_bitmap(
+            search_product_ids(query).values_list("pk", flat=True)
+        )
+    return index.counts(filters, products)
+
+
+def _facet_options(name, counts, filters):
+    if name == "price":
+        options = [
+            {"id": index, "name": price_range_label(index), "count": counts.get(index, 0)}
+            for index in range(len(PRICE_RANGES))
+        ]
+    else:
+        reference = REFERENCES[name]
+        options = []
+        for pk, total in counts.items():
+            obj = reference.get(pk)
+            if obj is not None:
+                options.append({"id": pk, "name": obj.name, "count": total})
+        # Valores selecionados continuam visíveis mesmo sem resultados
+        for pk in filters[name]:
+            if pk not in counts and reference.get(pk) is not None:
+                options.append({"id": pk, "name": reference.get(pk).name, "count": 0})
+        options.sort(key=lambda option: option["name"])
+    for option in options:
+        option["selected"] = option["id"] in filters[name]
+    return options
+
+
+def get_facets(filters, query=""):
+    """
+    Facetas com contagens para os filtros atuais:
+    {"choices": [{"name", "label", "options": [{"id", "name", "count", "selected"}]}],
+     "in_stock": {"count", "selected"}}.
+    """
+    counts = count_facets(filters, query)
+    return {
+        "choices": [
+            {
+                "name": name,
+                "label": FACET_LABELS[name],
+                "options": _facet_options(name, counts[name], filters),
+            }
+            for name in CHOICE_FACETS
+        ],
+        "in_stock": {"count": counts["in_stock"], "selected": filters["in_stock"]},
+    }
@@ -1,24 +1,116 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.forms import (
     ModelForm,
+    ModelChoiceField,
     Textarea,
     inlineformset_factory,
     BaseInlineFormSet,
 )
+from django.forms.models import ModelChoiceIterator
+from django.utils import timezone
+from . import labels
+from .autocomplete import invalidate_catalog
+from .metrics import refresh_product_metrics
 from .models import (
+    PriceChange,
     Product,
     ProductSupplier,
     ProductVariation,
     Category,
     Supplier,
-    Color,
-    Size,
 )
+from .reference import colors as reference_colors, get_reference, sizes as reference_sizes
+from .search import refresh_search_documents
+from .services import allocate_skus
+from .utils import generate_sku_base
 
 # Classes do Tailwind CSS para estilização dos campos do formulário
 TAILWIND_CLASSES = "w-full border border-gray-300 rounded-lg py-2 px-4 bg-white focus:outline-none focus:ring-2 focus:ring-rose-400"
 
 
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.reference_choices():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.reference_choices()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.reference_choices())
+
+
+class ReferenceChoiceField(ModelChoiceField):
+    """
+    Select de Cor/Tamanho/Categoria/Fornecedor servido pelo cache de dados
+    de referência (product.reference), sem consultas por formulário.
+    Modelos com "is_active" oferecem apenas os registros ativos, além do
+    valor atual da instância em edição (`current_pk`), mesmo que inativo.
+    """
+
+    iterator = ReferenceChoiceIterator
+    current_pk = None
+
+    def __init__(self, queryset, **kwargs):
+        super().__init__(queryset, **kwargs)
+        self._restrict_queryset()
+
+    @property
+    def reference(self):
+        return get_reference(self.queryset.model)
+
+    def _restrict_queryset(self):
+        # O queryset (lazy, não consultado) segue o mesmo recorte das opções
+        if self.reference.has_active_flag:
+            condition = models.Q(is_active=True)
+            if self.current_pk is not None:
+                condition |= models.Q(pk=self.current_pk)
+            self.queryset = self.queryset.model._default_manager.filter(condition)
+
+    def set_current(self, pk):
+        """Aceita `pk` (valor atual da instância em edição) mesmo que inativo."""
+        self.current_pk = pk
+        self._restrict_queryset()
+
+    def reference_choices(self):
+        objects = self.reference.all(active_only=True)
+        if self.current_pk is not None and all(obj.pk != self.current_pk for obj in objects):
+            current = self.reference.get(self.current_pk)
+            if current is not None:
+                objects.append(current)
+        return objects
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            obj = self.reference.get(int(value))
+        except (ValueError, TypeError):
+            obj = None
+        if obj is None or (
+            self.reference.has_active_flag and not obj.is_active and obj.pk != self.current_pk
+        ):
+            raise ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return obj
+
+
+def keep_current_references(form):
+    """Mantém válidos nos ReferenceChoiceField os valores atuais da instância."""
+    for name, field in form.fields.items():
+        if isinstance(field, ReferenceChoiceField):
+            field.set_current(getattr(form.instance, f"{name}_id", None))
+
+
 # Formulário para o modelo Product
 class ProductForm(ModelForm):
     class Meta:
@@ -33,11 +125,12 @@ class ProductForm(ModelForm):
         widgets = {
             "description": Textarea(attrs={"rows": 4}),
         }
+        field_classes = {"category": ReferenceChoiceField}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.fields["category"].queryset = Category.objects.filter(is_active=True)
+        keep_current_references(self)
 
         for field_name, field in self.fields.items():
             # Pulamos checkboxes, pois eles são estilizados de forma diferente no HTML
@@ -52,12 +145,13 @@ class ProductSupplierForm(ModelForm):
     class Meta:
         model = ProductSupplier
         fields = ["supplier", "cost_price"]
+        field_classes = {"supplier": ReferenceChoiceField}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         # Lógica de Negócio
-        self.fields["supplier"].queryset = Supplier.objects.filter(is_active=True)
+        keep_current_references(self)
 
         # Lógica de Estilização
         for field_name, field in self.fields.items():
@@ -70,13 +164,13 @@ class ProductVariationForm(ModelForm):
     class Meta:
         model = ProductVariation
         fields = ["color", "size", "stock","minimum_stock", "is_active"]
+        field_classes = {"color": ReferenceChoiceField, "size": ReferenceChoiceField}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         # Lógica de Negócio
-        self.fields["color"].queryset = Color.objects.all()
-        self.fields["size"].queryset = Size.objects.filter(is_active=True)
+        keep_current_references(self)
 
         # Lógica de Estilização
         for field_name, field in self.fields.items():
@@ -85,30 +179,429 @@ class ProductVariationForm(ModelForm):
             field.widget.attrs["class"] = TAILWIND_CLASSES
 
 
-class BaseProductVariationInlineFormSet(BaseInlineFormSet):
+class BulkInlineFormMixin:
+    """
+    Formulário de um BulkInlineFormSet: as validações que consultam o banco
+    (existência das chaves estrangeiras e unicidade) ficam com o formset.
+
+    `form_validated_fields` lista campos cujos limites o próprio campo do
+    formulário já valida; ficam fora do full_clean do modelo, que faria um
+    SELECT por formulário para conferir as CheckConstraints.
+    """
+
+    form_validated_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # O valor inicial vem da instância; sem o input "initial-" oculto,
+        # has_changed() compara com o que está gravado
+        for field in self.fields.values():
+            field.show_hidden_initial = False
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        # Já validados contra o cache de referência pelo ReferenceChoiceField
+        exclude.update(
+            name
+            for name, field in self.fields.items()
+            if isinstance(field, ReferenceChoiceField)
+        )
+        exclude.update(self.form_validated_fields)
+        return exclude
+
+    def validate_unique(self):
+        # Conferida pelo formset em uma única consulta (BulkInlineFormSet.clean)
+        pass
+
+
+class LoadedObjectChoiceField(ModelChoiceField):
+    """Campo de id que resolve a linha entre os objetos já carregados pelo formset."""
+
+    def __init__(self, formset, *args, **kwargs):
+        self.formset = formset
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            return value
+        try:
+            obj = self.formset._existing_object(int(value))
+        except (ValueError, TypeError):
+            obj = None
+        if obj is None:
+            raise ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return obj
+
+
+class BulkInlineFormSet(BaseInlineFormSet):
+    """
+    Formset inline para produtos com muitas linhas.
+
+    - O id de cada linha é resolvido entre os objetos que o formset já
+      carregou, sem uma consulta por formulário.
+    - A unicidade (produto + `unique_key_fields`) é conferida em memória entre os
+      formulários e no banco em uma única consulta para o formset inteiro.
+    - Linhas sem alteração não são gravadas; as alteradas vão em um
+      bulk_update e as novas em um bulk_create.
+
+    bulk_update/bulk_create não disparam signals: ao final, o documento de
+    busca e as métricas do produto são recalculados uma única vez.
+    """
+
+    unique_key_fields = ()
+    unique_error = "Registro duplicado."
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        pk_name = self.model._meta.pk.name
+        field = form.fields[pk_name]
+        form.fields[pk_name] = LoadedObjectChoiceField(
+            self,
+            field.queryset,
+            initial=field.initial,
+            required=False,
+            widget=field.widget,
+        )
+
+    def _unique_key(self, form):
+        values = [form.cleaned_data.get(name) for name in self.unique_key_fields]
+        if any(value is None for value in values):
+            return None
+        return tuple(value.pk for value in values)
+
     def clean(self):
         super().clean()
-        variations_exist = set()
+        if not self.unique_key_fields:
+            return
+
+        forms_by_key = {}
         for form in self.forms:
-            if not form.is_valid() or form.cleaned_data.get("DELETE", False):
+            if not form.is_valid() or self._should_delete_form(form):
+                continue
+            key = self._unique_key(form)
+            if key is None:
+                continue
+            if key in forms_by_key:
+                form.add_error(None, self.unique_error)
+                continue
+            forms_by_key[key] = form
+
+        if self.instance.pk is None or not forms_by_key:
+            return
+
+        # Linhas do produto que não estão no formset (ex: criadas por outro
+        # usuário depois que a página foi aberta)
+        edited_pks = [form.instance.pk for form in self.initial_forms if form.instance.pk]
+        attnames = [f"{name}_id" for name in self.unique_key_fields]
+        conflicts = (
+            self.model._default_manager.filter(**{self.fk.name: self.instance})
+            .exclude(pk__in=edited_pks)
+            .order_by()
+            .values_list(*attnames)
+        )
+        for key in conflicts:
+            form = forms_by_key.get(tuple(key))
+            if form is not None:
+                form.add_error(None, self.unique_error)
+
+    def prepare_new_objects(self, objects):
+        """Gancho para completar as linhas novas antes do bulk_create."""
+
+    def after_save(self):
+        """Recalcula os dados derivados do produto após a gravação em lote."""
+        refresh_search_documents([self.instance.pk])
+        refresh_product_metrics([self.instance.pk])
+
+    def save(self, commit=True):
+        if not commit:
+            return super().save(commit=False)
+
+        self.new_objects = []
+        self.changed_objects = []
+        self.deleted_objects = []
+        model_fields = {field.name for field in self.model._meta.concrete_fields}
+        auto_now_fields = [
+            field.name
+            for field in self.model._meta.concrete_fields
+            if getattr(field, "auto_now", False)
+        ]
+        update_fields = set()
+        now = timezone.now()
+
+        for form in self.initial_forms:
+            obj = form.instance
+            if obj.pk is None:
+                continue
+            if self.can_delete and self._should_delete_form(form):
+                self.deleted_objects.append(obj)
+            elif form.has_changed():
+                changed = [name for name in form.changed_data if name in model_fields]
+                if not changed:
+                    continue
+                for name in auto_now_fields:
+                    setattr(obj, name, now)
+                update_fields.update(changed)
+                self.changed_objects.append((obj, changed))
+
+        for form in self.extra_forms:
+            if not form.has_changed() or (self.can_delete and self._should_delete_form(form)):
                 continue
-            color = form.cleaned_data.get("color")
-            size = form.cleaned_data.get("size")
-            if color and size:
-                variation_tuple = (color, size)
-                if variation_tuple in variations_exist:
-                    form.add_error(
-                        None,
-                        "Variações duplicadas (mesma cor e tamanho) não são permitidas.",
-                    )
-                variations_exist.add(variation_tuple)
+            setattr(form.instance, self.fk.name, self.instance)
+            self.new_objects.append(form.instance)
+
+        if not (self.new_objects or self.changed_objects or self.deleted_objects):
+            return []
+
+        with transaction.atomic():
+            if self.deleted_objects:
+                self.model._default_manager.filter(
+                    pk__in=[obj.pk for obj in self.deleted_objects]
+                ).delete()
+            if self.changed_objects:
+                self.model._default_manager.bulk_update(
+                    [obj for obj, _changed in self.changed_objects],
+                    [*update_fields, *auto_now_fields],
+                    batch_size=1000,
+                )
+            if self.new_objects:
+                self.prepare_new_objects(self.new_objects)
+                self.model._default_manager.bulk_create(self.new_objects, batch_size=1000)
+            self.after_save()
+
+        return [obj for obj, _changed in self.changed_objects] + self.new_objects
+
+
+class ProductSupplierInlineFormSet(BulkInlineFormSet):
+    unique_key_fields = ("supplier",)
+    unique_error = "Este fornecedor já está vinculado ao produto."
+
+
+class BaseProductVariationInlineFormSet(BulkInlineFormSet):
+    unique_key_fields = ("color", "size")
+    unique_error = "Variações duplicadas (mesma cor e tamanho) não são permitidas."
+
+    def prepare_new_objects(self, objects):
+        # SKUs gerados em memória, com uma consulta de colisão por rodada
+        skus = allocate_skus(
+            [
+                generate_sku_base(self.instance.name, obj.color.name, obj.size.name)
+                for obj in objects
+            ]
+        )
+        for obj, sku in zip(objects, skus):
+            obj.sku = sku
+
+    def after_save(self):
+        super().after_save()
+        invalidate_catalog()
+
+
+class ProductSupplierInlineForm(BulkInlineFormMixin, ProductSupplierForm):
+    pass
+
+
+class ProductVariationInlineForm(BulkInlineFormMixin, ProductVariationForm):
+    # min_value=0 no formulário (constraint "stock_non_negative")
+    form_validated_fields = ("stock", "minimum_stock")
+
+
+class VariationMatrixForm(forms.Form):
+    """Seleção de cores × tamanhos para gerar a grade de variações em lote."""
+
+    colors = forms.TypedMultipleChoiceField(
+        label="Cores", coerce=int, widget=forms.CheckboxSelectMultiple
+    )
+    sizes = forms.TypedMultipleChoiceField(
+        label="Tamanhos", coerce=int, widget=forms.CheckboxSelectMultiple
+    )
+    minimum_stock = forms.IntegerField(label="Estoque Mínimo", min_value=0, initial=0)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["colors"].choices = [
+            (color.pk, color.name) for color in reference_colors.all()
+        ]
+        self.fields["sizes"].choices = [
+            (size.pk, size.name) for size in reference_sizes.all(active_only=True)
+        ]
+        self.fields["minimum_stock"].widget.attrs["class"] = TAILWIND_CLASSES
+
+
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(
+        label="Arquivo",
+        help_text="CSV (separado por vírgula ou ponto e vírgula) ou XLSX, uma linha por variação.",
+        widget=forms.ClearableFileInput(attrs={"accept": ".csv,.xlsx"}),
+    )
+
+    def clean_file(self):
+        upload = self.cleaned_data["file"]
+        if not upload.name.lower().endswith((".csv", ".xlsx")):
+            raise ValidationError("Envie um arquivo .csv ou .xlsx.")
+        return upload
+
+
+class PriceChangeForm(ModelForm):
+    class Meta:
+        model = PriceChange
+        fields = [
+            "description",
+            "adjustment_type",
+            "value",
+            "round_to_90",
+            "category",
+            "supplier",
+            "query",
+            "effective_at",
+        ]
+        field_classes = {"category": ReferenceChoiceField, "supplier": ReferenceChoiceField}
+        widgets = {
+            "effective_at": forms.DateTimeInput(
+                attrs={"type": "datetime-local"}, format="%Y-%m-%dT%H:%M"
+            ),
+        }
+        help_texts = {
+            "effective_at": "Deixe em branco para aplicar agora.",
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["effective_at"].required = False
+        self.fields["category"].empty_label = "Todas as categorias"
+        self.fields["supplier"].empty_label = "Todos os fornecedores"
+
+        for field_name, field in self.fields.items():
+            if field.widget.__class__.__name__ == "CheckboxInput":
+                continue
+            field.widget.attrs["class"] = TAILWIND_CLASSES
+
+
+class LabelJobForm(forms.Form):
+    """Origem das variações e formato de saída de um lote de etiquetas."""
+
+    class Source(models.TextChoices):
+        RECEBIMENTO = "RECEBIMENTO", "Recebimento (entradas do fornecedor no dia)"
+        FILTRO = "FILTRO", "Filtro de produtos"
+        LISTA = "LISTA", "Lista de SKUs"
+
+    source = forms.ChoiceField(label="Origem", choices=Source.choices, initial=Source.RECEBIMENTO)
+    output_format = forms.ChoiceField(
+        label="Formato",
+        choices=[(labels.PDF, "PDF (folha A4, 3 × 8)"), (labels.ZPL, "ZPL (impressora Zebra)")],
+    )
+    symbology = forms.ChoiceField(
+        label="Código de barras",
+        choices=[(labels.CODE128, "Code128 (SKU)"), (labels.EAN13, "EAN-13 (código interno)")],
+    )
+    supplier = ReferenceChoiceField(
+        label="Fornecedor", queryset=Supplier.objects.all(), required=False
+    )
+    received_on = forms.DateField(
+        label="Data do recebimento",
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date"}, format="%Y-%m-%d"),
+    )
+    category = ReferenceChoiceField(
+        label="Categoria", queryset=Category.objects.all(), required=False
+    )
+    query = forms.CharField(label="Busca", required=False)
+    copies = forms.IntegerField(label="Cópias por variação", min_value=1, max_value=100, initial=1)
+    per_unit = forms.BooleanField(label="Uma etiqueta por unidade em estoque", required=False)
+    skus = forms.CharField(
+        label="SKUs",
+        required=False,
+        widget=Textarea(attrs={"rows": 6}),
+        help_text='Um SKU por linha, opcionalmente com a quantidade (ex: "VES-LON-AZ-M;3").',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["supplier"].empty_label = "Todos / selecione"
+        self.fields["category"].empty_label = "Todas as categorias"
+
+        for field_name, field in self.fields.items():
+            if field.widget.__class__.__name__ == "CheckboxInput":
+                continue
+            field.widget.attrs["class"] = TAILWIND_CLASSES
+
+    def _parse_skus(self, value, copies):
+        quantities = {}
+        for line_number, line in enumerate(value.splitlines(), 1):
+            sku, _, quantity = line.strip().partition(";")
+            sku = sku.strip()
+            if not sku:
+                continue
+            quantity = quantity.strip() or str(copies)
+            if not quantity.isdigit() or int(quantity) < 1:
+                raise ValidationError(f"Linha {line_number}: quantidade inválida ({quantity}).")
+            quantities[sku] = quantities.get(sku, 0) + int(quantity)
+        if not quantities:
+            raise ValidationError("Informe ao menos um SKU.")
+
+        found = set(
+            ProductVariation.objects.filter(sku__in=quantities).values_list("sku", flat=True)
+        )
+        missing = [sku for sku in quantities if sku not in found]
+        if missing:
+            raise ValidationError(f"SKU(s) não encontrado(s): {', '.join(missing[:10])}.")
+        return quantities
+
+    def clean(self):
+        cleaned_data = super().clean()
+        source = cleaned_data.get("source")
+
+        if source == self.Source.RECEBIMENTO:
+            if cleaned_data.get("supplier") is None:
+                self.add_error("supplier", "Informe o fornecedor do recebimento.")
+            if cleaned_data.get("received_on") is None:
+                self.add_error("received_on", "Informe a data do recebimento.")
+        elif source == self.Source.LISTA and cleaned_data.get("copies"):
+            try:
+                cleaned_data["quantities"] = self._parse_skus(
+                    cleaned_data.get("skus", ""), cleaned_data["copies"]
+                )
+            except ValidationError as e:
+                self.add_error("skus", e)
+
+        if not self.errors:
+            invalid = labels.invalid_barcodes(self.get_variations(), cleaned_data["symbology"])
+            if invalid:
+                self.add_error(
+                    "symbology",
+                    "Não é possível gerar o código de barras do(s) SKU(s): "
+                    f"{', '.join(invalid)}. Corrija o SKU ou use o EAN-13 interno.",
+                )
+        return cleaned_data
+
+    def get_variations(self):
+        """Queryset das variações anotado com o número de cópias (label_copies)."""
+        data = self.cleaned_data
+        source = data["source"]
+        if source == self.Source.RECEBIMENTO:
+            return labels.receipt_variations(data["supplier"], data["received_on"])
+        if source == self.Source.LISTA:
+            return labels.listed_variations(data["quantities"])
+        return labels.filtered_variations(
+            category=data["category"],
+            supplier=data["supplier"],
+            query=data["query"].strip(),
+            copies=data["copies"],
+            per_unit=data["per_unit"],
+        )
 
 
 # Formsets para gerenciar múltiplos fornecedores e variações de produtos
 ProductSupplierFormSet = inlineformset_factory(
     parent_model=Product,
     model=ProductSupplier,
-    form=ProductSupplierForm,
+    form=ProductSupplierInlineForm,
+    formset=ProductSupplierInlineFormSet,
     extra=0,
     can_delete=True,
     min_num=1,
@@ -118,7 +611,7 @@ ProductSupplierFormSet = inlineformset_factory(
 ProductVariationFormSet = inlineformset_factory(
     parent_model=Product,
     model=ProductVariation,
-    form=ProductVariationForm,
+    form=ProductVariationInlineForm,
     formset=BaseProductVariationInlineFormSet,
     extra=0,
     can_delete=True,
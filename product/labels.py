@@ -0,0 +1,448 @@
+# product/labels.py
+"""
+Etiquetas de preço com código de barras, em lote.
+
+As variações vêm de um recebimento (entradas de um fornecedor em um dia,
+uma etiqueta por unidade recebida), de um filtro de produtos (categoria,
+fornecedor e/ou busca) ou de uma lista de SKUs. A saída é gerada sob
+demanda, etiqueta a etiqueta:
+
+- ZPL: um formato por variação, com ^PQ para as cópias; o código de barras
+  é desenhado pela própria impressora (^BC / ^BE);
+- PDF: folhas A4 com 3 × 8 etiquetas, montadas uma página por vez e
+  enviadas à medida que ficam prontas. As barras são retângulos; o desenho
+  de cada código fica em cache (lru_cache) e é reposicionado com "cm".
+
+Code128 codifica o SKU. EAN-13 usa um código interno derivado do id da
+variação, com prefixo 2 (faixa GS1 de uso restrito à loja).
+"""
+from functools import lru_cache
+from itertools import repeat
+
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+
+from stock.models import StockMovement
+
+from .autocomplete import NOT_APPLICABLE
+from .models import ProductVariation
+from .pricing import matching_products
+
+ZPL = "zpl"
+PDF = "pdf"
+FORMATS = (ZPL, PDF)
+
+CODE128 = "code128"
+EAN13 = "ean13"
+SYMBOLOGIES = (CODE128, EAN13)
+
+# Prefixo EAN de uso interno (GS1: 200-299 para circulação restrita)
+EAN_INTERNAL_PREFIX = "2"
+
+
+class BarcodeError(ValueError):
+    """Valor que não pode ser representado no código de barras escolhido."""
+
+
+# Code128: larguras (barra, espaço, ...) de cada símbolo, em módulos
+CODE128_WIDTHS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312",
+    "132212", "221213", "221312", "231212", "112232", "122132", "122231", "113222",
+    "123122", "123221", "223211", "221132", "221231", "213212", "223112", "312131",
+    "311222", "321122", "321221", "312212", "322112", "322211", "212123", "212321",
+    "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121",
+    "313121", "211331", "231131", "213113", "213311", "213131", "311123", "311321",
+    "331121", "312113", "312311", "332111", "314111", "221411", "431111", "111224",
+    "111422", "121124", "121421", "141122", "141221", "112214", "112412", "122114",
+    "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112",
+    "421211", "212141", "214121", "412121", "111143", "111341", "131141", "114113",
+    "114311", "411113", "411311", "113141", "114131", "311141", "411131", "211412",
+    "211214", "211232",
+)
+CODE128_START_B = 104
+CODE128_START_C = 105
+CODE128_STOP = "2331112"
+
+# EAN-13: padrões L (os G são os R espelhados, os R são os L invertidos)
+EAN_L = ("0001101", "0011001", "0010011", "0111101", "0100011",
+         "0110001", "0101111", "0111011", "0110111", "0001011")
+EAN_PARITY = ("LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+              "LGGLLG", "LGGGLL", "LGLGLL", "LGLGGL", "LGGLGL")
+
+
+# Códigos de barras
+def _widths_to_modules(widths):
+    return "".join(
+        ("1" if position % 2 == 0 else "0") * int(width)
+        for position, width in enumerate(widths)
+    )
+
+
+@lru_cache(maxsize=4096)
+def code128_modules(value):
+    """
+    Módulos ("1" barra, "0" espaço) do Code128 de `value`: subconjunto C
+    para valores só com dígitos (em pares), B para os demais (ASCII).
+    """
+    if not value:
+        raise BarcodeError("Informe um valor para o código de barras.")
+    if value.isdigit() and len(value) % 2 == 0:
+        codes = [CODE128_START_C] + [int(value[i:i + 2]) for i in range(0, len(value), 2)]
+    else:
+        if any(not 32 <= ord(char) <= 126 for char in value):
+            raise BarcodeError(f"Code128 aceita apenas caracteres ASCII: {value!r}.")
+        codes = [CODE128_START_B] + [ord(char) - 32 for char in value]
+
+    checksum = (codes[0] + sum(position * code for position, code in enumerate(codes[1:], 1))) % 103
+    codes.append(checksum)
+    return "".join(_widths_to_modules(CODE128_WIDTHS[code]) for code in codes) + (
+        _widths_to_modules(CODE128_STOP)
+    )
+
+
+def ean13_check_digit(digits):
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(digits))
+    return str((10 - total % 10) % 10)
+
+
+def internal_ean13(variation_id):
+    """EAN-13 interno da variação: prefixo 2 + id com 11 dígitos + dígito verificador."""
+    digits = f"{EAN_INTERNAL_PREFIX}{variation_id:011d}"
+    if len(digits) != 12:
+        raise BarcodeError(f"Id {variation_id} não cabe em um EAN-13 interno.")
+    return digits + ean13_check_digit(digits)
+
+
+def variation_id_from_ean13(code):
+    """Id da variação de um EAN-13 interno válido; None para outros códigos."""
+    if (
+        len(code) == 13
+        and code.isdigit()
+        and code.startswith(EAN_INTERNAL_PREFIX)
+        and ean13_check_digit(code[:12]) == code[12]
+    ):
+        return int(code[1:12])
+    return None
+
+
+@lru_cache(maxsize=4096)
+def ean13_modules(code):
+    """Os 95 módulos do EAN-13 (guardas incluídas) de um código com 13 dígitos."""
+    if len(code) != 13 or not code.isdigit() or ean13_check_digit(code[:12]) != code[12]:
+        raise BarcodeError(f"EAN-13 inválido: {code!r}.")
+    left = []
+    for digit, parity in zip(code[1:7], EAN_PARITY[int(code[0])]):
+        pattern = EAN_L[int(digit)]
+        if parity == "G":
+            pattern = "".join("1" if bit == "0" else "0" for bit in pattern)[::-1]
+        left.append(pattern)
+    right = ["".join("1" if bit == "0" else "0" for bit in EAN_L[int(digit)]) for digit in code[7:]]
+    return "101" + "".join(left) + "01010" + "".join(right) + "101"
+
+
+def barcode_value(label, symbology):
+    return label["ean13"] if symbology == EAN13 else label["sku"]
+
+
+def barcode_modules(value, symbology):
+    return ean13_modules(value) if symbology == EAN13 else code128_modules(value)
+
+
+def invalid_barcodes(variations, symbology, limit=10):
+    """
+    SKUs das variações que não geram o código de barras (Code128 só aceita
+    ASCII imprimível; o EAN-13 interno só cabe ids com até 11 dígitos).
+    Conferido antes do streaming: um erro no meio do arquivo o truncaria.
+    """
+    variations = variations.filter(label_copies__gt=0)
+    if symbology == EAN13:
+        invalid = variations.filter(pk__gt=10**11 - 1)
+    else:
+        invalid = variations.filter(Q(sku="") | Q(sku__regex=r"[^ -~]"))
+    return list(invalid.order_by("sku").values_list("sku", flat=True)[:limit])
+
+
+# Origem das etiquetas
+def receipt_variations(supplier, received_on):
+    """Variações recebidas do fornecedor no dia, com uma etiqueta por unidade."""
+    entries = StockMovement.objects.filter(
+        movement_type=StockMovement.MovementType.ENTRADA,
+        supplier=supplier,
+        movement_date__date=received_on,
+    )
+    received = (
+        entries.filter(product_variation=OuterRef("pk"))
+        .order_by()
+        .values("product_variation")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    return ProductVariation.objects.filter(
+        pk__in=entries.values("product_variation_id")
+    ).annotate(label_copies=Subquery(received, output_field=IntegerField()))
+
+
+def filtered_variations(category=None, supplier=None, query="", copies=1, per_unit=False):
+    """
+    Variações ativas dos produtos filtrados. Com `per_unit`, uma etiqueta
+    por unidade em estoque (ex: remarcação depois de um reajuste).
+    """
+    variations = ProductVariation.active.filter(
+        product__in=matching_products(category=category, supplier=supplier, query=query)
+    )
+    if per_unit:
+        return variations.filter(stock__gt=0).annotate(label_copies=F("stock"))
+    return variations.annotate(label_copies=Value(copies, output_field=IntegerField()))
+
+
+def listed_variations(quantities):
+    """Variações de uma lista {sku: cópias}."""
+    return ProductVariation.objects.filter(sku__in=quantities).annotate(
+        label_copies=Case(
+            *(When(sku=sku, then=Value(copies)) for sku, copies in quantities.items()),
+            output_field=IntegerField(),
+        )
+    )
+
+
+def _details(color, size):
+    return " / ".join(
+        name for name in (color, size) if name and name.upper() != NOT_APPLICABLE
+    )
+
+
+def format_price(price):
+    return f"R$ {price:.2f}".replace(".", ",")
+
+
+def iter_label_items(variations, chunk_size=1000):
+    """
+    Gera um dicionário por variação (anotada com `label_copies`), lendo o
+    banco em blocos pelo cursor do lado do servidor.
+    """
+    rows = variations.values_list(
+        "pk",
+        "sku",
+        "product__name",
+        "color__name",
+        "size__name",
+        "product__selling_price",
+        "label_copies",
+    ).order_by("product__name", "color__name", "size__name", "pk")
+
+    for pk, sku, name, color, size, price, copies in rows.iterator(chunk_size=chunk_size):
+        if not copies:
+            continue
+        yield {
+            "sku": sku,
+            "ean13": internal_ean13(pk),
+            "name": name,
+            "details": _details(color, size),
+            "price": format_price(price),
+            "copies": copies,
+        }
+
+
+# ZPL (203 dpi, etiqueta de 50 × 30 mm)
+ZPL_WIDTH = 400
+ZPL_HEIGHT = 240
+ZPL_MARGIN = 16
+
+
+def _zpl_text(value):
+    # ^ e ~ iniciam comandos ZPL
+    return value.replace("^", " ").replace("~", " ")
+
+
+@lru_cache(maxsize=4096)
+def zpl_barcode(value, symbology):
+    """Comando do código de barras, com a largura do módulo que cabe na etiqueta."""
+    modules = len(barcode_modules(value, symbology))
+    module_width = max(1, min(3, (ZPL_WIDTH - 2 * ZPL_MARGIN) // modules))
+    if symbology == EAN13:
+        # A impressora calcula o dígito verificador
+        return f"^FO{ZPL_MARGIN},110^BY{module_width}^BEN,80,Y,N^FD{value[:12]}^FS"
+    return f"^FO{ZPL_MARGIN},110^BY{module_width}^BCN,80,Y,N,N^FD{_zpl_text(value)}^FS"
+
+
+def iter_labels_zpl(labels, symbology=CODE128):
+    """Gera um formato ZPL por variação; as cópias saem pelo ^PQ."""
+    text_width = ZPL_WIDTH - 2 * ZPL_MARGIN
+    for label in labels:
+        yield (
+            f"^XA^CI28^PW{ZPL_WIDTH}^LL{ZPL_HEIGHT}"
+            f"^FO{ZPL_MARGIN},12^A0N,26,26^FB{text_width},1,0,L^FD{_zpl_text(label['name'])}^FS"
+            f"^FO{ZPL_MARGIN},42^A0N,22,22^FB{text_width},1,0,L^FD{_zpl_text(label['details'])}^FS"
+            f"^FO{ZPL_MARGIN},68^A0N,34,34^FB{text_width},1,0,R^FD{label['price']}^FS"
+            f"{zpl_barcode(barcode_value(label, symbology), symbology)}"
+            f"^PQ{label['copies']}^XZ\n"
+        )
+
+
+# PDF (A4, 3 × 8 etiquetas)
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+LABEL_COLUMNS = 3
+LABEL_ROWS = 8
+LABEL_WIDTH = PAGE_WIDTH / LABEL_COLUMNS
+LABEL_HEIGHT = PAGE_HEIGHT / LABEL_ROWS
+LABEL_PADDING = 8
+BARCODE_HEIGHT = 36
+MAX_NAME_LENGTH = 36
+
+
+def _pdf_text(value, limit=None):
+    if limit and len(value) > limit:
+        value = value[: limit - 3] + "..."
+    encoded = value.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+@lru_cache(maxsize=4096)
+def pdf_barcode(value, symbology):
+    """
+    Desenho das barras (retângulos a partir da origem) e largura ocupada.
+    Cada barra contínua vira um único retângulo.
+    """
+    modules = barcode_modules(value, symbology)
+    module_width = min(1.0, (LABEL_WIDTH - 2 * LABEL_PADDING) / len(modules))
+    ops = []
+    start = None
+    for position, bit in enumerate(modules + "0"):
+        if bit == "1" and start is None:
+            start = position
+        elif bit == "0" and start is not None:
+            ops.append(
+                b"%.2f 0 %.2f %d re\n"
+                % (start * module_width, (position - start) * module_width, BARCODE_HEIGHT)
+            )
+            start = None
+    return b"".join(ops) + b"f\n", len(modules) * module_width
+
+
+def _pdf_label(label, symbology, x, y):
+    value = barcode_value(label, symbology)
+    barcode, barcode_width = pdf_barcode(value, symbology)
+    left = x + LABEL_PADDING
+    top = y + LABEL_HEIGHT - LABEL_PADDING
+    return b"".join(
+        (
+            b"BT /F2 9 Tf %.2f %.2f Td (%s) Tj ET\n" % (left, top - 9, _pdf_text(label["name"], MAX_NAME_LENGTH)),
+            b"BT /F1 8 Tf %.2f %.2f Td (%s) Tj ET\n" % (left, top - 20, _pdf_text(label["details"], MAX_NAME_LENGTH)),
+            b"BT /F2 13 Tf %.2f %.2f Td (%s) Tj ET\n" % (left, top - 36, _pdf_text(label["price"])),
+            b"q 1 0 0 1 %.2f %.2f cm\n" % (x + (LABEL_WIDTH - barcode_width) / 2, y + 18),
+            barcode,
+            b"Q\n",
+            b"BT /F1 7 Tf %.2f %.2f Td (%s) Tj ET\n" % (left, y + 8, _pdf_text(value)),
+        )
+    )
+
+
+class _PdfWriter:
+    """
+    PDF mínimo escrito em sequência: cada objeto sai assim que fica pronto
+    e só os offsets (para a tabela xref) e os ids das páginas ficam em memória.
+    O objeto 2 (árvore de páginas) é o último a ser gravado.
+    """
+
+    CATALOG, PAGES, FONT, FONT_BOLD = 1, 2, 3, 4
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.next_id = 5
+        self.page_ids = []
+
+    def _write(self, data):
+        self.offset += len(data)
+        return data
+
+    def _object(self, object_id, body):
+        self.offsets[object_id] = self.offset
+        return self._write(b"%d 0 obj\n%s\nendobj\n" % (object_id, body))
+
+    def _new_id(self):
+        object_id = self.next_id
+        self.next_id += 1
+        return object_id
+
+    def start(self):
+        font = b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+        return b"".join(
+            (
+                self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"),
+                self._object(self.CATALOG, b"<< /Type /Catalog /Pages 2 0 R >>"),
+                self._object(self.FONT, font % b"Helvetica"),
+                self._object(self.FONT_BOLD, font % b"Helvetica-Bold"),
+            )
+        )
+
+    def page(self, content):
+        content_id = self._new_id()
+        page_id = self._new_id()
+        self.page_ids.append(page_id)
+        return self._object(
+            content_id,
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        ) + self._object(
+            page_id,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_id),
+        )
+
+    def finish(self):
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        pages = self._object(
+            self.PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids))
+        )
+        xref_offset = self.offset
+        size = self.next_id
+        xref = [b"xref\n0 %d\n0000000000 65535 f \n" % size]
+        xref.extend(b"%010d 00000 n \n" % self.offsets[object_id] for object_id in range(1, size))
+        xref.append(
+            b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_offset)
+        )
+        return pages + self._write(b"".join(xref))
+
+
+def expand_copies(labels):
+    """Repete cada etiqueta pelo número de cópias, sem montar a lista inteira."""
+    for label in labels:
+        yield from repeat(label, label["copies"])
+
+
+def iter_labels_pdf(labels, symbology=CODE128):
+    """Gera o PDF página a página (3 colunas × 8 linhas por folha A4)."""
+    writer = _PdfWriter()
+    yield writer.start()
+
+    per_page = LABEL_COLUMNS * LABEL_ROWS
+    content = []
+    for label in expand_copies(labels):
+        slot = len(content)
+        column, row = slot % LABEL_COLUMNS, slot // LABEL_COLUMNS
+        content.append(
+            _pdf_label(
+                label,
+                symbology,
+                column * LABEL_WIDTH,
+                PAGE_HEIGHT - (row + 1) * LABEL_HEIGHT,
+            )
+        )
+        if len(content) == per_page:
+            yield writer.page(b"".join(content))
+            content = []
+
+    # Um PDF sem páginas não abre nos visualizadores
+    if content or not writer.page_ids:
+        yield writer.page(b"".join(content))
+    yield writer.finish()
+
+
+def iter_labels(variations, output_format=PDF, symbology=CODE128):
+    labels = iter_label_items(variations)
+    if output_format == ZPL:
+        return iter_labels_zpl(labels, symbology)
+    return iter_labels_pdf(labels, symbology)
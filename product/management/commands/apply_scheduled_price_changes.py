@@ -0,0 +1,19 @@
+# product/management/commands/apply_scheduled_price_changes.py
+from django.core.management.base import BaseCommand
+
+from product.pricing import apply_due_price_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Aplica os reajustes de preço agendados cuja vigência já chegou. "
+        "Indicado para execução periódica (ex: cron a cada 15 minutos)."
+    )
+
+    def handle(self, *args, **options):
+        applied = apply_due_price_changes()
+        for price_change, affected in applied:
+            self.stdout.write(f"{price_change}: {affected} produto(s) alterado(s).")
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {len(applied)} reajuste(s) agendado(s) aplicado(s).")
+        )
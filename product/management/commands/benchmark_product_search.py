@@ -0,0 +1,127 @@
+# product/management/commands/benchmark_product_search.py
+import random
+import string
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from product.metrics import computed_metrics, refresh_product_metrics
+from product.models import Category, Color, Product, ProductVariation, Size
+from product.search import refresh_search_documents
+from product.services import get_filtered_products
+
+
+class _Rollback(Exception):
+    """Desfaz os dados gerados para o benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a busca da listagem de produtos (icontains com joins vs. "
+        "documento de busca) em um catálogo sintético. Nada é gravado."
+    )
+
+    WORDS = [
+        "vestido", "sutiã", "calça", "blusa", "camisola", "macacão", "body",
+        "amamentação", "gestante", "pós-parto", "algodão", "renda", "canelado",
+        "longo", "curto", "básico", "estampado", "listrado", "conforto", "maternidade",
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--products",
+            type=int,
+            default=100_000,
+            help="Quantidade de produtos sintéticos (padrão: 100000)",
+        )
+        parser.add_argument(
+            "--queries",
+            nargs="*",
+            default=["vestido", "amamentacao", "SUT-", "renda longo", "zzz"],
+            help="Termos de busca medidos",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Repetições por termo (padrão: 3)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._populate(options["products"])
+                for query in options["queries"]:
+                    legacy = self._measure(self._legacy_search, query, options["repeat"])
+                    current = self._measure(self._current_search, query, options["repeat"])
+                    self.stdout.write(
+                        f"{query!r:>16}: legado {legacy * 1000:8.1f} ms | "
+                        f"documento {current * 1000:8.1f} ms"
+                    )
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write(self.style.SUCCESS("✅ Benchmark concluído (dados descartados)."))
+
+    def _populate(self, total):
+        self.stdout.write(f"📦 Gerando {total} produtos sintéticos...")
+        categories = [
+            Category.objects.create(name=f"Benchmark Categoria {i}") for i in range(20)
+        ]
+        color = Color.objects.create(name="Benchmark Cor")
+        size = Size.objects.create(name="Benchmark Tamanho")
+
+        batch_size = 5000
+        for start in range(0, total, batch_size):
+            products = Product.objects.bulk_create(
+                [
+                    Product(
+                        name=f"{' '.join(random.sample(self.WORDS, 3))} {i}",
+                        selling_price=Decimal(random.randint(30, 300)),
+                        category=random.choice(categories),
+                    )
+                    for i in range(start, min(start + batch_size, total))
+                ]
+            )
+            ProductVariation.objects.bulk_create(
+                [
+                    ProductVariation(
+                        product=product,
+                        color=color,
+                        size=size,
+                        stock=random.randint(0, 50),
+                        sku=f"{product.name[:3].upper()}-{''.join(random.choices(string.ascii_uppercase, k=8))}",
+                    )
+                    for product in products
+                ]
+            )
+            refresh_search_documents([product.pk for product in products])
+            refresh_product_metrics([product.pk for product in products])
+
+    def _measure(self, search, query, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            search(query)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def _legacy_search(self, query):
+        """Reproduz a busca anterior: quatro icontains com joins e .distinct()."""
+        products = (
+            computed_metrics(Product.objects.all())
+            .filter(
+                Q(name__icontains=query)
+                | Q(category__name__icontains=query)
+                | Q(variations__sku__icontains=query)
+                | Q(suppliers__name__icontains=query)
+            )
+            .distinct()
+            .order_by("name")
+        )
+        products.count()
+        list(products[:10])
+
+    def _current_search(self, query):
+        result = get_filtered_products(query=query)
+        list(result["products"])
@@ -0,0 +1,55 @@
+# product/management/commands/export_catalog.py
+from django.core.management.base import BaseCommand, CommandError
+
+from product.catalog import (
+    FORMATS,
+    XLSX,
+    CatalogFormatError,
+    detect_format,
+    iter_catalog_csv,
+    iter_catalog_rows,
+    write_catalog_xlsx,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta o catálogo (uma linha por variação, com custos de "
+        "fornecedores e estoque) em CSV ou XLSX, lendo com cursor do lado "
+        "do servidor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="Arquivo de saída (padrão: saída padrão, apenas CSV)",
+        )
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Formato do arquivo (padrão: pela extensão de --output ou CSV)",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        file_format = options["format"] or detect_format(output)
+        rows = iter_catalog_rows()
+
+        if file_format == XLSX:
+            if output == "-":
+                raise CommandError("Informe --output para exportar em XLSX.")
+            try:
+                write_catalog_xlsx(rows, output)
+            except CatalogFormatError as e:
+                raise CommandError(str(e))
+        elif output == "-":
+            for chunk in iter_catalog_csv(rows):
+                self.stdout.write(chunk, ending="")
+        else:
+            with open(output, "w", encoding="utf-8", newline="") as file:
+                for chunk in iter_catalog_csv(rows):
+                    file.write(chunk)
+
+        if output != "-":
+            self.stdout.write(self.style.SUCCESS(f"✅ Catálogo exportado em {output}."))
@@ -0,0 +1,70 @@
+# product/management/commands/import_catalog.py
+from django.core.management.base import BaseCommand, CommandError
+
+from product.catalog import (
+    FORMATS,
+    CatalogFormatError,
+    detect_format,
+    import_catalog,
+)
+from user.models import UserGesthar
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa produtos, variações, custos de fornecedores e estoque de um "
+        "arquivo CSV ou XLSX, gravando em lotes. Linhas com erro são "
+        "reportadas sem interromper a importação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo .csv ou .xlsx")
+        parser.add_argument(
+            "--user",
+            required=True,
+            help="E-mail do usuário responsável pelos ajustes de estoque",
+        )
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Formato do arquivo (padrão: pela extensão)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Linhas gravadas por lote (padrão: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = UserGesthar.objects.get(email=options["user"])
+        except UserGesthar.DoesNotExist:
+            raise CommandError(f"Usuário não encontrado: {options['user']}")
+
+        file_format = options["format"] or detect_format(options["path"])
+        try:
+            with open(options["path"], "rb") as file:
+                result = import_catalog(
+                    file, user, file_format=file_format, batch_size=options["batch_size"]
+                )
+        except (OSError, CatalogFormatError) as e:
+            raise CommandError(str(e))
+
+        for line, message in result.errors:
+            self.stderr.write(f"Linha {line}: {message}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(
+                f"... e mais {result.error_count - len(result.errors)} erro(s)."
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {result.imported_rows} de {result.rows} linha(s) importada(s): "
+                f"{result.created_products} produto(s) criado(s), "
+                f"{result.updated_products} atualizado(s); "
+                f"{result.created_variations} variação(ões) criada(s), "
+                f"{result.updated_variations} atualizada(s); "
+                f"{result.stock_adjustments} ajuste(s) de estoque."
+            )
+        )
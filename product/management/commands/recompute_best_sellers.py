@@ -0,0 +1,24 @@
+# product/management/commands/recompute_best_sellers.py
+from django.core.management.base import BaseCommand
+
+from product.best_sellers import recompute_best_sellers
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula os contadores de mais vendidos (janela de 30 dias) a partir "
+        "das vendas concluídas. Indicado para execução noturna (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recalcula também o total de unidades vendidas de todas as variações",
+        )
+
+    def handle(self, *args, **options):
+        updated = recompute_best_sellers(full=options["full"])
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Contadores de {updated} variação(ões) recalculados.")
+        )
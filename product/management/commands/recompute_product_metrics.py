@@ -0,0 +1,38 @@
+# product/management/commands/recompute_product_metrics.py
+from django.core.management.base import BaseCommand
+
+from product.metrics import refresh_product_metrics
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula em lotes as métricas desnormalizadas dos produtos "
+        "(estoque total, variações ativas, custo médio e margem)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de produtos recalculados por lote (padrão: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = 0
+        total = 0
+
+        while True:
+            ids = list(
+                Product.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_pk = ids[-1]
+            total += len(refresh_product_metrics(ids, batch_size=batch_size))
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Métricas de {total} produtos recalculadas."))
@@ -0,0 +1,27 @@
+# product/management/commands/refresh_recommendations.py
+from django.core.management.base import BaseCommand
+
+from product.recommendations import refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Atualiza as recomendações \"comprados juntos\" com as vendas concluídas "
+        "ou canceladas desde a última execução. Indicado para execução periódica (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Descarta a matriz de coocorrência e reprocessa todas as vendas",
+        )
+
+    def handle(self, *args, **options):
+        result = refresh_recommendations(full=options["full"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {result['baskets']} venda(s) processada(s); "
+                f"recomendações de {result['products']} produto(s) atualizadas."
+            )
+        )
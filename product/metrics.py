@@ -0,0 +1,93 @@
+# product/metrics.py
+"""
+Métricas desnormalizadas do produto (estoque total, variações ativas, custo
+médio e margem de lucro), gravadas em colunas de Product para que a listagem
+não precise agregar variações e fornecedores a cada página.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Avg, Count, DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Product, ProductSupplier
+
+METRIC_FIELDS = ["total_stock", "active_variation_count", "average_cost", "profit_margin"]
+
+TWO_PLACES = Decimal("0.01")
+
+# Menor valor da coluna profit_margin (max_digits=7): custo muito acima do
+# preço (ex: preço 0,01 e custo 50,00) passaria desse limite
+MIN_PROFIT_MARGIN = Decimal("-99999.99")
+
+
+def calculate_profit_margin(selling_price, average_cost):
+    """
+    Margem de lucro (%) sobre o preço de venda; 0 quando não há preço.
+    Limitada a MIN_PROFIT_MARGIN, o menor valor que a coluna comporta.
+    """
+    selling_price = Decimal(selling_price or 0)
+    if selling_price <= 0:
+        return Decimal("0.00")
+    margin = (selling_price - Decimal(average_cost or 0)) * 100 / selling_price
+    return max(margin.quantize(TWO_PLACES, rounding=ROUND_HALF_UP), MIN_PROFIT_MARGIN)
+
+
+def computed_metrics(queryset):
+    """
+    Anota as métricas calculadas a partir das tabelas de origem, em uma
+    única consulta agrupada.
+    """
+    avg_cost_subquery = (
+        ProductSupplier.objects.filter(product=OuterRef("pk"))
+        .values("product")
+        .annotate(avg_cost=Avg("cost_price"))
+        .values("avg_cost")
+    )
+    active = Q(variations__is_active=True)
+    return queryset.annotate(
+        computed_total_stock=Coalesce(Sum("variations__stock", filter=active), Value(0)),
+        computed_variation_count=Count("variations", filter=active),
+        computed_average_cost=Coalesce(
+            Subquery(
+                avg_cost_subquery,
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+            Value(0, output_field=DecimalField(max_digits=10, decimal_places=2)),
+        ),
+    ).order_by()
+
+
+def refresh_product_metrics(product_ids, batch_size=1000):
+    """
+    Recalcula e grava as métricas dos produtos informados.
+    Retorna {product_id: {campo: valor}} com os valores gravados.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+
+    rows = computed_metrics(Product.objects.filter(pk__in=product_ids)).values(
+        "pk",
+        "selling_price",
+        "computed_total_stock",
+        "computed_variation_count",
+        "computed_average_cost",
+    )
+
+    products = []
+    metrics = {}
+    for row in rows:
+        average_cost = Decimal(row["computed_average_cost"]).quantize(
+            TWO_PLACES, rounding=ROUND_HALF_UP
+        )
+        values = {
+            "total_stock": row["computed_total_stock"],
+            "active_variation_count": row["computed_variation_count"],
+            "average_cost": average_cost,
+            "profit_margin": calculate_profit_margin(row["selling_price"], average_cost),
+        }
+        metrics[row["pk"]] = values
+        products.append(Product(pk=row["pk"], **values))
+
+    Product.objects.bulk_update(products, METRIC_FIELDS, batch_size=batch_size)
+    return metrics
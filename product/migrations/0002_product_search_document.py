@@ -0,0 +1,83 @@
+# Generated by Django 4.2 on 2026-10-19 04:59
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+from product.utils import normalize_search_text
+
+
+def backfill_search_documents(apps, schema_editor):
+    """Preenche o documento de busca dos produtos existentes, em lotes."""
+    Product = apps.get_model("product", "Product")
+    batch_size = 1000
+    last_pk = 0
+
+    while True:
+        rows = list(
+            Product.objects.filter(pk__gt=last_pk)
+            .annotate(
+                skus=ArrayAgg("variations__sku", distinct=True, default=[]),
+                supplier_names=ArrayAgg("suppliers__name", distinct=True, default=[]),
+            )
+            .values("pk", "name", "category__name", "skus", "supplier_names")
+            .order_by("pk")[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1]["pk"]
+
+        products = []
+        for row in rows:
+            parts = [row["name"], row["category__name"], *row["skus"], *row["supplier_names"]]
+            document = " | ".join(normalize_search_text(part) for part in parts if part)
+            products.append(Product(pk=row["pk"], search_document=document))
+        Product.objects.bulk_update(products, ["search_document"])
+
+    Product.objects.update(search_vector=SearchVector("search_document", config="simple"))
+
+
+# O índice de trigramas (LIKE '%termo%' no documento) depende da extensão
+# pg_trgm; em bancos sem a extensão disponível a busca continua correta,
+# apenas sem esse índice.
+CREATE_TRIGRAM_INDEX = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS product_search_document_trgm_idx
+            ON product_product USING gin (search_document gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+DROP_TRIGRAM_INDEX = "DROP INDEX IF EXISTS product_search_document_trgm_idx;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunSQL(CREATE_TRIGRAM_INDEX, DROP_TRIGRAM_INDEX),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 4.2 on 2026-10-19 05:01
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Q, Sum
+
+
+def backfill_product_metrics(apps, schema_editor):
+    """Calcula as métricas desnormalizadas dos produtos existentes, em lotes."""
+    Product = apps.get_model("product", "Product")
+    ProductSupplier = apps.get_model("product", "ProductSupplier")
+    batch_size = 1000
+    last_pk = 0
+
+    while True:
+        rows = list(
+            Product.objects.filter(pk__gt=last_pk)
+            .annotate(
+                stock_sum=Sum("variations__stock", filter=Q(variations__is_active=True)),
+                variation_count=Count("variations", filter=Q(variations__is_active=True)),
+            )
+            .values("pk", "selling_price", "stock_sum", "variation_count")
+            .order_by("pk")[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1]["pk"]
+
+        costs = dict(
+            ProductSupplier.objects.filter(product_id__in=[row["pk"] for row in rows])
+            .values("product_id")
+            .annotate(avg_cost=Avg("cost_price"))
+            .values_list("product_id", "avg_cost")
+        )
+
+        products = []
+        for row in rows:
+            average_cost = Decimal(costs.get(row["pk"]) or 0).quantize(
+                Decimal("0.01"), rounding=ROUND_HALF_UP
+            )
+            selling_price = row["selling_price"] or Decimal("0")
+            margin = Decimal("0")
+            if selling_price > 0:
+                margin = ((selling_price - average_cost) * 100 / selling_price).quantize(
+                    Decimal("0.01"), rounding=ROUND_HALF_UP
+                )
+            products.append(
+                Product(
+                    pk=row["pk"],
+                    total_stock=row["stock_sum"] or 0,
+                    active_variation_count=row["variation_count"],
+                    average_cost=average_cost,
+                    profit_margin=margin,
+                )
+            )
+        Product.objects.bulk_update(
+            products,
+            ["total_stock", "active_variation_count", "average_cost", "profit_margin"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0002_product_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='active_variation_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Variações Ativas'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='average_cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Custo Médio'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='profit_margin',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=7, verbose_name='Margem de Lucro (%)'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='total_stock',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Estoque Total'),
+        ),
+        migrations.RunPython(backfill_product_metrics, migrations.RunPython.noop),
+    ]
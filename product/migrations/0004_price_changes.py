@@ -0,0 +1,66 @@
+# Generated by Django 4.2 on 2026-10-19 05:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('product', '0003_product_denormalized_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(blank=True, max_length=150, verbose_name='Descrição')),
+                ('adjustment_type', models.CharField(choices=[('PERCENTUAL', 'Percentual (%)'), ('VALOR', 'Valor (R$)')], default='PERCENTUAL', max_length=10, verbose_name='Tipo de Reajuste')),
+                ('value', models.DecimalField(decimal_places=2, help_text='Negativo para redução (ex: -20 para 20% de desconto).', max_digits=10, verbose_name='Valor')),
+                ('round_to_90', models.BooleanField(default=True, verbose_name='Arredondar para ,90')),
+                ('query', models.CharField(blank=True, max_length=100, verbose_name='Busca')),
+                ('effective_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Vigência')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('APLICADO', 'Aplicado'), ('CANCELADO', 'Cancelado')], default='PENDENTE', max_length=10, verbose_name='Status')),
+                ('applied_at', models.DateTimeField(blank=True, null=True, verbose_name='Aplicado em')),
+                ('affected_products', models.PositiveIntegerField(default=0, verbose_name='Produtos Alterados')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='price_changes', to='product.category', verbose_name='Categoria')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_changes', to=settings.AUTH_USER_MODEL, verbose_name='Criado por')),
+                ('supplier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='price_changes', to='product.supplier', verbose_name='Fornecedor')),
+            ],
+            options={
+                'verbose_name': 'Reajuste de Preço',
+                'verbose_name_plural': 'Reajustes de Preço',
+                'ordering': ['-effective_at', '-pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço Anterior')),
+                ('new_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Novo Preço')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Alterado em')),
+                ('price_change', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='history', to='product.pricechange', verbose_name='Reajuste')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='product.product', verbose_name='Produto')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_history', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Histórico de Preço',
+                'verbose_name_plural': 'Históricos de Preço',
+                'ordering': ['-changed_at', '-pk'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pricehistory',
+            index=models.Index(fields=['product', '-changed_at'], name='price_history_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricechange',
+            index=models.Index(condition=models.Q(('status', 'PENDENTE')), fields=['effective_at'], name='price_change_pending_idx'),
+        ),
+    ]
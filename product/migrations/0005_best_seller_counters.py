@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-19 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_price_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='units_sold_30d',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Vendidos (30 dias)'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='units_sold_total',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Vendidos (total)'),
+        ),
+        migrations.AddField(
+            model_name='productvariation',
+            name='units_sold_30d',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Vendidos (30 dias)'),
+        ),
+        migrations.AddField(
+            model_name='productvariation',
+            name='units_sold_total',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Vendidos (total)'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-units_sold_30d', 'name', 'id'], name='product_best_sellers_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productvariation',
+            index=models.Index(condition=models.Q(('units_sold_30d__gt', 0)), fields=['-units_sold_30d'], name='variation_best_sellers_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2 on 2026-10-19 05:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0005_best_seller_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processed_until', models.DateTimeField(blank=True, null=True, verbose_name='Vendas processadas até')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Estado das Recomendações',
+                'verbose_name_plural': 'Estado das Recomendações',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(verbose_name='Vendas em comum')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Posição')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='product.product', verbose_name='Produto')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product', verbose_name='Recomendado')),
+            ],
+            options={
+                'verbose_name': 'Recomendação de Produto',
+                'verbose_name_plural': 'Recomendações de Produtos',
+                'ordering': ['product', 'rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductCooccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Vendas em comum')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product', verbose_name='Comprado junto')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Coocorrência de Produtos',
+                'verbose_name_plural': 'Coocorrências de Produtos',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productrecommendation',
+            constraint=models.UniqueConstraint(fields=('product', 'rank'), name='product_recommendation_rank_uq'),
+        ),
+        migrations.AddConstraint(
+            model_name='productcooccurrence',
+            constraint=models.UniqueConstraint(fields=('product', 'other'), name='product_cooccurrence_pair_uq'),
+        ),
+    ]
@@ -1,18 +1,9 @@
+from django.conf import settings
 from django.db import models
-from django.db.models import (
-    Q,
-    Sum,
-    Case,
-    When,
-    F,
-    ExpressionWrapper,
-    DecimalField,
-    Value,
-    OuterRef,
-    Avg,
-    Subquery,
-)
-from django.db.models.functions import Coalesce
+from django.db.models import F
+from django.utils import timezone
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.forms import ValidationError
 from product.mixins import StandardizeNameMixin
 from .utils import generate_sku
@@ -23,64 +14,19 @@ class ProductQuerySet(models.QuerySet):
 
     def with_stock(self):
         """
-        Retorna o estoque total somando o estoque de todas as variações dos produtos no queryset.
-        Garante que o resultado seja 0 em vez de None se não houver variações.
+        Mantido por compatibilidade: o estoque total (variações ativas) agora
+        é a coluna desnormalizada 'total_stock', atualizada pelos serviços de
+        estoque e pelos signals de ProductVariation.
         """
-        # Coalesce para substituir um resultado None (caso não haja variações) por 0.
-        total = Coalesce(
-            Sum("variations__stock", filter=Q(variations__is_active=True)), Value(0)
-        )
-        return self.annotate(total_stock=total)
+        return self
 
     def with_average_profit_margin(self):
         """
-        Anota a margem de lucro (%) e custo médio de cada produto,
-        garantindo tipos compatíveis (DecimalField).
+        Expõe o custo médio desnormalizado como 'average_cost_price'.
+        A margem de lucro (%) é a coluna 'profit_margin', mantida junto com
+        o custo médio a cada alteração de fornecedores ou do preço de venda.
         """
-
-        avg_cost_subquery = (
-            ProductSupplier.objects.filter(product=OuterRef("pk"))
-            .values("product")
-            .annotate(avg_cost=Avg("cost_price"))
-            .values("avg_cost")
-        )
-
-        queryset = self.annotate(
-            average_cost_price=Coalesce(
-                Subquery(
-                    avg_cost_subquery,
-                    output_field=DecimalField(max_digits=10, decimal_places=2),
-                ),
-                Value(0, output_field=DecimalField(max_digits=10, decimal_places=2)),
-            )
-        )
-
-        # 🔢 Calcular margem de lucro com tipos Decimal coerentes
-        profit = ExpressionWrapper(
-            F("selling_price") - F("average_cost_price"),
-            output_field=DecimalField(max_digits=10, decimal_places=2),
-        )
-
-        margin_expression = ExpressionWrapper(
-            (
-                profit
-                * Value(100, output_field=DecimalField(max_digits=5, decimal_places=2))
-            )
-            / F("selling_price"),
-            output_field=DecimalField(max_digits=5, decimal_places=2),
-        )
-
-        return queryset.annotate(
-            profit_margin=Case(
-                When(
-                    selling_price__gt=0,
-                    then=margin_expression,
-                ),
-                default=Value(
-                    0, output_field=DecimalField(max_digits=5, decimal_places=2)
-                ),
-            )
-        )
+        return self.annotate(average_cost_price=F("average_cost"))
 
 
 class ActiveProductVariationManager(models.Manager):
@@ -131,11 +77,15 @@ class Size(StandardizeNameMixin, models.Model):
 
 
 def get_default_color():
-    return Color.objects.get_or_create(name="N/A")[0].pk
+    from .reference import colors
+
+    return colors.get_default().pk
 
 
 def get_default_size():
-    return Size.objects.get_or_create(name="N/A")[0].pk
+    from .reference import sizes
+
+    return sizes.get_default().pk
 
 
 class Supplier(StandardizeNameMixin, models.Model):
@@ -170,12 +120,53 @@ class Product(StandardizeNameMixin, models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
 
+    # Métricas desnormalizadas (mantidas por product.metrics / signals)
+    total_stock = models.PositiveBigIntegerField(
+        default=0, editable=False, verbose_name="Estoque Total"
+    )
+    active_variation_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Variações Ativas"
+    )
+    average_cost = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name="Custo Médio",
+    )
+    profit_margin = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name="Margem de Lucro (%)",
+    )
+
+    # Mais vendidos: soma dos contadores das variações (mantida por product.best_sellers)
+    units_sold_30d = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Vendidos (30 dias)"
+    )
+    units_sold_total = models.PositiveBigIntegerField(
+        default=0, editable=False, verbose_name="Vendidos (total)"
+    )
+
+    # Documento de busca desnormalizado (mantido por product.search / signals)
+    search_document = models.TextField(blank=True, default="", editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     objects = ProductQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Produto"
         verbose_name_plural = "Produtos"
         ordering = ["name"]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            # Lista ordenada por mais vendidos (paginação por cursor)
+            models.Index(
+                fields=["-units_sold_30d", "name", "id"], name="product_best_sellers_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -234,6 +225,14 @@ class ProductVariation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
 
+    # Contadores de vendas (mantidos por product.best_sellers)
+    units_sold_30d = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Vendidos (30 dias)"
+    )
+    units_sold_total = models.PositiveBigIntegerField(
+        default=0, editable=False, verbose_name="Vendidos (total)"
+    )
+
     objects = models.Manager()  # Manager padrão
     active = ActiveProductVariationManager()  # Manager customizado
 
@@ -253,6 +252,14 @@ class ProductVariation(models.Model):
                 fields=["product", "color", "size"], name="unique_product_color_size"
             ),
         ]
+        indexes = [
+            # Painel de mais vendidos do PDV: só as variações com vendas na janela
+            models.Index(
+                fields=["-units_sold_30d"],
+                condition=models.Q(units_sold_30d__gt=0),
+                name="variation_best_sellers_idx",
+            ),
+        ]
 
     def __str__(self):
         product_name = self.product.name if self.product else "Produto Inválido"
@@ -265,3 +272,210 @@ class ProductVariation(models.Model):
         if not self.sku:
             self.sku = generate_sku(self)
         super().save(*args, **kwargs)
+
+
+class PriceChange(models.Model):
+    """
+    Reajuste de preço em lote (imediato ou agendado), aplicado a todos os
+    produtos que atendem aos filtros no momento da aplicação.
+    """
+
+    class AdjustmentType(models.TextChoices):
+        PERCENTUAL = "PERCENTUAL", "Percentual (%)"
+        VALOR = "VALOR", "Valor (R$)"
+
+    class Status(models.TextChoices):
+        PENDENTE = "PENDENTE", "Pendente"
+        APLICADO = "APLICADO", "Aplicado"
+        CANCELADO = "CANCELADO", "Cancelado"
+
+    description = models.CharField(max_length=150, blank=True, verbose_name="Descrição")
+    adjustment_type = models.CharField(
+        max_length=10,
+        choices=AdjustmentType.choices,
+        default=AdjustmentType.PERCENTUAL,
+        verbose_name="Tipo de Reajuste",
+    )
+    value = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Valor",
+        help_text="Negativo para redução (ex: -20 para 20% de desconto).",
+    )
+    round_to_90 = models.BooleanField(default=True, verbose_name="Arredondar para ,90")
+
+    # Filtros (vazios = todos os produtos)
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="price_changes",
+        verbose_name="Categoria",
+    )
+    supplier = models.ForeignKey(
+        Supplier,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="price_changes",
+        verbose_name="Fornecedor",
+    )
+    query = models.CharField(max_length=100, blank=True, verbose_name="Busca")
+
+    effective_at = models.DateTimeField(default=timezone.now, verbose_name="Vigência")
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDENTE,
+        verbose_name="Status",
+    )
+    applied_at = models.DateTimeField(null=True, blank=True, verbose_name="Aplicado em")
+    affected_products = models.PositiveIntegerField(
+        default=0, verbose_name="Produtos Alterados"
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="price_changes",
+        verbose_name="Criado por",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+
+    class Meta:
+        verbose_name = "Reajuste de Preço"
+        verbose_name_plural = "Reajustes de Preço"
+        ordering = ["-effective_at", "-pk"]
+        indexes = [
+            # Fila do job de reajustes agendados
+            models.Index(
+                fields=["effective_at"],
+                name="price_change_pending_idx",
+                condition=models.Q(status="PENDENTE"),
+            ),
+        ]
+
+    def __str__(self):
+        sign = "+" if self.value >= 0 else ""
+        unit = "%" if self.adjustment_type == self.AdjustmentType.PERCENTUAL else " R$"
+        return f"{self.description or 'Reajuste'} ({sign}{self.value}{unit})"
+
+
+class PriceHistory(models.Model):
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="price_history",
+        verbose_name="Produto",
+    )
+    old_price = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name="Preço Anterior"
+    )
+    new_price = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name="Novo Preço"
+    )
+    # Vazio quando o preço foi alterado manualmente no cadastro do produto
+    price_change = models.ForeignKey(
+        PriceChange,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="history",
+        verbose_name="Reajuste",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="price_history",
+        verbose_name="Usuário",
+    )
+    changed_at = models.DateTimeField(default=timezone.now, verbose_name="Alterado em")
+
+    class Meta:
+        verbose_name = "Histórico de Preço"
+        verbose_name_plural = "Históricos de Preço"
+        ordering = ["-changed_at", "-pk"]
+        indexes = [
+            models.Index(fields=["product", "-changed_at"], name="price_history_product_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name}: {self.old_price} -> {self.new_price}"
+
+
+class ProductCooccurrence(models.Model):
+    """
+    Matriz esparsa de coocorrência (mantida por product.recommendations): em
+    quantas vendas concluídas os dois produtos foram comprados juntos. Cada
+    par é guardado nos dois sentidos.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="+", verbose_name="Produto"
+    )
+    other = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="+", verbose_name="Comprado junto"
+    )
+    count = models.PositiveIntegerField(default=0, verbose_name="Vendas em comum")
+
+    class Meta:
+        verbose_name = "Coocorrência de Produtos"
+        verbose_name_plural = "Coocorrências de Produtos"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "other"], name="product_cooccurrence_pair_uq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} + {self.other_id}: {self.count}"
+
+
+class ProductRecommendation(models.Model):
+    """Os produtos mais comprados junto com cada produto (top-k da coocorrência)."""
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="recommendations",
+        verbose_name="Produto",
+    )
+    recommended = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="+", verbose_name="Recomendado"
+    )
+    score = models.PositiveIntegerField(verbose_name="Vendas em comum")
+    rank = models.PositiveSmallIntegerField(verbose_name="Posição")
+
+    class Meta:
+        verbose_name = "Recomendação de Produto"
+        verbose_name_plural = "Recomendações de Produtos"
+        ordering = ["product", "rank"]
+        constraints = [
+            # Também é o índice da consulta por produto(s) do carrinho
+            models.UniqueConstraint(
+                fields=["product", "rank"], name="product_recommendation_rank_uq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} ({self.score})"
+
+
+class RecommendationState(models.Model):
+    """Marca d'água da atualização incremental das recomendações (registro único)."""
+
+    processed_until = models.DateTimeField(
+        null=True, blank=True, verbose_name="Vendas processadas até"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Estado das Recomendações"
+        verbose_name_plural = "Estado das Recomendações"
+
+    def __str__(self):
+        return f"Recomendações até {self.processed_until}"
@@ -0,0 +1,219 @@
+# product/pricing.py
+"""
+Reajuste de preços em lote.
+
+O novo preço é calculado no próprio banco, em um único UPDATE sobre os
+produtos filtrados (categoria, fornecedor e/ou busca), junto com a margem de
+lucro desnormalizada. O histórico (PriceHistory) é gravado com bulk_create.
+Reajustes com vigência futura ficam pendentes até o job
+`apply_scheduled_price_changes`.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Cast, Floor, Greatest, Round
+from django.utils import timezone
+
+from .autocomplete import invalidate_catalog
+from .metrics import MIN_PROFIT_MARGIN
+from .models import PriceChange, PriceHistory, Product
+from .search import search_product_ids
+from .services import ServiceValidationError
+
+PRICE_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+MINIMUM_PRICE = Decimal("0.01")
+
+
+def _decimal(value):
+    return Value(Decimal(value), output_field=PRICE_FIELD)
+
+
+def price_expression(adjustment_type, value, round_to_90=True):
+    """
+    Expressão SQL do novo preço a partir de F("selling_price").
+
+    Com arredondamento psicológico, o preço vai para o ",90" mais próximo:
+    Floor(p - 0.40) + 0.90 (ex: 123,45 -> 123,90; 124,30 -> 123,90).
+    """
+    value = Decimal(value)
+    if adjustment_type == PriceChange.AdjustmentType.PERCENTUAL:
+        price = F("selling_price") * _decimal(1 + value / 100)
+    else:
+        price = F("selling_price") + _decimal(value)
+
+    if round_to_90:
+        price = Floor(price - _decimal("0.40")) + _decimal("0.90")
+    else:
+        price = Round(price, 2)
+
+    return Cast(Greatest(price, _decimal(MINIMUM_PRICE)), output_field=PRICE_FIELD)
+
+
+def margin_expression(price):
+    """
+    Margem de lucro (%) sobre o novo preço (ver metrics.calculate_profit_margin),
+    limitada ao menor valor da coluna: um produto com custo muito acima do
+    preço não pode abortar o UPDATE do reajuste inteiro.
+    """
+    margin_field = DecimalField(max_digits=7, decimal_places=2)
+    return Cast(
+        Greatest(
+            Round((price - F("average_cost")) * 100 / price, 2),
+            Value(MIN_PROFIT_MARGIN, output_field=margin_field),
+        ),
+        output_field=margin_field,
+    )
+
+
+def matching_products(category=None, supplier=None, query=""):
+    """Queryset dos produtos atingidos pelos filtros do reajuste."""
+    products = Product.objects.all()
+    if category is not None:
+        products = products.filter(category=category)
+    if supplier is not None:
+        products = products.filter(
+            pk__in=supplier.productsupplier_set.values("product_id")
+        )
+    if query:
+        products = products.filter(pk__in=search_product_ids(query))
+    return products
+
+
+def create_price_change(
+    *,
+    adjustment_type,
+    value,
+    category=None,
+    supplier=None,
+    query="",
+    round_to_90=True,
+    effective_at=None,
+    description="",
+    user=None,
+):
+    """
+    Cria um reajuste em lote. Sem vigência (ou com vigência passada), é
+    aplicado imediatamente; caso contrário fica agendado.
+
+    Raises:
+        ServiceValidationError: Valor inválido (zero ou redução de 100% ou mais).
+    """
+    value = Decimal(value)
+    if value == 0:
+        raise ServiceValidationError("Informe um valor de reajuste diferente de zero.")
+    if adjustment_type == PriceChange.AdjustmentType.PERCENTUAL and value <= -100:
+        raise ServiceValidationError("A redução percentual deve ser menor que 100%.")
+
+    price_change = PriceChange.objects.create(
+        adjustment_type=adjustment_type,
+        value=value,
+        category=category,
+        supplier=supplier,
+        query=(query or "").strip(),
+        round_to_90=round_to_90,
+        effective_at=effective_at or timezone.now(),
+        description=description,
+        created_by=user,
+    )
+    if price_change.effective_at <= timezone.now():
+        apply_price_change(price_change, user=user)
+        price_change.refresh_from_db()
+    return price_change
+
+
+@transaction.atomic
+def apply_price_change(price_change, user=None):
+    """
+    Aplica um reajuste pendente: um UPDATE para todos os produtos filtrados e
+    um bulk_create do histórico. Retorna a quantidade de produtos alterados.
+    """
+    price_change = PriceChange.objects.select_for_update().get(pk=price_change.pk)
+    if price_change.status != PriceChange.Status.PENDENTE:
+        raise ServiceValidationError("Este reajuste já foi aplicado ou cancelado.")
+
+    # Trava os produtos atingidos e guarda os preços atuais para o histórico
+    old_prices = dict(
+        matching_products(
+            category=price_change.category,
+            supplier=price_change.supplier,
+            query=price_change.query,
+        )
+        .select_for_update()
+        .order_by("pk")
+        .values_list("pk", "selling_price")
+    )
+
+    now = timezone.now()
+    targets = Product.objects.filter(pk__in=list(old_prices))
+    new_price = price_expression(
+        price_change.adjustment_type, price_change.value, price_change.round_to_90
+    )
+    targets.update(
+        selling_price=new_price,
+        profit_margin=margin_expression(new_price),
+        updated_at=now,
+    )
+
+    user = user or price_change.created_by
+    history = [
+        PriceHistory(
+            product_id=pk,
+            old_price=old_prices[pk],
+            new_price=price,
+            price_change=price_change,
+            user=user,
+            changed_at=now,
+        )
+        for pk, price in targets.values_list("pk", "selling_price").iterator()
+        if price != old_prices[pk]
+    ]
+    PriceHistory.objects.bulk_create(history, batch_size=1000)
+
+    price_change.status = PriceChange.Status.APLICADO
+    price_change.applied_at = now
+    price_change.affected_products = len(history)
+    price_change.save(update_fields=["status", "applied_at", "affected_products"])
+
+    # O preço aparece no autocomplete do PDV
+    if history:
+        invalidate_catalog()
+    return len(history)
+
+
+def cancel_price_change(price_change):
+    """Cancela um reajuste agendado que ainda não foi aplicado."""
+    updated = PriceChange.objects.filter(
+        pk=price_change.pk, status=PriceChange.Status.PENDENTE
+    ).update(status=PriceChange.Status.CANCELADO)
+    if not updated:
+        raise ServiceValidationError("Apenas reajustes pendentes podem ser cancelados.")
+
+
+def apply_due_price_changes(now=None):
+    """
+    Aplica, em ordem de vigência, os reajustes pendentes já vencidos.
+    Retorna [(reajuste, produtos alterados)].
+    """
+    now = now or timezone.now()
+    due = PriceChange.objects.filter(
+        status=PriceChange.Status.PENDENTE, effective_at__lte=now
+    ).order_by("effective_at", "pk")
+
+    applied = []
+    for price_change in due:
+        applied.append((price_change, apply_price_change(price_change)))
+    return applied
+
+
+def record_price_edit(product, old_price, user=None):
+    """Registra no histórico a alteração manual do preço de um produto."""
+    if old_price is None or product.selling_price == old_price:
+        return None
+    return PriceHistory.objects.create(
+        product=product,
+        old_price=old_price,
+        new_price=product.selling_price,
+        user=user,
+    )
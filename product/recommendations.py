@@ -0,0 +1,241 @@
+# product/recommendations.py
+"""
+Recomendações "comprados juntos" a partir das cestas de venda.
+
+A matriz de coocorrência produto × produto é esparsa: só existem os pares
+que já saíram juntos em alguma venda concluída. Ela fica na tabela
+ProductCooccurrence, e a atualização é incremental: as vendas concluídas
+depois da marca d'água somam 1 a cada par da cesta, e as canceladas depois
+dela (que já tinham sido contadas) subtraem 1. Os deltas são acumulados em
+um dicionário {(produto, outro): delta} e aplicados com um bulk upsert.
+
+Só as linhas da matriz que mudaram têm o top-k refeito em
+ProductRecommendation. Com a contagem bruta como score, o top-k de um
+produto só muda quando a linha dele muda, então o resultado incremental é
+igual ao de um recálculo completo.
+
+A consulta do PDV (recommend_for_products) é uma única leitura pelo índice
+(produto, posição), já com o SKU da variação a sugerir.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .models import (
+    ProductCooccurrence,
+    ProductRecommendation,
+    ProductVariation,
+    RecommendationState,
+)
+
+# Recomendações guardadas por produto
+TOP_K = 10
+
+# Pares que saíram juntos menos vezes que isso são tratados como acaso
+MIN_SUPPORT = 2
+
+# Cestas grandes (ex: compra de enxoval) geram pares quadráticos e pouco sinal
+MAX_BASKET_SIZE = 30
+
+# Vendas concluídas nos últimos instantes podem ainda não estar confirmadas
+WATERMARK_LAG = timedelta(minutes=1)
+
+
+def _sale_items():
+    from sales.models import SaleItem
+
+    return SaleItem.objects.order_by()
+
+
+def _baskets(items):
+    """Gera o conjunto de produtos de cada venda, lendo os itens em ordem de venda."""
+    rows = (
+        items.values_list("sale_id", "variation__product_id")
+        .order_by("sale_id")
+        .iterator(chunk_size=5000)
+    )
+    for _sale_id, group in groupby(rows, key=lambda row: row[0]):
+        yield {product_id for _sale, product_id in group}
+
+
+def _add_pairs(baskets, deltas, sign=1):
+    """Acumula em `deltas` os pares (nos dois sentidos) de cada cesta."""
+    count = 0
+    for products in baskets:
+        if not 2 <= len(products) <= MAX_BASKET_SIZE:
+            continue
+        count += 1
+        for product_id in products:
+            for other_id in products:
+                if product_id != other_id:
+                    deltas[(product_id, other_id)] += sign
+    return count
+
+
+def _apply_deltas(deltas):
+    """Soma os deltas à matriz gravada. Retorna os produtos com linha alterada."""
+    deltas = {pair: delta for pair, delta in deltas.items() if delta}
+    affected = {product_id for product_id, _other in deltas}
+    if not affected:
+        return affected
+
+    counts = {
+        (product_id, other_id): count
+        for product_id, other_id, count in ProductCooccurrence.objects.filter(
+            product_id__in=affected
+        ).values_list("product_id", "other_id", "count")
+    }
+
+    upserts = []
+    removed = defaultdict(list)
+    for (product_id, other_id), delta in deltas.items():
+        count = counts.get((product_id, other_id), 0) + delta
+        if count > 0:
+            upserts.append(ProductCooccurrence(product_id=product_id, other_id=other_id, count=count))
+        elif (product_id, other_id) in counts:
+            removed[product_id].append(other_id)
+
+    ProductCooccurrence.objects.bulk_create(
+        upserts,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["product", "other"],
+        update_fields=["count"],
+    )
+    if removed:
+        condition = Q()
+        for product_id, other_ids in removed.items():
+            condition |= Q(product_id=product_id, other_id__in=other_ids)
+        ProductCooccurrence.objects.filter(condition).delete()
+    return affected
+
+
+def _rebuild_top_k(product_ids):
+    """Refaz as recomendações dos produtos a partir das linhas da matriz."""
+    product_ids = list(product_ids)
+    ProductRecommendation.objects.filter(product_id__in=product_ids).delete()
+
+    rows = (
+        ProductCooccurrence.objects.filter(product_id__in=product_ids, count__gte=MIN_SUPPORT)
+        .order_by("product_id", "-count", "other_id")
+        .values_list("product_id", "other_id", "count")
+        .iterator(chunk_size=5000)
+    )
+    recommendations = []
+    for product_id, group in groupby(rows, key=lambda row: row[0]):
+        for rank, (_product, other_id, count) in enumerate(group, 1):
+            if rank > TOP_K:
+                break
+            recommendations.append(
+                ProductRecommendation(
+                    product_id=product_id, recommended_id=other_id, score=count, rank=rank
+                )
+            )
+    ProductRecommendation.objects.bulk_create(recommendations, batch_size=1000)
+
+
+@transaction.atomic
+def refresh_recommendations(full=False, now=None):
+    """
+    Processa as vendas desde a marca d'água (ou todas, com `full`) e
+    atualiza a matriz e as recomendações dos produtos afetados.
+    Retorna {"baskets": cestas processadas, "products": produtos atualizados}.
+    """
+    from sales.models import Sale
+
+    RecommendationState.objects.get_or_create(pk=1)
+    # Trava o registro: duas execuções simultâneas contariam as vendas duas vezes
+    state = RecommendationState.objects.select_for_update().get(pk=1)
+    until = (now or timezone.now()) - WATERMARK_LAG
+    since = None if full else state.processed_until
+
+    completed = _sale_items().filter(
+        sale__status=Sale.Status.COMPLETED,
+        sale__is_active=True,
+        sale__completed_at__lte=until,
+    )
+    if since is not None:
+        completed = completed.filter(sale__completed_at__gt=since)
+
+    deltas = defaultdict(int)
+    baskets = _add_pairs(_baskets(completed), deltas)
+
+    if since is not None:
+        # Canceladas depois da marca d'água, mas concluídas antes dela (já contadas)
+        canceled = _sale_items().filter(
+            sale__status=Sale.Status.CANCELED,
+            sale__deleted_at__gt=since,
+            sale__deleted_at__lte=until,
+            sale__completed_at__lte=since,
+        )
+        baskets += _add_pairs(_baskets(canceled), deltas, sign=-1)
+
+    if full:
+        ProductCooccurrence.objects.all().delete()
+        ProductRecommendation.objects.all().delete()
+
+    affected = _apply_deltas(deltas)
+    _rebuild_top_k(affected)
+
+    state.processed_until = until
+    state.save(update_fields=["processed_until", "updated_at"])
+    return {"baskets": baskets, "products": len(affected)}
+
+
+def recommend_for_products(product_ids, limit=5):
+    """
+    Sugestões para um conjunto de produtos (ex: o carrinho): soma dos scores
+    das recomendações de cada produto, sem os próprios produtos. Cada
+    sugestão traz a variação em estoque mais vendida do produto recomendado.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return []
+
+    best_variation = (
+        ProductVariation.active.filter(product=OuterRef("recommended_id"), stock__gt=0)
+        .order_by("-units_sold_30d", "pk")
+        .values("sku")[:1]
+    )
+    rows = (
+        ProductRecommendation.objects.filter(
+            product_id__in=product_ids, recommended__is_active=True
+        )
+        .exclude(recommended_id__in=product_ids)
+        .annotate(sku=Subquery(best_variation))
+        .values_list(
+            "recommended_id", "recommended__name", "recommended__selling_price", "sku", "score"
+        )
+    )
+
+    suggestions = {}
+    for product_id, name, price, sku, score in rows:
+        if sku is None:
+            continue
+        suggestion = suggestions.setdefault(
+            product_id, {"product_id": product_id, "name": name, "price": price, "sku": sku, "score": 0}
+        )
+        suggestion["score"] += score
+    ranked = sorted(suggestions.values(), key=lambda item: (-item["score"], item["name"]))
+    return ranked[:limit]
+
+
+def recommend_for_customer(customer, limit=6):
+    """Sugestões a partir de tudo o que o cliente já comprou."""
+    from sales.models import Sale
+
+    purchased = (
+        _sale_items()
+        .filter(
+            sale__customer=customer,
+            sale__status=Sale.Status.COMPLETED,
+            sale__is_active=True,
+        )
+        .values_list("variation__product_id", flat=True)
+        .distinct()
+    )
+    return recommend_for_products(purchased, limit=limit)
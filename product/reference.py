@@ -0,0 +1,139 @@
+# product/reference.py
+"""
+Cache de dados de referência (Cor, Tamanho, Categoria e Fornecedor).
+
+São poucas dezenas de linhas lidas o tempo todo: nos defaults de
+ProductVariation, nos selects dos formulários e nos formsets de variações.
+Cada tabela é carregada inteira em uma consulta e consultada em memória por
+id ou por nome padronizado.
+
+Invalidação: os signals de save/delete descartam o cache do processo e,
+após o commit, incrementam a versão compartilhada (base.versions), lida da
+memória do processo na maior parte das chamadas.
+
+Uma transação que alterou a tabela não usa o cache do processo até o
+commit: ela carrega o seu próprio snapshot, que é descartado se a
+transação (ou o savepoint) for desfeita.
+"""
+import copy
+import threading
+import weakref
+
+from django.db import transaction
+
+from base.versions import SharedVersion
+
+from .models import Category, Color, Size, Supplier
+from .utils import standardize_name
+
+DEFAULT_NAME = "N/A"
+
+# Alterações feitas em transações abertas, por thread e por tabela
+_local = threading.local()
+
+
+class _Change:
+    """
+    Alteração de uma tabela dentro de uma transação.
+
+    Fica registrada em on_commit (publica a nova versão) e o thread-local
+    guarda só uma referência fraca a ela: se a transação ou o savepoint for
+    desfeito, o Django descarta o callback e a referência deixa de resolver,
+    levando junto o snapshot carregado depois da alteração.
+    """
+
+    def __init__(self, reference):
+        self.reference = reference
+        self.snapshot = None
+
+    def __call__(self):
+        self.reference.version.increment()
+
+
+def _changes(key):
+    """Alterações ainda válidas da tabela nesta thread (a última por último)."""
+    changes = _local.__dict__.setdefault(key, [])
+    changes[:] = [change for change in changes if change() is not None]
+    return changes
+
+
+class _Snapshot:
+    def __init__(self, version, objects):
+        self.version = version
+        self.objects = objects
+        self.by_id = {obj.pk: obj for obj in objects}
+        self.by_name = {standardize_name(obj.name): obj for obj in objects}
+
+
+class ReferenceData:
+    def __init__(self, model):
+        self.model = model
+        self.key = model._meta.label_lower
+        self.version = SharedVersion(f"product:reference:{self.key}:version")
+        # Modelos com "is_active" expõem só os ativos nos formulários
+        self.has_active_flag = any(field.name == "is_active" for field in model._meta.fields)
+        self._committed = None
+
+    def invalidate(self):
+        self._committed = None
+        if transaction.get_connection().in_atomic_block:
+            change = _Change(self)
+            transaction.on_commit(change)
+            _changes(self.key).append(weakref.ref(change))
+        else:
+            self.version.increment()
+
+    # Carga
+    def _load(self, version):
+        return _Snapshot(version, list(self.model.objects.all()))
+
+    def _snapshot(self):
+        changes = _changes(self.key) if transaction.get_connection().in_atomic_block else None
+        if changes:
+            # Alterada nesta transação: snapshot próprio, ligado à última alteração
+            change = changes[-1]()
+            if change.snapshot is None:
+                change.snapshot = self._load(None)
+            return change.snapshot
+
+        version = self.version.get()
+        committed = self._committed
+        if committed is None or committed.version != version:
+            committed = self._committed = self._load(version)
+        return committed
+
+    # Consultas (devolvem cópias: as instâncias do cache são compartilhadas)
+    def get(self, pk):
+        obj = self._snapshot().by_id.get(pk)
+        return copy.copy(obj) if obj is not None else None
+
+    def get_by_name(self, name):
+        if not name or not name.strip():
+            return None
+        obj = self._snapshot().by_name.get(standardize_name(name))
+        return copy.copy(obj) if obj is not None else None
+
+    def all(self, active_only=False):
+        objects = self._snapshot().objects
+        if active_only and self.has_active_flag:
+            objects = [obj for obj in objects if obj.is_active]
+        return [copy.copy(obj) for obj in objects]
+
+    def get_default(self):
+        """Registro "N/A", criado na primeira vez em que for necessário."""
+        obj = self.get_by_name(DEFAULT_NAME)
+        if obj is None:
+            obj = self.model.objects.get_or_create(name=DEFAULT_NAME)[0]
+        return obj
+
+
+colors = ReferenceData(Color)
+sizes = ReferenceData(Size)
+categories = ReferenceData(Category)
+suppliers = ReferenceData(Supplier)
+
+REFERENCES = {ref.model: ref for ref in (colors, sizes, categories, suppliers)}
+
+
+def get_reference(model):
+    return REFERENCES[model]
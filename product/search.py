@@ -0,0 +1,97 @@
+# product/search.py
+"""
+Backend de busca de produtos.
+
+Cada produto mantém um documento de busca desnormalizado (nome, categoria,
+SKUs e fornecedores, sem acentos e em minúsculas) e o tsvector correspondente.
+A busca filtra primeiro os ids que casam (índices GIN de tsvector e de
+trigramas) e só então o serviço aplica as anotações de estoque e margem.
+"""
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import Q
+
+from .models import Product
+from .utils import normalize_search_text
+
+# Separador entre os campos do documento, para que uma busca por substring
+# não case atravessando dois campos diferentes
+DOCUMENT_SEPARATOR = " | "
+
+SEARCH_CONFIG = "simple"
+
+
+def build_search_documents(product_ids):
+    """
+    Monta os documentos de busca de uma lista de produtos em uma única
+    consulta agrupada. Retorna {product_id: documento}.
+    """
+    rows = (
+        Product.objects.filter(pk__in=product_ids)
+        .annotate(
+            skus=ArrayAgg("variations__sku", distinct=True, default=[]),
+            supplier_names=ArrayAgg("suppliers__name", distinct=True, default=[]),
+        )
+        .values("pk", "name", "category__name", "skus", "supplier_names")
+        .order_by()
+    )
+
+    documents = {}
+    for row in rows:
+        parts = [row["name"], row["category__name"]]
+        parts += [sku for sku in row["skus"] if sku]
+        parts += [name for name in row["supplier_names"] if name]
+        documents[row["pk"]] = DOCUMENT_SEPARATOR.join(
+            normalize_search_text(part) for part in parts if part
+        )
+    return documents
+
+
+def refresh_search_documents(product_ids):
+    """Recalcula e grava o documento e o tsvector dos produtos informados."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return 0
+
+    documents = build_search_documents(product_ids)
+    products = [
+        Product(pk=pk, search_document=document) for pk, document in documents.items()
+    ]
+    Product.objects.bulk_update(products, ["search_document"], batch_size=1000)
+    Product.objects.filter(pk__in=documents.keys()).update(
+        search_vector=SearchVector("search_document", config=SEARCH_CONFIG)
+    )
+    return len(products)
+
+
+def _prefix_tsquery(tokens):
+    """Monta um tsquery 'raw' exigindo todos os termos como prefixo."""
+    terms = []
+    for token in tokens:
+        token = "".join(c for c in token if c.isalnum() or c == "-")
+        if token:
+            terms.append(f"'{token}':*")
+    return " & ".join(terms)
+
+
+def search_product_ids(query):
+    """
+    Retorna um queryset (apenas pk) dos produtos que casam com a busca.
+
+    - Substring no documento (LIKE, servido pelo índice de trigramas):
+      mantém o comportamento antigo de icontains em cada campo.
+    - tsvector com prefixos: encontra termos fora de ordem, ex. "vestido azul"
+      em "Vestido Longo Azul".
+    """
+    normalized = normalize_search_text(query)
+    if not normalized:
+        return Product.objects.values("pk")
+
+    condition = Q(search_document__contains=normalized)
+    tsquery = _prefix_tsquery(normalized.split())
+    if tsquery:
+        condition |= Q(
+            search_vector=SearchQuery(tsquery, search_type="raw", config=SEARCH_CONFIG)
+        )
+
+    return Product.objects.filter(condition).values("pk")
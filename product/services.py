@@ -1,34 +1,62 @@
 # product/services/product_services.py
-from django.db.models import Q
-from django.core.paginator import Paginator
-from product.models import Category, Color, Product, Size, Supplier
-from .utils import standardize_name
+from django.db import IntegrityError, transaction
 
+from base.pagination import CursorPaginator
+from product.models import Category, Color, Product, ProductVariation, Size, Supplier
+from .autocomplete import invalidate_catalog
+from .facets import filter_products
+from .metrics import refresh_product_metrics
+from .reference import colors as reference_colors, sizes as reference_sizes
+from .search import refresh_search_documents, search_product_ids
+from .utils import generate_random_suffix, generate_sku_base, standardize_name
 
-def get_filtered_products(query: str = "", page_number: int = 1, per_page: int = 10):
+
+# Ordenações da lista de produtos (chave do parâmetro "sort" -> ordenação do cursor)
+PRODUCT_ORDERINGS = {
+    "name": ["name", "pk"],
+    "best_sellers": ["-units_sold_30d", "name", "pk"],
+}
+
+
+def default_product_ordering(query: str = "") -> str:
+    """Buscas vêm das mais vendidas para as menos vendidas; a lista completa, por nome."""
+    return "best_sellers" if query else "name"
+
+
+def get_filtered_products(
+    query: str = "",
+    cursor: str = None,
+    per_page: int = 10,
+    filters: dict = None,
+    ordering: str = None,
+):
     """
-    Serviço que retorna produtos com filtros, paginação e anotações de estoque e margem de lucro.
+    Serviço que retorna produtos com filtros, paginação por cursor, estoque total e margem de lucro.
+    `filters` são as facetas de product.facets.parse_facet_filters e `ordering`
+    uma chave de PRODUCT_ORDERINGS (padrão: default_product_ordering).
     """
-    products = (
-        Product.objects.with_stock()
-        .with_average_profit_margin()
-        .select_related("category")
-        .prefetch_related("suppliers")
-        .order_by("name")
-    )
-
-    # Filtro de busca (nome, categoria ou SKU)
+    products = Product.objects.all()
+
+    # Filtro de busca (nome, categoria, SKU ou fornecedor): primeiro os ids
+    # que casam pelos índices de busca, depois as anotações. Sem joins no
+    # filtro, o .distinct() deixa de ser necessário.
     if query:
-        products = products.filter(
-            Q(name__icontains=query)
-            | Q(category__name__icontains=query)
-            | Q(variations__sku__icontains=query)
-            | Q(suppliers__name__icontains=query)
-        ).distinct()
+        products = products.filter(pk__in=search_product_ids(query))
+
+    # Facetas (categoria, cor, tamanho, fornecedor, preço e estoque): subconsulta
+    # sobre as variações, também sem joins na listagem
+    if filters:
+        products = filter_products(products, filters)
 
-    # Paginação
-    paginator = Paginator(products, per_page)
-    page_obj = paginator.get_page(page_number)
+    # Estoque e margem são colunas desnormalizadas: a listagem (e a contagem
+    # do paginador) é uma varredura simples pelo índice de nome
+    products = products.select_related("category")
+
+    # Paginação por cursor (sem OFFSET) com contagem estimada para buscas grandes
+    if ordering not in PRODUCT_ORDERINGS:
+        ordering = default_product_ordering(query)
+    paginator = CursorPaginator(products, per_page, ordering=PRODUCT_ORDERINGS[ordering])
+    page_obj = paginator.get_page(cursor)
 
     return {
         "products": page_obj,  # objeto paginado pronto para o template
@@ -109,3 +137,152 @@ def create_size(name: str) -> Size:
         raise ServiceDuplicateError("Um tamanho com este nome já existe.")
 
     return size
+
+
+# Grade de variações (cor × tamanho)
+MATRIX_CREATED = "created"
+MATRIX_EXISTING = "existing"
+
+# Tentativas de sorteio de sufixos antes de desistir de um SKU
+SKU_ALLOCATION_ATTEMPTS = 10
+
+
+def allocate_skus(bases):
+    """
+    Gera um SKU único para cada base ("PRODUTO-COR-TAMANHO") em memória,
+    conferindo colisões com os SKUs já gravados em uma única consulta por
+    rodada (normalmente só uma). Retorna a lista na mesma ordem das bases.
+    """
+    skus = [None] * len(bases)
+    pending = list(range(len(bases)))
+    taken = set()
+
+    for _ in range(SKU_ALLOCATION_ATTEMPTS):
+        candidates = {}
+        for position in pending:
+            sku = f"{bases[position]}-{generate_random_suffix()}"
+            while sku in taken or sku in candidates:
+                sku = f"{bases[position]}-{generate_random_suffix()}"
+            candidates[sku] = position
+
+        existing = set(
+            ProductVariation.objects.filter(sku__in=candidates)
+            .order_by()
+            .values_list("sku", flat=True)
+        )
+        pending = []
+        for sku, position in candidates.items():
+            if sku in existing:
+                pending.append(position)
+            else:
+                skus[position] = sku
+                taken.add(sku)
+        if not pending:
+            return skus
+
+    raise ServiceDuplicateError("Não foi possível gerar SKUs únicos para a grade.")
+
+
+def _resolve_references(reference, values, label):
+    """Converte ids/instâncias em objetos do cache, mantendo a ordem e sem repetições."""
+    resolved = []
+    seen = set()
+    for value in values:
+        pk = getattr(value, "pk", value)
+        obj = reference.get(int(pk)) if str(pk).isdigit() else None
+        if obj is None:
+            raise ServiceValidationError(f"{label} inválido(a): {value}.")
+        if obj.pk not in seen:
+            seen.add(obj.pk)
+            resolved.append(obj)
+    return resolved
+
+
+def create_variation_matrix(product: Product, colors, sizes, minimum_stock: int = 0):
+    """
+    Cria em lote as variações de um produto para todas as combinações de
+    cores × tamanhos informadas. Combinações já existentes são mantidas.
+
+    Os SKUs são gerados em memória (uma consulta de colisão) e as variações
+    gravadas com um único bulk_create. Como o bulk_create não dispara
+    signals, documento de busca, métricas e índice do autocomplete são
+    atualizados explicitamente ao final.
+
+    Returns:
+        dict com "colors", "sizes", "rows" (uma linha por cor, com uma
+        célula {"size", "status", "variation"} por tamanho), "created" e
+        "existing" (quantidades).
+
+    Raises:
+        ServiceValidationError: Sem cores/tamanhos, com ids inválidos ou se
+            outra requisição gravar o mesmo SKU/combinação ao mesmo tempo.
+        ServiceDuplicateError: Se não for possível gerar SKUs únicos.
+    """
+    color_list = _resolve_references(reference_colors, colors, "Cor")
+    size_list = _resolve_references(reference_sizes, sizes, "Tamanho")
+    if not color_list or not size_list:
+        raise ServiceValidationError("Selecione ao menos uma cor e um tamanho.")
+
+    with transaction.atomic():
+        existing = {
+            (variation.color_id, variation.size_id): variation
+            for variation in ProductVariation.objects.filter(
+                product=product,
+                color__in=[color.pk for color in color_list],
+                size__in=[size.pk for size in size_list],
+            )
+        }
+
+        missing = [
+            (color, size)
+            for color in color_list
+            for size in size_list
+            if (color.pk, size.pk) not in existing
+        ]
+        skus = allocate_skus(
+            [generate_sku_base(product.name, color.name, size.name) for color, size in missing]
+        )
+        try:
+            created = ProductVariation.objects.bulk_create(
+                [
+                    ProductVariation(
+                        product=product,
+                        color=color,
+                        size=size,
+                        sku=sku,
+                        minimum_stock=minimum_stock,
+                    )
+                    for (color, size), sku in zip(missing, skus)
+                ]
+            )
+        except IntegrityError:
+            # SKU ou cor/tamanho gravados por outra requisição entre a
+            # conferência acima e o bulk_create (a transação é desfeita)
+            raise ServiceValidationError(
+                "Outra alteração gravou variações deste produto ao mesmo tempo. Tente novamente."
+            )
+
+        if created:
+            refresh_search_documents([product.pk])
+            refresh_product_metrics([product.pk])
+            invalidate_catalog()
+
+    created_map = {(variation.color_id, variation.size_id): variation for variation in created}
+    rows = []
+    for color in color_list:
+        cells = []
+        for size in size_list:
+            key = (color.pk, size.pk)
+            if key in created_map:
+                cells.append({"size": size, "status": MATRIX_CREATED, "variation": created_map[key]})
+            else:
+                cells.append({"size": size, "status": MATRIX_EXISTING, "variation": existing[key]})
+        rows.append({"color": color, "cells": cells})
+
+    return {
+        "colors": color_list,
+        "sizes": size_list,
+        "rows": rows,
+        "created": len(created),
+        "existing": len(existing),
+    }
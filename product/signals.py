@@ -0,0 +1,120 @@
+# product/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import invalidate_catalog
+from .facets import invalidate_facets
+from .metrics import refresh_product_metrics
+from .models import Category, Color, Product, ProductSupplier, ProductVariation, Size, Supplier
+from .reference import get_reference
+from .search import refresh_search_documents
+from .stock_grid import invalidate_stock_grid
+
+# Campos de ProductVariation que entram no documento de busca
+SEARCH_VARIATION_FIELDS = {"sku", "product"}
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_search_documents([instance.pk])
+    # Recalcula a partir das tabelas de origem (a instância pode estar
+    # desatualizada) e devolve os valores gravados para a instância
+    for field, value in refresh_product_metrics([instance.pk]).get(instance.pk, {}).items():
+        setattr(instance, field, value)
+
+
+@receiver(post_save, sender=ProductVariation)
+@receiver(post_delete, sender=ProductVariation)
+@receiver(post_save, sender=ProductSupplier)
+@receiver(post_delete, sender=ProductSupplier)
+def product_child_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Movimentos de estoque salvam só o estoque: o documento não muda
+    if update_fields is not None and not SEARCH_VARIATION_FIELDS & set(update_fields):
+        return
+    refresh_search_documents([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    refresh_search_documents(instance.products.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Supplier)
+def supplier_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    refresh_search_documents(instance.products.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=ProductVariation)
+@receiver(post_delete, sender=ProductVariation)
+@receiver(post_save, sender=ProductSupplier)
+@receiver(post_delete, sender=ProductSupplier)
+def product_metrics_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Saídas e entradas de estoque atualizam total_stock de forma incremental
+    # nos serviços de estoque
+    if update_fields is not None and set(update_fields) <= {"stock", "updated_at"}:
+        return
+    refresh_product_metrics([instance.product_id])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductVariation)
+@receiver(post_delete, sender=ProductVariation)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+def catalog_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # O estoque não aparece no autocomplete
+    if update_fields is not None and set(update_fields) <= {"stock", "updated_at"}:
+        return
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=ProductVariation)
+@receiver(post_delete, sender=ProductVariation)
+def stock_grid_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Inclui as movimentações de estoque (save com update_fields=["stock"])
+    invalidate_stock_grid([instance.product_id])
+
+
+@receiver(post_save, sender=ProductVariation)
+@receiver(post_delete, sender=ProductVariation)
+@receiver(post_save, sender=ProductSupplier)
+@receiver(post_delete, sender=ProductSupplier)
+def facets_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Movimentações de estoque só mudam o filtro "em estoque" quando o estoque
+    # cruza o zero: os serviços de estoque invalidam nesse caso
+    if update_fields is not None and set(update_fields) <= {"stock", "updated_at"}:
+        return
+    invalidate_facets()
+
+
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def reference_data_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    get_reference(sender).invalidate()
@@ -0,0 +1,255 @@
+# product/stock_grid.py
+"""
+Grade de estoque cor × tamanho.
+
+Cada célula traz estoque, estoque mínimo e unidades vendidas nos últimos
+30 dias. A grade de um produto (ou de uma categoria inteira, somando os
+produtos) sai de uma única consulta agrupada por cor e tamanho, com as
+vendas em uma subconsulta correlacionada por variação.
+
+A grade de um produto fica em cache junto com a versão do produto em que
+foi montada (incrementada pelos signals de ProductVariation, inclusive nas
+movimentações de estoque) e a versão do catálogo (renomear cor/tamanho e
+gravações em lote); a leitura traz as duas chaves numa consulta ao cache.
+As vendas "saem" da janela de 30 dias sem nenhum evento, por isso o cache
+também expira por tempo.
+"""
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Min, Sum
+from django.utils import timezone
+
+from base.versions import increment_version, start_version
+from stock.models import StockMovement, StockReservation
+
+from .autocomplete import get_catalog_version
+from .best_sellers import SALES_WINDOW, units_sold_subquery
+from .facets import invalidate_facets
+from .metrics import refresh_product_metrics
+from .models import ProductVariation
+from .services import ServiceValidationError
+
+GRID_CACHE_TIMEOUT = 60 * 60
+
+GRID_NOTE = "Ajuste pela grade de estoque"
+
+
+# Versão por produto
+def _version_key(product_id):
+    return f"product:stock-grid:{product_id}:version"
+
+
+def _grid_key(product_id):
+    return f"product:stock-grid:{product_id}"
+
+
+def _increment_versions(product_ids):
+    for product_id in product_ids:
+        increment_version(_version_key(product_id))
+
+
+def invalidate_stock_grid(product_ids):
+    """
+    Descarta a grade em cache dos produtos agora e de novo após o commit,
+    para que uma leitura concorrente não guarde dados anteriores ao commit.
+    """
+    product_ids = set(product_ids)
+    _increment_versions(product_ids)
+    transaction.on_commit(lambda: _increment_versions(product_ids))
+
+
+# Consulta
+def _grid_cells(variations, since):
+    """Uma consulta agrupada por cor e tamanho sobre as variações informadas."""
+    return (
+        variations.order_by()
+        .annotate(sold=units_sold_subquery(since))
+        .values("color_id", "color__name", "size_id", "size__name")
+        .annotate(
+            stock=Sum("stock"),
+            minimum_stock=Sum("minimum_stock"),
+            sold_30d=Sum("sold"),
+            variation_count=Count("pk"),
+            variation_id=Min("pk"),
+        )
+        .order_by("color__name", "size__name")
+    )
+
+
+def build_stock_grid(variations, now=None):
+    """
+    Monta a grade a partir de um queryset de variações:
+    {"colors", "sizes", "rows": [{"color", "cells": [célula ou None]}], "totals"}.
+    """
+    since = (now or timezone.now()) - SALES_WINDOW
+    colors = {}
+    sizes = {}
+    cells = {}
+    for row in _grid_cells(variations, since):
+        colors[row["color_id"]] = row["color__name"]
+        sizes[row["size_id"]] = row["size__name"]
+        cells[(row["color_id"], row["size_id"])] = {
+            # Na grade de uma categoria a célula soma várias variações
+            "variation_id": row["variation_id"] if row["variation_count"] == 1 else None,
+            "stock": row["stock"],
+            "minimum_stock": row["minimum_stock"],
+            "sold_30d": row["sold_30d"],
+            "below_minimum": row["stock"] <= row["minimum_stock"],
+        }
+
+    size_list = [{"id": pk, "name": name} for pk, name in sizes.items()]
+    size_list.sort(key=lambda size: size["name"])
+    rows = [
+        {
+            "color": {"id": pk, "name": name},
+            "cells": [cells.get((pk, size["id"])) for size in size_list],
+        }
+        for pk, name in colors.items()
+    ]
+    totals = {
+        field: sum(cell[field] for cell in cells.values())
+        for field in ("stock", "minimum_stock", "sold_30d")
+    }
+    return {
+        "colors": [row["color"] for row in rows],
+        "sizes": size_list,
+        "rows": rows,
+        "totals": totals,
+    }
+
+
+def get_product_stock_grid(product_id):
+    """
+    Grade de um produto, em cache até a próxima alteração das variações.
+    A versão do produto e a grade guardada saem do cache numa única leitura.
+    """
+    version_key, grid_key = _version_key(product_id), _grid_key(product_id)
+    cached = cache.get_many([version_key, grid_key])
+    version = cached.get(version_key)
+    if version is None:
+        version = start_version(version_key)
+    version = (version, get_catalog_version())
+
+    entry = cached.get(grid_key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    grid = build_stock_grid(ProductVariation.objects.filter(product_id=product_id))
+    # Dentro de uma transação os dados podem não ter sido confirmados
+    if not connection.in_atomic_block:
+        cache.set(grid_key, (version, grid), GRID_CACHE_TIMEOUT)
+    return grid
+
+
+def get_category_stock_grid(category_id):
+    """Grade somando as variações ativas de todos os produtos da categoria."""
+    return build_stock_grid(
+        ProductVariation.active.filter(product__category_id=category_id)
+    )
+
+
+# Edição em lote
+def _parse_quantity(value, label):
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        raise ServiceValidationError(f"{label} inválido: {value!r}.")
+    if quantity < 0:
+        raise ServiceValidationError(f"{label} não pode ser negativo.")
+    return quantity
+
+
+@transaction.atomic
+def update_stock_grid(product_id, changes, user):
+    """
+    Grava as edições da grade: `changes` = {variation_id: {"stock": n,
+    "minimum_stock": m}} (campos opcionais). As variações alteradas vão em um
+    bulk_update e cada diferença de estoque gera um movimento de ajuste.
+    Retorna a quantidade de variações alteradas.
+
+    Raises:
+        ServiceValidationError: Formato inválido, quantidade inválida,
+            estoque abaixo das unidades reservadas ou variação de outro produto.
+    """
+    if not isinstance(changes, dict):
+        raise ServiceValidationError("As alterações devem ser um objeto {variação: valores}.")
+    parsed = {}
+    for variation_id, values in changes.items():
+        try:
+            variation_id = int(variation_id)
+        except (TypeError, ValueError):
+            raise ServiceValidationError(f"Variação inválida: {variation_id!r}.")
+        if not isinstance(values, dict):
+            raise ServiceValidationError(f"Valores inválidos para a variação {variation_id}.")
+        parsed[variation_id] = {
+            field: _parse_quantity(values[field], label)
+            for field, label in (("stock", "Estoque"), ("minimum_stock", "Estoque mínimo"))
+            if values.get(field) not in (None, "")
+        }
+
+    variations = list(
+        ProductVariation.objects.select_for_update(of=("self",))
+        .select_related("product")
+        .filter(product_id=product_id, pk__in=parsed)
+        .order_by("pk")
+    )
+    if len(variations) != len(parsed):
+        raise ServiceValidationError("Variação não encontrada para este produto.")
+
+    now = timezone.now()
+    # Unidades em carrinhos abertos (com as variações travadas, não surgem novas)
+    reserved = dict(
+        StockReservation.objects.filter(product_variation__in=variations, expires_at__gt=now)
+        .values("product_variation_id")
+        .annotate(total=Sum("quantity"))
+        .values_list("product_variation_id", "total")
+    )
+    changed = []
+    movements = []
+    for variation in variations:
+        values = parsed[variation.pk]
+        stock = values.get("stock", variation.stock)
+        minimum_stock = values.get("minimum_stock", variation.minimum_stock)
+        if (stock, minimum_stock) == (variation.stock, variation.minimum_stock):
+            continue
+        if stock < variation.stock and stock < reserved.get(variation.pk, 0):
+            raise ServiceValidationError(
+                f"Estoque de {variation.sku} não pode ficar abaixo das unidades "
+                f"reservadas em carrinhos abertos ({reserved[variation.pk]})."
+            )
+        if stock != variation.stock:
+            delta = stock - variation.stock
+            movements.append(
+                StockMovement(
+                    product_variation=variation,
+                    movement_type=(
+                        StockMovement.MovementType.AJUSTE_ENTRADA
+                        if delta > 0
+                        else StockMovement.MovementType.AJUSTE_SAIDA
+                    ),
+                    quantity=abs(delta),
+                    user=user,
+                    # Entradas exigem custo (StockMovement.clean)
+                    unit_price=(
+                        variation.product.average_cost or variation.product.selling_price
+                        if delta > 0
+                        else None
+                    ),
+                    notes=GRID_NOTE,
+                )
+            )
+        variation.stock = stock
+        variation.minimum_stock = minimum_stock
+        variation.updated_at = now
+        changed.append(variation)
+
+    if not changed:
+        return 0
+
+    ProductVariation.objects.bulk_update(changed, ["stock", "minimum_stock", "updated_at"])
+    StockMovement.objects.bulk_create(movements)
+
+    # bulk_update não dispara signals
+    refresh_product_metrics([product_id])
+    invalidate_stock_grid([product_id])
+    invalidate_facets()
+    return len(changed)
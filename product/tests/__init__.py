@@ -4,9 +4,18 @@ Pacote de testes do módulo product.
 Os testes estão organizados em arquivos separados para melhor manutenção:
 - test_models.py: Testes dos modelos (Category, Color, Size, Supplier, Product, ProductVariation, ProductSupplier)
 - test_managers.py: Testes dos managers customizados (ProductQuerySet, ActiveProductVariationManager)
-- test_services.py: Testes dos serviços (create_category, create_supplier, etc)
+- test_services.py: Testes dos serviços (create_category, create_supplier, grade de variações, etc)
 - test_forms.py: Testes dos formulários e formsets
 - test_views.py: Testes das views (CRUD e AJAX)
 - test_utils.py: Testes das funções utilitárias (generate_sku, standardize_name)
 - test_integration.py: Testes de integração e fluxos completos
+- test_autocomplete.py: Testes do índice em memória do autocomplete do PDV
+- test_catalog.py: Testes da importação/exportação do catálogo (CSV/XLSX)
+- test_pricing.py: Testes do reajuste de preços em lote e do histórico de preços
+- test_reference.py: Testes do cache de dados de referência (cor, tamanho, categoria, fornecedor)
+- test_stock_grid.py: Testes da grade de estoque cor × tamanho
+- test_facets.py: Testes dos filtros facetados da lista de produtos
+- test_labels.py: Testes das etiquetas de preço (Code128/EAN-13, ZPL e PDF)
+- test_best_sellers.py: Testes dos contadores de mais vendidos e do ranking
+- test_recommendations.py: Testes das recomendações "comprados juntos"
 """
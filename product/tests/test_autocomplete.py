@@ -0,0 +1,108 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from product import autocomplete
+from product.autocomplete import VariationSearchIndex, build_label, search_variations
+from product.models import Category, Color, Product, ProductVariation, Size
+
+
+class AutocompleteIndexTests(TestCase):
+    """Testes para o índice em memória do autocomplete do PDV"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Lingerie")
+        self.red = Color.objects.create(name="Vermelho")
+        self.size_m = Size.objects.create(name="M")
+        self.no_color = Color.objects.create(name="N/A")
+        self.no_size = Size.objects.create(name="N/A")
+
+        self.bra = Product.objects.create(
+            name="Sutiã Amamentação", category=self.category, selling_price=Decimal("89.90")
+        )
+        self.bra_variation = ProductVariation.objects.create(
+            product=self.bra, color=self.red, size=self.size_m, sku="SUT-VER-M-001"
+        )
+        self.pad = Product.objects.create(
+            name="Absorvente de Seios", category=self.category, selling_price=Decimal("19.90")
+        )
+        ProductVariation.objects.create(
+            product=self.pad, color=self.no_color, size=self.no_size, sku="ABS-NA-NA-002"
+        )
+
+    def test_rotulo_ignora_cor_e_tamanho_na(self):
+        """Teste que o rótulo omite cor e tamanho "N/A\""""
+        self.assertEqual(build_label("Sutiã", "Vermelho", "M"), "Sutiã - Vermelho M")
+        self.assertEqual(build_label("Sutiã", "N/A", "M"), "Sutiã - M")
+        self.assertEqual(build_label("Sutiã", "N/A", "N/A"), "Sutiã")
+
+    def test_busca_sem_acento_e_por_prefixo(self):
+        """Teste que a busca ignora acentos e casa prefixos de palavras"""
+        results = search_variations("amamentacao")
+        self.assertEqual(
+            results,
+            [{"label": "Sutiã Amamentação - Vermelho M", "value": "SUT-VER-M-001", "price": 89.9}],
+        )
+        self.assertEqual(len(search_variations("SUTI")), 1)
+
+    def test_busca_por_sku_e_partes_do_sku(self):
+        """Teste que o SKU casa pelo prefixo completo e por cada parte"""
+        self.assertEqual(search_variations("sut-ver")[0]["value"], "SUT-VER-M-001")
+        self.assertEqual(search_variations("002")[0]["value"], "ABS-NA-NA-002")
+
+    def test_busca_combina_termos_com_cor_e_tamanho(self):
+        """Teste que todos os termos precisam casar (nome, cor e tamanho)"""
+        self.assertEqual(len(search_variations("sutia vermelho")), 1)
+        self.assertEqual(search_variations("sutia azul"), [])
+
+    def test_variacao_inativa_fica_fora_do_indice(self):
+        """Teste que variações inativas não aparecem"""
+        self.bra_variation.is_active = False
+        self.bra_variation.save()
+        self.assertEqual(search_variations("sutia"), [])
+
+    def test_alteracao_de_produto_invalida_o_indice(self):
+        """Teste que renomear o produto reflete na busca seguinte"""
+        self.assertEqual(len(search_variations("sutia")), 1)
+        self.bra.name = "Top Amamentação"
+        self.bra.save()
+        self.assertEqual(search_variations("sutia"), [])
+        self.assertEqual(search_variations("top")[0]["label"], "Top Amamentação - Vermelho M")
+
+    def test_consulta_ao_indice_nao_acessa_o_banco(self):
+        """Teste que a busca em um índice já montado não faz consultas"""
+        index = VariationSearchIndex.from_database()
+        with self.assertNumQueries(0):
+            results = index.search("sutia")
+        self.assertEqual(len(results), 1)
+
+    def test_indice_montado_fora_de_transacao_e_reaproveitado(self):
+        """Teste que o índice é guardado e só é remontado quando a versão muda"""
+        outside_transaction = mock.patch.object(
+            autocomplete, "connection", mock.Mock(in_atomic_block=False)
+        )
+        autocomplete.invalidate_catalog()
+        with outside_transaction:
+            first = autocomplete.get_search_index()
+            self.assertIs(autocomplete.get_search_index(), first)
+
+        autocomplete._increment_catalog_version()
+        with outside_transaction:
+            self.assertIsNot(autocomplete.get_search_index(), first)
+        autocomplete.invalidate_catalog()
+
+    def test_api_do_pdv_usa_o_indice(self):
+        """Teste que o endpoint do PDV retorna os rótulos do índice"""
+        user = get_user_model().objects.create_user(
+            email="caixa@exemplo.com", password="senha123"
+        )
+        self.client.force_login(user)
+        response = self.client.get(reverse("sales:api-search-products"), {"term": "absor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            [{"label": "Absorvente de Seios", "value": "ABS-NA-NA-002", "price": 19.9}],
+        )
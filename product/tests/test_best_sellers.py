@@ -0,0 +1,133 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from product.autocomplete import VariationSearchIndex
+from product.best_sellers import recompute_best_sellers, top_selling_variations
+from product.models import Category, Color, Product, ProductVariation, Size
+from sales.models import CashRegister, Sale, SaleItem, SalePayment
+from stock.services import add_stock
+
+User = get_user_model()
+
+
+class BestSellerCountersTests(TestCase):
+    """Testes dos contadores de mais vendidos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="caixa@exemplo.com", password="senha123")
+        self.category = Category.objects.create(name="Lingerie")
+        self.black = Color.objects.create(name="Preto")
+        self.size_m = Size.objects.create(name="M")
+        self.size_g = Size.objects.create(name="G")
+        self.bra = Product.objects.create(
+            name="Sutiã Amamentação", category=self.category, selling_price=Decimal("89.90")
+        )
+        self.bra_m = ProductVariation.objects.create(
+            product=self.bra, color=self.black, size=self.size_m
+        )
+        self.bra_g = ProductVariation.objects.create(
+            product=self.bra, color=self.black, size=self.size_g
+        )
+        self.panty = Product.objects.create(
+            name="Calcinha Pós-Parto", category=self.category, selling_price=Decimal("39.90")
+        )
+        self.panty_m = ProductVariation.objects.create(
+            product=self.panty, color=self.black, size=self.size_m
+        )
+        for variation in (self.bra_m, self.bra_g, self.panty_m):
+            add_stock(variation.pk, 20, self.user, Decimal("20.00"))
+        self.register = CashRegister.objects.create(
+            user=self.user, opening_balance=Decimal("0.00")
+        )
+
+    def _sell(self, *lines):
+        sale = Sale.objects.create(user=self.user, cash_register_session=self.register)
+        for variation, quantity in lines:
+            SaleItem.objects.create(sale=sale, variation=variation, quantity=quantity)
+        sale.calculate_totals()
+        SalePayment.objects.create(sale=sale, amount=sale.net_amount)
+        sale.complete_sale()
+        return sale
+
+    def _counters(self, obj):
+        obj.refresh_from_db()
+        return obj.units_sold_30d, obj.units_sold_total
+
+    def test_venda_concluida_e_cancelada_atualizam_os_contadores(self):
+        """Teste a atualização incremental na conclusão e no cancelamento"""
+        sale = self._sell((self.bra_m, 2), (self.bra_g, 1))
+        self._sell((self.bra_m, 3))
+
+        self.assertEqual(self._counters(self.bra_m), (5, 5))
+        self.assertEqual(self._counters(self.bra_g), (1, 1))
+        self.assertEqual(self._counters(self.bra), (6, 6))
+        self.assertEqual(self._counters(self.panty), (0, 0))
+
+        sale.cancel_sale()
+        self.assertEqual(self._counters(self.bra_m), (3, 3))
+        self.assertEqual(self._counters(self.bra), (3, 3))
+
+    def test_cancelamento_fora_da_janela_so_altera_o_total(self):
+        """Teste que cancelar uma venda antiga não mexe na janela de 30 dias"""
+        old_sale = self._sell((self.panty_m, 4))
+        self._sell((self.panty_m, 1))
+        Sale.objects.filter(pk=old_sale.pk).update(
+            completed_at=timezone.now() - timedelta(days=40)
+        )
+        recompute_best_sellers()
+        self.assertEqual(self._counters(self.panty_m), (1, 5))
+
+        Sale.objects.get(pk=old_sale.pk).cancel_sale()
+        self.assertEqual(self._counters(self.panty_m), (1, 1))
+        self.assertEqual(self._counters(self.panty), (1, 1))
+
+    def test_recalculo_noturno(self):
+        """Teste que o recálculo corrige a janela e, com full, o total"""
+        self._sell((self.bra_m, 2))
+        old_sale = self._sell((self.bra_g, 7))
+        Sale.objects.filter(pk=old_sale.pk).update(
+            completed_at=timezone.now() - timedelta(days=31)
+        )
+        # Contadores divergentes (ex: vendas anteriores aos contadores)
+        ProductVariation.objects.filter(pk=self.panty_m.pk).update(units_sold_total=50)
+
+        recompute_best_sellers()
+        self.assertEqual(self._counters(self.bra_g), (0, 7))
+        self.assertEqual(self._counters(self.bra), (2, 9))
+        self.assertEqual(self._counters(self.panty_m), (0, 50))
+
+        recompute_best_sellers(full=True)
+        self.assertEqual(self._counters(self.panty_m), (0, 0))
+        self.assertEqual(self._counters(self.bra), (2, 9))
+
+    def test_ranking_no_autocomplete_na_lista_e_no_pdv(self):
+        """Teste que autocomplete, lista e painel do PDV usam os contadores"""
+        self._sell((self.panty_m, 1), (self.bra_g, 4))
+
+        index = VariationSearchIndex.from_database()
+        self.assertEqual(
+            [result["value"] for result in index.search("preto")],
+            [self.bra_g.sku, self.panty_m.sku, self.bra_m.sku],
+        )
+
+        self.assertEqual(list(top_selling_variations()), [self.bra_g, self.panty_m])
+
+        self.client.force_login(self.user)
+        url = reverse("product:product-list")
+        response = self.client.get(url, {"query": "lingerie"})
+        self.assertEqual(response.context["sort"], "best_sellers")
+        self.assertEqual(
+            [product.name for product in response.context["products"]],
+            ["Sutiã Amamentação", "Calcinha Pós-Parto"],
+        )
+        response = self.client.get(url, {"query": "lingerie", "sort": "name"})
+        self.assertEqual(response.context["pagination_query"], "query=lingerie&sort=name")
+        self.assertEqual(
+            [product.name for product in response.context["products"]],
+            ["Calcinha Pós-Parto", "Sutiã Amamentação"],
+        )
@@ -0,0 +1,252 @@
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from product.catalog import (
+    CATALOG_COLUMNS,
+    CatalogFormatError,
+    import_catalog,
+    iter_catalog_csv,
+    iter_catalog_rows,
+)
+from product.models import Category, Color, Product, ProductSupplier, ProductVariation, Size
+from product.services import ServiceDuplicateError
+from sales.models import CashRegister, Sale, SaleItem
+from stock.models import StockMovement
+from stock.services import reserve_stock
+
+User = get_user_model()
+
+HEADER = ";".join(CATALOG_COLUMNS)
+
+
+def csv_file(*lines):
+    return io.BytesIO("\n".join((HEADER,) + lines).encode("utf-8"))
+
+
+class CatalogImportTests(TestCase):
+    """Testes para a importação do catálogo"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="estoque@exemplo.com", password="senha123")
+
+    def test_importa_produtos_variacoes_custos_e_estoque(self):
+        """Teste que a importação cria produtos, variações, custos e movimentos de estoque"""
+        result = import_catalog(
+            csv_file(
+                "Vestido Longo;Vestidos;;149,90;sim;;Azul;M;5;1;sim;\"Fornecedor A=60.00; Fornecedor B=65,50\"",
+                "Vestido Longo;Vestidos;;149,90;sim;;Azul;G;0;1;sim;",
+                "Body Básico;Bodies;Algodão;39.90;sim;BOD-BA-UN-001;;;3;;sim;",
+            ),
+            self.user,
+            batch_size=2,
+        )
+
+        self.assertEqual(result.error_count, 0)
+        self.assertEqual(result.created_products, 2)
+        self.assertEqual(result.created_variations, 3)
+
+        dress = Product.objects.get(name="Vestido Longo")
+        self.assertEqual(dress.selling_price, Decimal("149.90"))
+        self.assertEqual(dress.category.name, "Vestidos")
+        self.assertEqual(dress.total_stock, 5)
+        self.assertEqual(dress.average_cost, Decimal("62.75"))
+        self.assertEqual(
+            ProductSupplier.objects.get(product=dress, supplier__name="Fornecedor B").cost_price,
+            Decimal("65.50"),
+        )
+
+        body = ProductVariation.objects.get(sku="BOD-BA-UN-001")
+        self.assertEqual((body.color.name, body.size.name), ("N/A", "N/A"))
+        entries = StockMovement.objects.filter(
+            movement_type=StockMovement.MovementType.AJUSTE_ENTRADA
+        ).order_by("product_variation__product__name")
+        # Custo dos fornecedores da linha ou, sem fornecedor, o preço de venda
+        self.assertEqual(
+            [movement.unit_price for movement in entries], [Decimal("39.90"), Decimal("62.75")]
+        )
+        for movement in entries:
+            movement.full_clean()
+
+    def test_reimportacao_atualiza_e_ajusta_estoque(self):
+        """Teste que reimportar faz upsert e registra o ajuste de estoque pela diferença"""
+        import_catalog(csv_file("Vestido Longo;Vestidos;;149.90;sim;;Azul;M;5;1;sim;"), self.user)
+        result = import_catalog(
+            csv_file("Vestido Longo;Vestidos;;159.90;sim;;Azul;M;2;1;sim;"), self.user
+        )
+
+        self.assertEqual(result.created_products, 0)
+        self.assertEqual(result.updated_products, 1)
+        self.assertEqual(result.updated_variations, 1)
+        variation = ProductVariation.objects.get(product__name="Vestido Longo")
+        self.assertEqual(variation.stock, 2)
+        movement = StockMovement.objects.get(
+            movement_type=StockMovement.MovementType.AJUSTE_SAIDA
+        )
+        self.assertEqual(movement.quantity, 3)
+
+    def test_estoque_abaixo_das_reservas_e_rejeitado(self):
+        """Teste que a importação não reduz o estoque abaixo das unidades reservadas"""
+        import_catalog(csv_file("Vestido Longo;Vestidos;;149.90;sim;VES-1;Azul;M;5;1;sim;"), self.user)
+        variation = ProductVariation.objects.get(sku="VES-1")
+        register = CashRegister.objects.create(user=self.user, opening_balance=Decimal("0.00"))
+        sale = Sale.objects.create(user=self.user, cash_register_session=register)
+        reserve_stock(SaleItem.objects.create(sale=sale, variation=variation, quantity=3), 3)
+
+        result = import_catalog(
+            csv_file("Vestido Longo;Vestidos;;149.90;sim;VES-1;Azul;M;2;1;sim;"), self.user
+        )
+
+        self.assertEqual(result.error_count, 1)
+        self.assertIn("reservadas", result.errors[0][1])
+        variation.refresh_from_db()
+        self.assertEqual(variation.stock, 5)
+
+        result = import_catalog(
+            csv_file("Vestido Longo;Vestidos;;149.90;sim;VES-1;Azul;M;3;1;sim;"), self.user
+        )
+        self.assertEqual(result.error_count, 0)
+        variation.refresh_from_db()
+        self.assertEqual(variation.stock, 3)
+
+    def test_arquivo_so_com_precos_mantem_os_demais_dados(self):
+        """Teste que colunas opcionais ausentes não apagam descrição nem reativam registros"""
+        import_catalog(
+            csv_file("Vestido Longo;Vestidos;Alças reguláveis;149.90;não;VES-1;Azul;M;5;1;não;"),
+            self.user,
+        )
+
+        result = import_catalog(
+            io.BytesIO(b"produto;categoria;preco_venda\nVestido Longo;Vestidos;159,90\n"),
+            self.user,
+        )
+
+        self.assertEqual(result.error_count, 0)
+        product = Product.objects.get(name="Vestido Longo")
+        self.assertEqual(product.selling_price, Decimal("159.90"))
+        self.assertEqual(product.description, "Alças reguláveis")
+        self.assertFalse(product.is_active)
+        variation = ProductVariation.objects.get(sku="VES-1")
+        self.assertFalse(variation.is_active)
+        self.assertEqual(variation.stock, 5)
+
+    def test_falha_ao_gerar_skus_descarta_so_o_lote(self):
+        """Teste que a falta de SKUs livres vira erro do lote, sem abortar a importação"""
+        with mock.patch(
+            "product.catalog.allocate_skus",
+            side_effect=[ServiceDuplicateError("Sem SKUs livres."), ["CAL-1"]],
+        ):
+            result = import_catalog(
+                csv_file("Saia;Saias;;79.90;sim;;Preta;P;;;sim;", "Calça;Calças;;89.90;sim;;;;;;;"),
+                self.user,
+                batch_size=1,
+            )
+
+        self.assertEqual(result.error_count, 1)
+        self.assertEqual(result.errors[0][0], 2)
+        self.assertIn("Lote não gravado", result.errors[0][1])
+        self.assertFalse(Product.objects.filter(name="Saia").exists())
+        self.assertTrue(ProductVariation.objects.filter(sku="CAL-1").exists())
+
+    def test_importa_xlsx(self):
+        """Teste que a importação lê planilhas XLSX"""
+        import openpyxl
+
+        workbook = openpyxl.Workbook()
+        workbook.active.append(CATALOG_COLUMNS)
+        workbook.active.append(
+            ["Body Básico", "Bodies", None, 39.9, "sim", "BOD-1", None, None, 3, None, None, None]
+        )
+        content = io.BytesIO()
+        workbook.save(content)
+        content.seek(0)
+
+        result = import_catalog(content, self.user, file_format="xlsx")
+
+        self.assertEqual(result.error_count, 0)
+        variation = ProductVariation.objects.get(sku="BOD-1")
+        self.assertEqual((variation.stock, variation.is_active), (3, True))
+        self.assertEqual(variation.product.selling_price, Decimal("39.90"))
+
+    def test_linhas_com_erro_sao_reportadas_sem_abortar(self):
+        """Teste que erros por linha não impedem a importação das demais"""
+        result = import_catalog(
+            csv_file(
+                ";Vestidos;;10;sim;;;;;;;",
+                "Saia;Saias;;abc;sim;;;;;;;",
+                "Blusa;Blusas;;49.90;talvez;;;;;;;",
+                "Calça;Calças;;89.90;sim;;;;;;;",
+            ),
+            self.user,
+        )
+
+        self.assertEqual(result.rows, 4)
+        self.assertEqual(result.error_count, 3)
+        self.assertEqual([line for line, _message in result.errors], [2, 3, 4])
+        self.assertTrue(Product.objects.filter(name="Calça").exists())
+
+    def test_sku_de_outra_variacao_e_rejeitado(self):
+        """Teste que um SKU já usado por outra variação gera erro na linha"""
+        import_catalog(csv_file("Saia;Saias;;79.90;sim;SAI-X;Preta;P;;;sim;"), self.user)
+        result = import_catalog(csv_file("Saia;Saias;;79.90;sim;SAI-X;Preta;M;;;sim;"), self.user)
+
+        self.assertEqual(result.error_count, 1)
+        self.assertIn("SAI-X", result.errors[0][1])
+
+    def test_arquivo_sem_colunas_obrigatorias(self):
+        """Teste que cabeçalho incompleto levanta CatalogFormatError"""
+        with self.assertRaises(CatalogFormatError):
+            import_catalog(io.BytesIO(b"produto;sku\nVestido;VES-1\n"), self.user)
+
+
+class CatalogExportTests(TestCase):
+    """Testes para a exportação do catálogo"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="estoque@exemplo.com", password="senha123")
+        category = Category.objects.create(name="Vestidos")
+        self.product = Product.objects.create(
+            name="Vestido Longo", selling_price=Decimal("149.90"), category=category
+        )
+        self.variation = ProductVariation.objects.create(
+            product=self.product,
+            color=Color.objects.create(name="Azul"),
+            size=Size.objects.create(name="M"),
+            stock=4,
+        )
+
+    def test_exportacao_reimportada_nao_altera_nada(self):
+        """Teste que o CSV exportado pode ser reimportado sem alterações"""
+        content = "".join(iter_catalog_csv(iter_catalog_rows()))
+        self.assertIn(self.variation.sku, content)
+
+        result = import_catalog(io.BytesIO(content.encode("utf-8")), self.user)
+        self.assertEqual(result.error_count, 0)
+        self.assertEqual(result.updated_products, 0)
+        self.assertEqual(result.updated_variations, 0)
+        self.assertEqual(result.created_variations, 0)
+
+    def test_view_exporta_csv_em_streaming(self):
+        """Teste que a view devolve o CSV em streaming"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("product:catalog-export"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertTrue(content.lstrip("﻿").startswith(HEADER))
+        self.assertIn("Vestido Longo", content)
+
+    def test_view_importa_arquivo_enviado(self):
+        """Teste que a view de importação processa o upload e exibe o resumo"""
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile(
+            "catalogo.csv", csv_file("Body;Bodies;;39.90;sim;;;;2;;sim;").getvalue()
+        )
+        response = self.client.post(reverse("product:catalog-import"), {"file": upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["result"].created_products, 1)
@@ -0,0 +1,166 @@
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+
+from base import versions
+from product import autocomplete, facets
+from product.facets import count_facets, get_facet_index, get_facets, parse_facet_filters
+from product.models import (
+    Category,
+    Color,
+    Product,
+    ProductSupplier,
+    ProductVariation,
+    Size,
+    Supplier,
+)
+from product.services import get_filtered_products
+from stock.services import remove_stock
+
+User = get_user_model()
+
+
+class FacetedFilteringTests(TestCase):
+    """Testes para os filtros facetados da lista de produtos"""
+
+    def setUp(self):
+        # Relógio parado e versões já lidas: as contagens de consultas dos
+        # testes são só as do índice, não as do cache de versões
+        clock = mock.Mock(monotonic=mock.Mock(return_value=time.monotonic()))
+        patcher = mock.patch.object(versions, "time", clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        autocomplete.get_catalog_version()
+        facets.get_facet_version()
+
+        self.lingerie = Category.objects.create(name="Lingerie")
+        self.dresses = Category.objects.create(name="Vestidos")
+        self.black = Color.objects.create(name="Preto")
+        self.nude = Color.objects.create(name="Nude")
+        self.size_m = Size.objects.create(name="M")
+        self.size_g = Size.objects.create(name="G")
+        self.supplier = Supplier.objects.create(name="Fornecedor Gestante")
+
+        # Sutiã: G sem estoque, M com estoque
+        self.bra = Product.objects.create(
+            name="Sutiã Amamentação", category=self.lingerie, selling_price=Decimal("89.90")
+        )
+        ProductVariation.objects.create(product=self.bra, color=self.black, size=self.size_g, stock=0)
+        ProductVariation.objects.create(product=self.bra, color=self.nude, size=self.size_m, stock=5)
+        ProductSupplier.objects.create(product=self.bra, supplier=self.supplier, cost_price=Decimal("40"))
+
+        # Calcinha: G com estoque
+        self.panty = Product.objects.create(
+            name="Calcinha Pós-Parto", category=self.lingerie, selling_price=Decimal("39.90")
+        )
+        ProductVariation.objects.create(product=self.panty, color=self.black, size=self.size_g, stock=3)
+
+        # Vestido: G com estoque, outra categoria
+        self.dress = Product.objects.create(
+            name="Vestido Longo", category=self.dresses, selling_price=Decimal("250.00")
+        )
+        ProductVariation.objects.create(product=self.dress, color=self.nude, size=self.size_g, stock=2)
+
+    def _filters(self, query_string):
+        return parse_facet_filters(QueryDict(query_string))
+
+    def _options(self, result, name):
+        facet = next(facet for facet in result["choices"] if facet["name"] == name)
+        return {option["name"]: option["count"] for option in facet["options"]}
+
+    def test_filtro_tamanho_estoque_e_categoria_na_mesma_variacao(self):
+        """Teste "Tamanho G, em estoque, Lingerie": a variação G precisa ter estoque"""
+        filters = self._filters(
+            f"size={self.size_g.pk}&in_stock=1&category={self.lingerie.pk}"
+        )
+        products = get_filtered_products(filters=filters)["products"]
+        self.assertEqual([p.name for p in products], ["Calcinha Pós-Parto"])
+
+    def test_contagens_disjuntivas_sem_consultas_com_o_indice_montado(self):
+        """Teste que cada faceta conta com os demais filtros, direto do índice em memória"""
+        filters = self._filters(f"size={self.size_g.pk}&in_stock=1")
+        with mock.patch.object(facets, "connection", mock.Mock(in_atomic_block=False)):
+            with self.assertNumQueries(2):
+                get_facet_index()
+            with self.assertNumQueries(0):
+                counts = count_facets(filters)
+
+        # Tamanho ignora o próprio filtro: M conta o sutiã (em estoque)
+        self.assertEqual(counts["size"], {self.size_g.pk: 2, self.size_m.pk: 1})
+        self.assertEqual(counts["category"], {self.lingerie.pk: 1, self.dresses.pk: 1})
+        self.assertEqual(counts["supplier"], {})
+        # Com o filtro de estoque: calcinha e vestido têm variação G em estoque
+        self.assertEqual(counts["in_stock"], 2)
+
+    def test_facetas_com_nomes_faixas_de_preco_e_selecao(self):
+        """Teste o formato das facetas exibidas na lista"""
+        result = get_facets(self._filters(f"color={self.black.pk}"))
+
+        self.assertEqual(self._options(result, "color"), {"Nude": 2, "Preto": 2})
+        self.assertEqual(self._options(result, "category"), {"Lingerie": 2})
+        self.assertEqual(self._options(result, "supplier"), {"Fornecedor Gestante": 1})
+        self.assertEqual(
+            self._options(result, "price"),
+            {"Até R$ 50.00": 1, "R$ 50.00 a R$ 100.00": 1, "R$ 100.00 a R$ 200.00": 0,
+             "A partir de R$ 200.00": 0},
+        )
+        color = next(facet for facet in result["choices"] if facet["name"] == "color")
+        selected = [option["name"] for option in color["options"] if option["selected"]]
+        self.assertEqual(selected, ["Preto"])
+        self.assertEqual(result["in_stock"], {"count": 1, "selected": False})
+
+    def test_indice_reaproveitado_ate_mudar_catalogo_ou_estoque(self):
+        """Teste que o índice é reaproveitado até uma alteração do catálogo ou do estoque"""
+        filters = self._filters("")
+        outside_transaction = mock.patch.object(
+            facets, "connection", mock.Mock(in_atomic_block=False)
+        )
+        with outside_transaction:
+            get_facets(filters)
+            with self.assertNumQueries(0):
+                get_facets(filters)
+
+        self.dress.category = self.lingerie
+        self.dress.save()
+        # O signal publica a nova versão após o commit
+        autocomplete._increment_catalog_version()
+        with outside_transaction:
+            result = get_facets(filters)
+        self.assertEqual(self._options(result, "category"), {"Lingerie": 3})
+
+        # Movimentação de estoque que não zera o estoque mantém o índice
+        user = User.objects.create_user(email="caixa@exemplo.com", password="senha123")
+        variation = self.bra.variations.get(size=self.size_m)
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_stock(variation.pk, 4, user)
+        with outside_transaction, self.assertNumQueries(0):
+            get_facets(filters)
+
+        # Zerar o estoque altera a faceta "em estoque"
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_stock(variation.pk, 1, user)
+        with outside_transaction:
+            result = get_facets(filters)
+        self.assertEqual(result["in_stock"]["count"], 2)
+
+    def test_lista_exibe_facetas_e_preserva_filtros_na_paginacao(self):
+        """Teste que a lista exibe as contagens e mantém os filtros nos links"""
+        user = User.objects.create_user(email="teste@exemplo.com", password="senha123")
+        self.client.force_login(user)
+        response = self.client.get(
+            reverse("product:product-list"), {"size": self.size_g.pk, "in_stock": "1"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Em estoque (2)")
+        self.assertEqual(
+            response.context["pagination_query"], f"size={self.size_g.pk}&in_stock=1"
+        )
+        self.assertEqual(len(response.context["products"]), 2)
+
+        response = self.client.get(reverse("product:api-product-facets"), {"query": "vestido"})
+        self.assertEqual(response.json()["in_stock"]["count"], 1)
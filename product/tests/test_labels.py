@@ -0,0 +1,169 @@
+import re
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from product import labels
+from product.models import Category, Color, Product, ProductVariation, Size, Supplier
+from sales.forms import AddItemForm
+from stock.services import add_stock
+
+User = get_user_model()
+
+
+class BarcodeTests(TestCase):
+    """Testes da codificação Code128/EAN-13"""
+
+    def test_code128_subconjuntos_b_e_c(self):
+        """Teste o início, o dígito verificador e o stop do Code128"""
+        modules = labels.code128_modules("Wikipedia")
+        # Start B, "W" ... e stop
+        self.assertTrue(modules.startswith("11010010000" + "11101000110"))
+        self.assertTrue(modules.endswith("1100011101011"))
+        self.assertEqual(len(modules), (1 + 9 + 1) * 11 + 13)
+
+        # Só dígitos, em pares: subconjunto C (metade dos símbolos)
+        numeric = labels.code128_modules("12345678")
+        self.assertTrue(numeric.startswith("11010011100"))
+        self.assertEqual(len(numeric), (1 + 4 + 1) * 11 + 13)
+
+        with self.assertRaises(labels.BarcodeError):
+            labels.code128_modules("Calça")
+
+    def test_ean13_interno(self):
+        """Teste o EAN-13 derivado do id da variação"""
+        self.assertEqual(labels.ean13_check_digit("400638133393"), "1")
+        self.assertEqual(labels.internal_ean13(42), "2000000000428")
+        modules = labels.ean13_modules("2000000000428")
+        self.assertEqual(len(modules), 95)
+        self.assertTrue(modules.startswith("101") and modules.endswith("101"))
+        self.assertEqual(modules[45:50], "01010")
+
+        with self.assertRaises(labels.BarcodeError):
+            labels.ean13_modules("2000000000429")
+
+
+class LabelJobTests(TestCase):
+    """Testes dos lotes de etiquetas (origens, ZPL e PDF)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="teste@exemplo.com", password="senha123")
+        self.category = Category.objects.create(name="Lingerie")
+        self.supplier = Supplier.objects.create(name="Fornecedor Gestante")
+        self.other_supplier = Supplier.objects.create(name="Outro Fornecedor")
+        self.black = Color.objects.create(name="Preto")
+        self.size_m = Size.objects.create(name="M")
+        self.size_g = Size.objects.create(name="G")
+        self.product = Product.objects.create(
+            name="Sutiã Amamentação", category=self.category, selling_price=Decimal("89.90")
+        )
+        self.variation_m = ProductVariation.objects.create(
+            product=self.product, color=self.black, size=self.size_m
+        )
+        self.variation_g = ProductVariation.objects.create(
+            product=self.product, color=self.black, size=self.size_g
+        )
+
+    def _receive(self, variation, quantity, supplier):
+        add_stock(variation.pk, quantity, self.user, Decimal("40.00"), supplier_id=supplier.pk)
+
+    def test_recebimento_gera_uma_etiqueta_por_unidade_em_zpl(self):
+        """Teste que o recebimento soma as entradas do fornecedor no dia"""
+        self._receive(self.variation_m, 3, self.supplier)
+        self._receive(self.variation_m, 2, self.supplier)
+        self._receive(self.variation_g, 4, self.other_supplier)
+
+        variations = labels.receipt_variations(self.supplier, timezone.localdate())
+        output = "".join(labels.iter_labels(variations, output_format=labels.ZPL))
+
+        self.assertEqual(output.count("^XA"), 1)
+        self.assertIn("^PQ5^XZ", output)
+        self.assertIn("^FDSutiã Amamentação^FS", output)
+        self.assertIn("^FDPreto / M^FS", output)
+        self.assertIn("^FDR$ 89,90^FS", output)
+        self.assertIn(f"^BCN,80,Y,N,N^FD{self.variation_m.sku}^FS", output)
+
+    def test_pdf_paginado_com_xref_valida(self):
+        """Teste que o PDF sai página a página e com os offsets corretos"""
+        variations = labels.filtered_variations(category=self.category, copies=15)
+        chunks = list(labels.iter_labels(variations, symbology=labels.EAN13))
+        pdf = b"".join(chunks)
+
+        # Cabeçalho, 2 páginas (30 etiquetas, 24 por folha) e o fechamento
+        self.assertEqual(len(chunks), 4)
+        self.assertTrue(pdf.startswith(b"%PDF-1.4"))
+        self.assertTrue(pdf.endswith(b"%%EOF\n"))
+        self.assertIn(b"/Count 2", pdf)
+        self.assertEqual(pdf.count(b"(R$ 89,90) Tj"), 30)
+
+        startxref = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+        self.assertTrue(pdf[startxref:].startswith(b"xref"))
+        offsets = re.findall(rb"(\d{10}) 00000 n ", pdf)
+        for object_id, offset in enumerate(offsets, 1):
+            self.assertTrue(pdf[int(offset):].startswith(b"%d 0 obj" % object_id))
+
+        # O desenho das barras de cada variação é reaproveitado entre as cópias
+        info = labels.pdf_barcode.cache_info()
+        self.assertGreaterEqual(info.hits, 28)
+
+    def test_filtro_com_uma_etiqueta_por_unidade_em_estoque(self):
+        """Teste a remarcação: uma etiqueta por unidade em estoque"""
+        self._receive(self.variation_g, 2, self.supplier)
+        items = list(
+            labels.iter_label_items(labels.filtered_variations(query="sutia", per_unit=True))
+        )
+        self.assertEqual([(item["details"], item["copies"]) for item in items], [("Preto / G", 2)])
+
+    def test_view_lista_de_skus(self):
+        """Teste o lote a partir de uma lista de SKUs e a validação dos SKUs"""
+        self.client.force_login(self.user)
+        url = reverse("product:label-job")
+        data = {
+            "source": "LISTA",
+            "output_format": labels.ZPL,
+            "symbology": labels.CODE128,
+            "copies": 1,
+            "skus": f"{self.variation_m.sku};3\n{self.variation_g.sku}\n",
+        }
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        output = b"".join(response.streaming_content).decode()
+        self.assertIn("^PQ3^XZ", output)
+        self.assertIn("^PQ1^XZ", output)
+
+        response = self.client.post(url, {**data, "skus": "NAO-EXISTE"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("NAO-EXISTE", str(response.context["form"].errors["skus"]))
+
+    def test_sku_fora_do_code128_e_recusado_antes_do_streaming(self):
+        """Teste que um SKU sem Code128 vira erro do formulário, não um PDF truncado"""
+        ProductVariation.objects.filter(pk=self.variation_g.pk).update(sku="SUTIÃ-PRETO-G")
+        self.client.force_login(self.user)
+        url = reverse("product:label-job")
+        data = {
+            "source": "FILTRO",
+            "output_format": labels.PDF,
+            "symbology": labels.CODE128,
+            "category": self.category.pk,
+            "copies": 1,
+        }
+        response = self.client.post(url, data)
+        self.assertFalse(response.streaming)
+        self.assertIn("SUTIÃ-PRETO-G", str(response.context["form"].errors["symbology"]))
+
+        # O EAN-13 interno não depende do SKU
+        response = self.client.post(url, {**data, "symbology": labels.EAN13})
+        self.assertTrue(response.streaming)
+        self.assertTrue(b"".join(response.streaming_content).endswith(b"%%EOF\n"))
+
+    def test_pdv_reconhece_o_ean13_interno(self):
+        """Teste que o código EAN-13 da etiqueta é aceito no PDV"""
+        self._receive(self.variation_g, 1, self.supplier)
+        code = labels.internal_ean13(self.variation_g.pk)
+        form = AddItemForm(data={"sku_or_barcode": code, "quantity": 1})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data["sku_or_barcode"], self.variation_g)
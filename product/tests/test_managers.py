@@ -1,5 +1,8 @@
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from decimal import Decimal
+from io import StringIO
 from product.models import (
     Category,
     Product,
@@ -9,6 +12,7 @@ from product.models import (
     Color,
     Size,
 )
+from stock.services import add_stock, remove_stock
 
 
 class ProductQuerySetTests(TestCase):
@@ -98,6 +102,21 @@ class ProductQuerySetTests(TestCase):
         # Margem = ((100 - 60) / 100) * 100 = 40%
         self.assertEqual(product.profit_margin, Decimal("40.00"))
     
+    def test_margem_limitada_quando_custo_e_muito_maior_que_o_preco(self):
+        """Teste que a margem não estoura a coluna com preço irrisório"""
+        self.product.selling_price = Decimal("0.01")
+        self.product.save()
+        supplier = Supplier.objects.create(name="Fornecedor A")
+        ProductSupplier.objects.create(
+            product=self.product,
+            supplier=supplier,
+            cost_price=Decimal("50.00")
+        )
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.average_cost, Decimal("50.00"))
+        self.assertEqual(self.product.profit_margin, Decimal("-99999.99"))
+    
     def test_with_average_profit_margin_multiplos_fornecedores(self):
         """Teste cálculo de custo médio com múltiplos fornecedores"""
         supplier1 = Supplier.objects.create(name="Fornecedor A")
@@ -187,3 +206,72 @@ class ActiveProductVariationManagerTests(TestCase):
         self.assertEqual(active_variations.count(), 1)
         self.assertEqual(active_variations.first().product, self.product)
 
+
+
+class ProductMetricsTests(TestCase):
+    """Testes das métricas desnormalizadas do produto"""
+
+    def setUp(self):
+        """Configuração inicial"""
+        self.user = get_user_model().objects.create_user(
+            email='metricas@exemplo.com',
+            password='senha123'
+        )
+        self.category = Category.objects.create(name="Teste")
+        self.product = Product.objects.create(
+            name="Produto Teste",
+            selling_price=Decimal("100.00"),
+            category=self.category
+        )
+        self.color = Color.objects.create(name="Preto")
+        self.size = Size.objects.create(name="M")
+        self.variation = ProductVariation.objects.create(
+            product=self.product,
+            color=self.color,
+            size=self.size,
+            stock=10
+        )
+
+    def test_variacao_atualiza_metricas(self):
+        """Teste que salvar variações mantém estoque e contagem atualizados"""
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_stock, 10)
+        self.assertEqual(self.product.active_variation_count, 1)
+
+        self.variation.is_active = False
+        self.variation.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_stock, 0)
+        self.assertEqual(self.product.active_variation_count, 0)
+
+    def test_servicos_de_estoque_atualizam_estoque_total(self):
+        """Teste que entradas e saídas atualizam o estoque total de forma incremental"""
+        add_stock(self.variation.pk, 5, self.user, unit_price=Decimal("40.00"))
+        remove_stock(self.variation.pk, 3, self.user)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_stock, 12)
+
+    def test_preco_de_venda_atualiza_margem(self):
+        """Teste que alterar o preço de venda recalcula a margem"""
+        supplier = Supplier.objects.create(name="Fornecedor A")
+        ProductSupplier.objects.create(
+            product=self.product, supplier=supplier, cost_price=Decimal("60.00")
+        )
+        self.product.selling_price = Decimal("120.00")
+        self.product.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.average_cost, Decimal("60.00"))
+        self.assertEqual(self.product.profit_margin, Decimal("50.00"))
+
+    def test_comando_recalcula_metricas(self):
+        """Teste que o comando corrige métricas fora de sincronia"""
+        Product.objects.update(total_stock=999, active_variation_count=0)
+
+        call_command("recompute_product_metrics", batch_size=1, stdout=StringIO())
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_stock, 10)
+        self.assertEqual(self.product.active_variation_count, 1)
@@ -0,0 +1,179 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from product.autocomplete import search_variations
+from product.models import (
+    Category,
+    PriceChange,
+    PriceHistory,
+    Product,
+    ProductSupplier,
+    ProductVariation,
+    Supplier,
+)
+from product.pricing import (
+    apply_due_price_changes,
+    cancel_price_change,
+    create_price_change,
+)
+from product.services import ServiceValidationError
+
+User = get_user_model()
+
+
+class BulkRepricingTests(TestCase):
+    """Testes para o reajuste de preços em lote"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="gerente@exemplo.com", password="senha123")
+        self.dresses = Category.objects.create(name="Vestidos")
+        self.bras = Category.objects.create(name="Sutiãs")
+        self.dress = Product.objects.create(
+            name="Vestido Longo", selling_price=Decimal("100.00"), category=self.dresses
+        )
+        self.dress2 = Product.objects.create(
+            name="Vestido Curto", selling_price=Decimal("59.90"), category=self.dresses
+        )
+        self.bra = Product.objects.create(
+            name="Sutiã Amamentação", selling_price=Decimal("80.00"), category=self.bras
+        )
+
+    def test_percentual_por_categoria_com_arredondamento_90(self):
+        """Teste que o reajuste percentual por categoria arredonda para ,90"""
+        change = create_price_change(
+            adjustment_type=PriceChange.AdjustmentType.PERCENTUAL,
+            value=Decimal("-20"),
+            category=self.dresses,
+            user=self.user,
+        )
+
+        self.assertEqual(change.status, PriceChange.Status.APLICADO)
+        self.assertEqual(change.affected_products, 2)
+        self.dress.refresh_from_db()
+        self.dress2.refresh_from_db()
+        self.bra.refresh_from_db()
+        self.assertEqual(self.dress.selling_price, Decimal("79.90"))  # 80,00 -> 79,90
+        self.assertEqual(self.dress2.selling_price, Decimal("47.90"))  # 47,92 -> 47,90
+        self.assertEqual(self.bra.selling_price, Decimal("80.00"))
+
+        history = PriceHistory.objects.get(product=self.dress)
+        self.assertEqual((history.old_price, history.new_price), (Decimal("100.00"), Decimal("79.90")))
+        self.assertEqual(history.price_change, change)
+        self.assertEqual(history.user, self.user)
+
+    def test_valor_absoluto_sem_arredondamento_e_margem_recalculada(self):
+        """Teste o reajuste em R$ por fornecedor, atualizando a margem"""
+        supplier = Supplier.objects.create(name="Fornecedor Gestante")
+        ProductSupplier.objects.create(
+            product=self.bra, supplier=supplier, cost_price=Decimal("40.00")
+        )
+
+        create_price_change(
+            adjustment_type=PriceChange.AdjustmentType.VALOR,
+            value=Decimal("20.00"),
+            supplier=supplier,
+            round_to_90=False,
+        )
+
+        self.bra.refresh_from_db()
+        self.assertEqual(self.bra.selling_price, Decimal("100.00"))
+        self.assertEqual(self.bra.profit_margin, Decimal("60.00"))
+        self.dress.refresh_from_db()
+        self.assertEqual(self.dress.selling_price, Decimal("100.00"))
+
+    def test_margem_extrema_nao_aborta_o_reajuste(self):
+        """Teste que um produto com custo muito acima do preço não impede o reajuste"""
+        supplier = Supplier.objects.create(name="Fornecedor Gestante")
+        ProductSupplier.objects.create(
+            product=self.bra, supplier=supplier, cost_price=Decimal("5000.00")
+        )
+
+        create_price_change(
+            adjustment_type=PriceChange.AdjustmentType.VALOR,
+            value=Decimal("-79.99"),
+            category=self.bras,
+            round_to_90=False,
+        )
+
+        self.bra.refresh_from_db()
+        self.assertEqual(self.bra.selling_price, Decimal("0.01"))
+        self.assertEqual(self.bra.profit_margin, Decimal("-99999.99"))
+
+    def test_reajuste_em_uma_unica_atualizacao(self):
+        """Teste que os produtos são atualizados em um único UPDATE"""
+        with self.assertNumQueries(10) as ctx:
+            create_price_change(
+                adjustment_type=PriceChange.AdjustmentType.PERCENTUAL,
+                value=Decimal("10"),
+            )
+        updates = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith('UPDATE "product_product"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(PriceHistory.objects.count(), 3)
+
+    def test_reajuste_agendado_aplicado_pelo_job(self):
+        """Teste que o reajuste com vigência futura só é aplicado pelo job"""
+        change = create_price_change(
+            adjustment_type=PriceChange.AdjustmentType.PERCENTUAL,
+            value=Decimal("10"),
+            query="sutia",
+            effective_at=timezone.now() + timedelta(days=1),
+        )
+        self.assertEqual(change.status, PriceChange.Status.PENDENTE)
+        self.assertEqual(apply_due_price_changes(), [])
+
+        applied = apply_due_price_changes(now=timezone.now() + timedelta(days=2))
+        self.assertEqual(applied[0][1], 1)
+        self.bra.refresh_from_db()
+        self.assertEqual(self.bra.selling_price, Decimal("87.90"))
+
+        with self.assertRaises(ServiceValidationError):
+            cancel_price_change(change)
+
+    def test_reajuste_atualiza_preco_do_autocomplete(self):
+        """Teste que o novo preço aparece no autocomplete do PDV"""
+        ProductVariation.objects.create(product=self.bra)
+        self.assertEqual(search_variations("sutia")[0]["price"], 80.0)
+
+        create_price_change(
+            adjustment_type=PriceChange.AdjustmentType.VALOR,
+            value=Decimal("10"),
+            category=self.bras,
+        )
+        self.assertEqual(search_variations("sutia")[0]["price"], 89.9)
+
+    def test_valores_invalidos(self):
+        """Teste que reajuste zero ou redução de 100% levantam erro"""
+        with self.assertRaises(ServiceValidationError):
+            create_price_change(adjustment_type=PriceChange.AdjustmentType.VALOR, value=0)
+        with self.assertRaises(ServiceValidationError):
+            create_price_change(
+                adjustment_type=PriceChange.AdjustmentType.PERCENTUAL, value=-100
+            )
+
+    def test_view_agenda_e_cancela_reajuste(self):
+        """Teste que a tela agenda um reajuste e permite cancelá-lo"""
+        self.client.force_login(self.user)
+        response = self.client.post(reverse("product:price-change"), {
+            "description": "Liquidação de inverno",
+            "adjustment_type": PriceChange.AdjustmentType.PERCENTUAL,
+            "value": "-30",
+            "round_to_90": "on",
+            "category": self.dresses.pk,
+            "query": "",
+            "effective_at": (timezone.localtime() + timedelta(days=3)).strftime("%Y-%m-%dT%H:%M"),
+        })
+        self.assertRedirects(response, reverse("product:price-change"))
+        change = PriceChange.objects.get()
+        self.assertEqual(change.status, PriceChange.Status.PENDENTE)
+
+        self.client.post(reverse("product:price-change-cancel", args=[change.pk]))
+        change.refresh_from_db()
+        self.assertEqual(change.status, PriceChange.Status.CANCELADO)
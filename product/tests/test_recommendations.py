@@ -0,0 +1,181 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from customer.models import Customer
+from product.models import (
+    Category,
+    Color,
+    Product,
+    ProductCooccurrence,
+    ProductRecommendation,
+    ProductVariation,
+    RecommendationState,
+    Size,
+)
+from product.recommendations import (
+    WATERMARK_LAG,
+    recommend_for_products,
+    refresh_recommendations,
+)
+from sales.models import CashRegister, Sale, SaleItem, SalePayment
+from stock.services import add_stock
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    """Testes das recomendações "comprados juntos" """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="caixa@exemplo.com", password="senha123")
+        self.category = Category.objects.create(name="Lingerie")
+        self.black = Color.objects.create(name="Preto")
+        self.size_m = Size.objects.create(name="M")
+        self.products = {}
+        self.variations = {}
+        for name, price in (
+            ("Sutiã Amamentação", "89.90"),
+            ("Calcinha Pós-Parto", "39.90"),
+            ("Concha de Silicone", "29.90"),
+            ("Cinta Modeladora", "119.90"),
+        ):
+            product = Product.objects.create(
+                name=name, category=self.category, selling_price=Decimal(price)
+            )
+            variation = ProductVariation.objects.create(
+                product=product, color=self.black, size=self.size_m
+            )
+            add_stock(variation.pk, 50, self.user, Decimal("10.00"))
+            self.products[name] = product
+            self.variations[name] = variation
+        self.register = CashRegister.objects.create(
+            user=self.user, opening_balance=Decimal("0.00")
+        )
+
+    def _sell(self, *names, customer=None):
+        sale = Sale.objects.create(
+            user=self.user, cash_register_session=self.register, customer=customer
+        )
+        for name in names:
+            SaleItem.objects.create(sale=sale, variation=self.variations[name], quantity=1)
+        sale.calculate_totals()
+        SalePayment.objects.create(sale=sale, amount=sale.net_amount)
+        sale.complete_sale()
+        return sale
+
+    def _refresh(self, **kwargs):
+        return refresh_recommendations(now=timezone.now() + WATERMARK_LAG, **kwargs)
+
+    def _recommended(self, name):
+        return list(
+            ProductRecommendation.objects.filter(product=self.products[name]).values_list(
+                "recommended__name", "score"
+            )
+        )
+
+    def test_atualizacao_incremental_a_partir_da_marca_dagua(self):
+        """Teste que cada execução processa só as vendas novas"""
+        self._sell("Sutiã Amamentação", "Calcinha Pós-Parto")
+        self._sell("Sutiã Amamentação", "Calcinha Pós-Parto", "Concha de Silicone")
+        self._sell("Cinta Modeladora")
+
+        result = self._refresh()
+        self.assertEqual(result, {"baskets": 2, "products": 3})
+        self.assertEqual(self._recommended("Sutiã Amamentação"), [("Calcinha Pós-Parto", 2)])
+        # Concha saiu junto uma vez só: abaixo do suporte mínimo
+        self.assertEqual(self._recommended("Concha de Silicone"), [])
+
+        # Sem vendas novas, nada é reprocessado
+        self.assertEqual(self._refresh(), {"baskets": 0, "products": 0})
+
+        self._sell("Sutiã Amamentação", "Concha de Silicone")
+        self.assertEqual(self._refresh(), {"baskets": 1, "products": 2})
+        self.assertEqual(
+            self._recommended("Sutiã Amamentação"),
+            [("Calcinha Pós-Parto", 2), ("Concha de Silicone", 2)],
+        )
+        self.assertIsNotNone(RecommendationState.objects.get().processed_until)
+
+    def test_cancelamento_subtrai_a_cesta_e_full_reconstroi(self):
+        """Teste que o cancelamento desfaz os pares e que o recálculo completo coincide"""
+        sale = self._sell("Sutiã Amamentação", "Calcinha Pós-Parto")
+        self._sell("Sutiã Amamentação", "Calcinha Pós-Parto")
+        self._sell("Calcinha Pós-Parto", "Cinta Modeladora")
+        self._refresh()
+        self.assertEqual(self._recommended("Calcinha Pós-Parto"), [("Sutiã Amamentação", 2)])
+
+        Sale.objects.get(pk=sale.pk).cancel_sale()
+        self._refresh()
+        self.assertEqual(self._recommended("Calcinha Pós-Parto"), [])
+        incremental = set(
+            ProductCooccurrence.objects.values_list("product_id", "other_id", "count")
+        )
+        self.assertIn(
+            (self.products["Sutiã Amamentação"].pk, self.products["Calcinha Pós-Parto"].pk, 1),
+            incremental,
+        )
+
+        self._refresh(full=True)
+        self.assertEqual(
+            set(ProductCooccurrence.objects.values_list("product_id", "other_id", "count")),
+            incremental,
+        )
+
+    def test_sugestoes_do_carrinho_em_uma_consulta(self):
+        """Teste a soma dos scores dos itens do carrinho com uma única consulta"""
+        for _ in range(3):
+            self._sell("Sutiã Amamentação", "Concha de Silicone")
+        for _ in range(2):
+            self._sell("Calcinha Pós-Parto", "Concha de Silicone", "Cinta Modeladora")
+        self._refresh()
+
+        cart = [self.products["Sutiã Amamentação"].pk, self.products["Calcinha Pós-Parto"].pk]
+        with self.assertNumQueries(1):
+            suggestions = recommend_for_products(cart)
+        self.assertEqual(
+            [(item["name"], item["score"], item["sku"]) for item in suggestions],
+            [
+                ("Concha de Silicone", 5, self.variations["Concha de Silicone"].sku),
+                ("Cinta Modeladora", 2, self.variations["Cinta Modeladora"].sku),
+            ],
+        )
+
+        # Sem estoque, o produto não é sugerido
+        ProductVariation.objects.filter(pk=self.variations["Cinta Modeladora"].pk).update(stock=0)
+        self.assertEqual(
+            [item["name"] for item in recommend_for_products(cart)], ["Concha de Silicone"]
+        )
+
+    def test_sugestoes_no_pdv_e_no_cliente(self):
+        """Teste o painel de sugestões do PDV e o bloco do detalhe do cliente"""
+        customer = Customer.objects.create(
+            name="Maria Silva", cpf_cnpj="52998224725", email="maria@exemplo.com"
+        )
+        self._sell("Sutiã Amamentação", "Calcinha Pós-Parto", customer=customer)
+        self._sell("Sutiã Amamentação", "Calcinha Pós-Parto")
+        self._sell("Sutiã Amamentação", "Cinta Modeladora")
+        self._sell("Sutiã Amamentação", "Cinta Modeladora")
+        self._refresh()
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("customer:customer_detail", args=[customer.pk]))
+        self.assertEqual(
+            [item["name"] for item in response.context["recommended_products"]],
+            ["Cinta Modeladora"],
+        )
+
+        draft = Sale.objects.create(user=self.user, cash_register_session=self.register)
+        SaleItem.objects.create(
+            sale=draft, variation=self.variations["Calcinha Pós-Parto"], quantity=1
+        )
+        response = self.client.get(reverse("sales:pdv"))
+        self.assertEqual(response.context["sale"], draft)
+        self.assertEqual(
+            [item["name"] for item in response.context["suggestions"]],
+            ["Sutiã Amamentação"],
+        )
+        self.assertContains(response, "SUGESTÕES")
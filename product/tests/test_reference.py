@@ -0,0 +1,124 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.test import TestCase
+
+from product.forms import ProductVariationForm
+from product.models import Category, Color, Product, ProductVariation, Size, get_default_color
+from product.reference import colors
+
+
+class ReferenceDataCacheTests(TestCase):
+    """Testes para o cache de Cor/Tamanho/Categoria/Fornecedor"""
+
+    def setUp(self):
+        self.red = Color.objects.create(name="Vermelho")
+        self.size_m = Size.objects.create(name="M")
+        self.inactive_size = Size.objects.create(name="Gg", is_active=False)
+
+    def test_busca_por_id_e_por_nome_padronizado(self):
+        """Teste que o cache encontra registros por id e pelo nome padronizado"""
+        self.assertEqual(colors.get(self.red.pk).name, "Vermelho")
+        self.assertEqual(colors.get_by_name("  vermelho ").pk, self.red.pk)
+        self.assertIsNone(colors.get_by_name("Azul"))
+
+    def test_default_na_e_criado_uma_vez_e_depois_vem_do_cache(self):
+        """Teste que o default "N/A" não consulta o banco a cada variação"""
+        default_pk = get_default_color()
+        self.assertEqual(Color.objects.get(pk=default_pk).name, "N/A")
+        get_default_color()  # recarrega o cache após a criação do "N/A"
+
+        with self.assertNumQueries(0):
+            for _ in range(500):
+                self.assertEqual(get_default_color(), default_pk)
+
+    def test_instanciar_variacoes_sem_cor_e_tamanho_nao_consulta_o_banco(self):
+        """Teste que 500 variações sem cor/tamanho explícitos não geram 1.000 consultas"""
+        category = Category.objects.create(name="Vestidos")
+        product = Product.objects.create(
+            name="Vestido Longo", category=category, selling_price=Decimal("150.00")
+        )
+        # Aquece o cache (e cria os "N/A")
+        ProductVariation(product=product)
+        ProductVariation(product=product)
+
+        with self.assertNumQueries(0):
+            variations = [ProductVariation(product=product) for _ in range(500)]
+        self.assertEqual(len({(v.color_id, v.size_id) for v in variations}), 1)
+
+    def test_alteracao_invalida_o_cache(self):
+        """Teste que salvar um registro reflete na próxima leitura"""
+        colors.get(self.red.pk)
+        self.red.name = "Vinho"
+        self.red.save()
+        self.assertEqual(colors.get(self.red.pk).name, "Vinho")
+        self.assertIsNone(colors.get_by_name("Vermelho"))
+
+    def test_dados_de_transacao_desfeita_nao_ficam_no_cache(self):
+        """Teste que um registro criado em transação desfeita sai do cache"""
+        try:
+            with transaction.atomic():
+                Color.objects.create(name="Lilás")
+                self.assertIsNotNone(colors.get_by_name("Lilás"))
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertIsNone(colors.get_by_name("Lilás"))
+
+    def test_formulario_de_variacao_usa_o_cache(self):
+        """Teste que os selects são montados sem consultas e ignoram inativos"""
+        # Aquece o cache (e cria os "N/A" dos defaults)
+        list(ProductVariationForm().fields["size"].choices)
+        list(ProductVariationForm().fields["color"].choices)
+        with self.assertNumQueries(0):
+            form = ProductVariationForm()
+            size_labels = [label for _value, label in form.fields["size"].choices]
+            color_labels = [label for _value, label in form.fields["color"].choices]
+        self.assertIn("M", size_labels)
+        self.assertNotIn("Gg", size_labels)
+        self.assertIn("Vermelho", color_labels)
+
+        form = ProductVariationForm(
+            data={
+                "color": self.red.pk,
+                "size": self.inactive_size.pk,
+                "stock": 0,
+                "minimum_stock": 0,
+            }
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("size", form.errors)
+
+    def test_edicao_mantem_valor_atual_inativo(self):
+        """Teste que editar uma variação com tamanho desativado mantém o valor atual"""
+        category = Category.objects.create(name="Vestidos")
+        product = Product.objects.create(
+            name="Vestido Longo", category=category, selling_price=Decimal("150.00")
+        )
+        variation = ProductVariation.objects.create(
+            product=product, color=self.red, size=self.inactive_size
+        )
+
+        form = ProductVariationForm(instance=variation)
+        self.assertIn(self.inactive_size.pk, [value for value, _label in form.fields["size"].choices])
+        form = ProductVariationForm(
+            instance=variation,
+            data={"color": self.red.pk, "size": self.inactive_size.pk, "stock": 1, "minimum_stock": 0},
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_savepoint_desfeito_descarta_o_cache_da_transacao(self):
+        """Teste que o cache carregado em um savepoint desfeito não é reaproveitado"""
+        with transaction.atomic():
+            colors.get(self.red.pk)
+            try:
+                with transaction.atomic():
+                    self.red.name = "Vinho"
+                    self.red.save()
+                    self.assertEqual(colors.get(self.red.pk).name, "Vinho")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.assertEqual(colors.get(self.red.pk).name, "Vermelho")
+            with self.assertNumQueries(0):
+                colors.get(self.red.pk)
@@ -1,14 +1,28 @@
+from unittest import mock
+
 from django.test import TestCase
 from product.services import (
+    MATRIX_CREATED,
+    MATRIX_EXISTING,
     ServiceValidationError,
     ServiceDuplicateError,
+    allocate_skus,
     create_category,
     create_supplier,
     create_color,
     create_size,
+    create_variation_matrix,
     get_filtered_products,
 )
-from product.models import Category, Supplier, Color, Size, Product
+from product.models import (
+    Category,
+    Supplier,
+    Color,
+    Size,
+    Product,
+    ProductSupplier,
+    ProductVariation,
+)
 from decimal import Decimal
 
 
@@ -171,9 +185,19 @@ class GetFilteredProductsServiceTests(TestCase):
                 category=self.category
             )
         
-        result = get_filtered_products(per_page=10, page_number=1)
+        result = get_filtered_products(per_page=10)
         self.assertEqual(len(result['products']), 10)
         self.assertTrue(result['page_obj'].has_next())
+
+        # Segunda página a partir do cursor: sem repetir itens
+        next_page = get_filtered_products(
+            per_page=10, cursor=result['page_obj'].next_cursor
+        )
+        self.assertEqual(len(next_page['products']), 8)
+        self.assertFalse(next_page['page_obj'].has_next())
+        self.assertTrue(next_page['page_obj'].has_previous())
+        first_names = {p.name for p in result['products']}
+        self.assertFalse(first_names & {p.name for p in next_page['products']})
     
     def test_busca_case_insensitive(self):
         """Teste que a busca não diferencia maiúsculas/minúsculas"""
@@ -183,3 +207,137 @@ class GetFilteredProductsServiceTests(TestCase):
         result = get_filtered_products(query="notebook")
         self.assertEqual(result['products'].paginator.count, 1)
 
+
+    def test_busca_ignora_acentos(self):
+        """Teste que a busca ignora acentos nos dois sentidos"""
+        Product.objects.create(
+            name="Sutiã Amamentação",
+            selling_price=Decimal("80.00"),
+            category=self.category
+        )
+
+        result = get_filtered_products(query="sutia amamentacao")
+        self.assertEqual(result['products'].paginator.count, 1)
+
+        result = get_filtered_products(query="AMAMENTAÇÃO")
+        self.assertEqual(result['products'].paginator.count, 1)
+
+    def test_buscar_produtos_por_sku(self):
+        """Teste buscar produtos pelo SKU de uma variação"""
+        variation = ProductVariation.objects.create(product=self.product2)
+
+        result = get_filtered_products(query=variation.sku.lower())
+        self.assertEqual(result['products'].paginator.count, 1)
+        self.assertEqual(result['products'][0].name, "Mouse")
+
+    def test_buscar_produtos_por_fornecedor(self):
+        """Teste buscar produtos pelo nome do fornecedor"""
+        supplier = Supplier.objects.create(name="Distribuidora Gestar")
+        ProductSupplier.objects.create(
+            product=self.product3, supplier=supplier, cost_price=Decimal("70.00")
+        )
+
+        result = get_filtered_products(query="gestar")
+        self.assertEqual(result['products'].paginator.count, 1)
+        self.assertEqual(result['products'][0].name, "Teclado")
+
+    def test_busca_com_termos_fora_de_ordem(self):
+        """Teste que vários termos casam fora de ordem (tsvector com prefixo)"""
+        Product.objects.create(
+            name="Vestido Longo Azul",
+            selling_price=Decimal("120.00"),
+            category=self.category
+        )
+
+        result = get_filtered_products(query="vest azul")
+        self.assertEqual(result['products'].paginator.count, 1)
+
+    def test_busca_acompanha_renomeacao_da_categoria(self):
+        """Teste que renomear a categoria atualiza o documento de busca"""
+        self.category.name = "Informática"
+        self.category.save()
+
+        result = get_filtered_products(query="informatica")
+        self.assertEqual(result['products'].paginator.count, 3)
+
+
+class CreateVariationMatrixServiceTests(TestCase):
+    """Testes para o serviço create_variation_matrix"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Vestidos")
+        self.product = Product.objects.create(
+            name="Vestido Gestante Longo",
+            selling_price=Decimal("150.00"),
+            category=self.category,
+        )
+        self.colors = [Color.objects.create(name=f"Cor {i}") for i in range(6)]
+        self.sizes = [Size.objects.create(name=f"T{i}") for i in range(8)]
+
+    def test_cria_grade_completa_em_lote(self):
+        """Teste que 6 cores × 8 tamanhos geram 48 variações com SKUs únicos"""
+        with self.assertNumQueries(12):
+            result = create_variation_matrix(self.product, self.colors, self.sizes)
+
+        self.assertEqual(result["created"], 48)
+        self.assertEqual(result["existing"], 0)
+        self.assertEqual(len(result["rows"]), 6)
+        self.assertTrue(all(len(row["cells"]) == 8 for row in result["rows"]))
+
+        skus = ProductVariation.objects.filter(product=self.product).values_list("sku", flat=True)
+        self.assertEqual(len(set(skus)), 48)
+        self.assertTrue(all(sku.startswith("VESGEL-") for sku in skus))
+
+    def test_celulas_existentes_sao_mantidas(self):
+        """Teste que combinações já cadastradas não são duplicadas"""
+        existing = ProductVariation.objects.create(
+            product=self.product, color=self.colors[0], size=self.sizes[0]
+        )
+
+        result = create_variation_matrix(
+            self.product, [c.pk for c in self.colors[:2]], [s.pk for s in self.sizes[:2]]
+        )
+
+        self.assertEqual(result["created"], 3)
+        self.assertEqual(result["existing"], 1)
+        first_cell = result["rows"][0]["cells"][0]
+        self.assertEqual(first_cell["status"], MATRIX_EXISTING)
+        self.assertEqual(first_cell["variation"].pk, existing.pk)
+        self.assertEqual(result["rows"][1]["cells"][1]["status"], MATRIX_CREATED)
+
+    def test_atualiza_busca_e_metricas(self):
+        """Teste que o bulk_create atualiza documento de busca e métricas do produto"""
+        result = create_variation_matrix(self.product, self.colors[:1], self.sizes[:2])
+        sku = result["rows"][0]["cells"][0]["variation"].sku
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.active_variation_count, 2)
+        self.assertEqual(get_filtered_products(query=sku)["products"].paginator.count, 1)
+
+    def test_sku_com_colisao_e_sorteado_novamente(self):
+        """Teste que um SKU já existente é substituído por outro sufixo"""
+        ProductVariation.objects.create(
+            product=self.product, color=self.colors[0], size=self.sizes[0], sku="ABC-X-Y-AAA"
+        )
+        with mock.patch(
+            "product.services.generate_random_suffix", side_effect=["AAA", "BBB"]
+        ):
+            self.assertEqual(allocate_skus(["ABC-X-Y"]), ["ABC-X-Y-BBB"])
+
+    def test_sku_gravado_por_outra_requisicao_vira_erro_de_validacao(self):
+        """Teste que a colisão de SKU entre a conferência e a gravação não gera erro 500"""
+        ProductVariation.objects.create(
+            product=self.product, color=self.colors[0], size=self.sizes[0], sku="ABC-X-Y-AAA"
+        )
+        # allocate_skus conferiu antes de a outra requisição gravar o SKU
+        with mock.patch("product.services.allocate_skus", return_value=["ABC-X-Y-AAA"]):
+            with self.assertRaises(ServiceValidationError):
+                create_variation_matrix(self.product, self.colors[:1], self.sizes[:2])
+        self.assertEqual(self.product.variations.count(), 1)
+
+    def test_sem_cores_ou_tamanhos_levanta_erro(self):
+        """Teste que grade vazia ou ids inválidos levantam ServiceValidationError"""
+        with self.assertRaises(ServiceValidationError):
+            create_variation_matrix(self.product, [], self.sizes)
+        with self.assertRaises(ServiceValidationError):
+            create_variation_matrix(self.product, [999999], self.sizes)
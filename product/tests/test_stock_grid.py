@@ -0,0 +1,210 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from product import stock_grid
+from product.models import Category, Color, Product, ProductVariation, Size
+from product.services import ServiceValidationError
+from product.stock_grid import (
+    get_category_stock_grid,
+    get_product_stock_grid,
+    update_stock_grid,
+)
+from sales.models import Sale, SaleItem
+from stock.models import StockMovement
+from stock.services import add_stock, reserve_stock
+
+User = get_user_model()
+
+
+class StockGridTests(TestCase):
+    """Testes para a grade de estoque cor × tamanho"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="compras@exemplo.com", password="senha123")
+        self.category = Category.objects.create(name="Lingerie")
+        self.product = Product.objects.create(
+            name="Sutiã Amamentação", category=self.category, selling_price=Decimal("89.90")
+        )
+        self.black = Color.objects.create(name="Preto")
+        self.nude = Color.objects.create(name="Nude")
+        self.size_m = Size.objects.create(name="M")
+        self.size_g = Size.objects.create(name="G")
+        self.black_m = ProductVariation.objects.create(
+            product=self.product, color=self.black, size=self.size_m, stock=10, minimum_stock=3
+        )
+        self.black_g = ProductVariation.objects.create(
+            product=self.product, color=self.black, size=self.size_g, stock=2, minimum_stock=3
+        )
+        self.nude_m = ProductVariation.objects.create(
+            product=self.product, color=self.nude, size=self.size_m, stock=4
+        )
+
+    def _sell(self, variation, quantity, days_ago):
+        sale = Sale.objects.create(user=self.user)
+        SaleItem.objects.create(sale=sale, variation=variation, quantity=quantity)
+        Sale.objects.filter(pk=sale.pk).update(
+            status=Sale.Status.COMPLETED,
+            completed_at=timezone.now() - timedelta(days=days_ago),
+        )
+
+    def _cell(self, grid, color, size):
+        row = next(row for row in grid["rows"] if row["color"]["id"] == color.pk)
+        column = next(i for i, s in enumerate(grid["sizes"]) if s["id"] == size.pk)
+        return row["cells"][column]
+
+    def test_grade_do_produto_em_uma_consulta(self):
+        """Teste que a grade traz estoque, mínimo e vendas de 30 dias em uma consulta"""
+        self._sell(self.black_m, 3, days_ago=2)
+        self._sell(self.black_m, 5, days_ago=45)  # fora da janela
+
+        with self.assertNumQueries(1):
+            grid = stock_grid.build_stock_grid(
+                ProductVariation.objects.filter(product=self.product)
+            )
+
+        self.assertEqual([c["name"] for c in grid["colors"]], ["Nude", "Preto"])
+        self.assertEqual([s["name"] for s in grid["sizes"]], ["G", "M"])
+        cell = self._cell(grid, self.black, self.size_m)
+        self.assertEqual(
+            (cell["variation_id"], cell["stock"], cell["minimum_stock"], cell["sold_30d"]),
+            (self.black_m.pk, 10, 3, 3),
+        )
+        self.assertTrue(self._cell(grid, self.black, self.size_g)["below_minimum"])
+        self.assertIsNone(self._cell(grid, self.nude, self.size_g))
+        self.assertEqual(grid["totals"], {"stock": 16, "minimum_stock": 6, "sold_30d": 3})
+
+    def test_grade_da_categoria_soma_os_produtos(self):
+        """Teste que a grade da categoria agrega as variações dos produtos"""
+        body = Product.objects.create(
+            name="Body", category=self.category, selling_price=Decimal("59.90")
+        )
+        ProductVariation.objects.create(
+            product=body, color=self.black, size=self.size_m, stock=5
+        )
+
+        grid = get_category_stock_grid(self.category.pk)
+
+        cell = self._cell(grid, self.black, self.size_m)
+        self.assertEqual(cell["stock"], 15)
+        self.assertIsNone(cell["variation_id"])
+
+    def test_cache_invalidado_por_movimentacao_de_estoque(self):
+        """Teste que a grade em cache é descartada após uma entrada de estoque"""
+        outside_transaction = mock.patch.object(
+            stock_grid, "connection", mock.Mock(in_atomic_block=False)
+        )
+        with outside_transaction:
+            get_product_stock_grid(self.product.pk)
+            # Só a leitura do cache (versão do produto + grade), sem montar a grade
+            with CaptureQueriesContext(connection) as queries:
+                get_product_stock_grid(self.product.pk)
+        self.assertEqual(len(queries), 1)
+        self.assertIn("django_cache", queries[0]["sql"])
+
+        add_stock(self.nude_m.pk, 6, self.user, unit_price=Decimal("30.00"))
+
+        with outside_transaction:
+            grid = get_product_stock_grid(self.product.pk)
+        self.assertEqual(self._cell(grid, self.nude, self.size_m)["stock"], 10)
+
+    def test_edicao_em_lote_gera_movimentos_de_ajuste(self):
+        """Teste que a edição em lote grava estoque/mínimo e registra os ajustes"""
+        updated = update_stock_grid(
+            self.product.pk,
+            {
+                self.black_m.pk: {"stock": "7", "minimum_stock": "3"},
+                self.black_g.pk: {"stock": 5, "minimum_stock": 1},
+                self.nude_m.pk: {"stock": 4},  # sem alteração
+            },
+            self.user,
+        )
+
+        self.assertEqual(updated, 2)
+        self.black_m.refresh_from_db()
+        self.black_g.refresh_from_db()
+        self.assertEqual((self.black_m.stock, self.black_g.stock, self.black_g.minimum_stock), (7, 5, 1))
+        movements = {
+            m.product_variation_id: (m.movement_type, m.quantity)
+            for m in StockMovement.objects.all()
+        }
+        self.assertEqual(
+            movements,
+            {
+                self.black_m.pk: (StockMovement.MovementType.AJUSTE_SAIDA, 3),
+                self.black_g.pk: (StockMovement.MovementType.AJUSTE_ENTRADA, 3),
+            },
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_stock, 16)
+        # Sem custo de fornecedor, a entrada é valorada pelo preço de venda
+        entry = StockMovement.objects.get(movement_type=StockMovement.MovementType.AJUSTE_ENTRADA)
+        self.assertEqual(entry.unit_price, Decimal("89.90"))
+        entry.full_clean()
+
+    def test_edicao_nao_reduz_abaixo_das_reservas(self):
+        """Teste que o estoque não fica abaixo das unidades reservadas em carrinhos"""
+        sale = Sale.objects.create(user=self.user)
+        reserve_stock(SaleItem.objects.create(sale=sale, variation=self.black_m, quantity=6), 6)
+
+        with self.assertRaises(ServiceValidationError):
+            update_stock_grid(self.product.pk, {self.black_m.pk: {"stock": 5}}, self.user)
+        self.black_m.refresh_from_db()
+        self.assertEqual(self.black_m.stock, 10)
+
+        self.assertEqual(
+            update_stock_grid(self.product.pk, {self.black_m.pk: {"stock": 6}}, self.user), 1
+        )
+
+    def test_edicao_rejeita_variacao_de_outro_produto_e_negativo(self):
+        """Teste que a edição valida a variação e as quantidades"""
+        other = Product.objects.create(
+            name="Body", category=self.category, selling_price=Decimal("59.90")
+        )
+        foreign = ProductVariation.objects.create(product=other)
+        with self.assertRaises(ServiceValidationError):
+            update_stock_grid(self.product.pk, {foreign.pk: {"stock": 1}}, self.user)
+        with self.assertRaises(ServiceValidationError):
+            update_stock_grid(self.product.pk, {self.black_m.pk: {"stock": -1}}, self.user)
+
+    def test_api_rejeita_formato_invalido_com_400(self):
+        """Teste que corpos JSON fora do formato esperado retornam 400, e não 500"""
+        self.client.force_login(self.user)
+        url = reverse("product:api-product-stock-grid", args=[self.product.pk])
+        for body in (
+            [],
+            {"changes": []},
+            {"changes": {"abc": {"stock": 1}}},
+            {"changes": {str(self.black_m.pk): 5}},
+        ):
+            response = self.client.post(url, body, content_type="application/json")
+            self.assertEqual(response.status_code, 400, body)
+            self.assertEqual(response.json()["status"], "error")
+        self.black_m.refresh_from_db()
+        self.assertEqual(self.black_m.stock, 10)
+
+    def test_detalhe_exibe_e_salva_a_grade(self):
+        """Teste que a página de detalhes exibe a grade e salva as edições"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("product:product-detail", args=[self.product.pk]))
+        self.assertContains(response, f'name="stock-{self.black_m.pk}"')
+
+        response = self.client.post(
+            reverse("product:product-stock-grid", args=[self.product.pk]),
+            {f"stock-{self.black_m.pk}": "12", f"minimum-{self.black_m.pk}": "4"},
+        )
+        self.assertRedirects(response, reverse("product:product-detail", args=[self.product.pk]))
+        self.black_m.refresh_from_db()
+        self.assertEqual((self.black_m.stock, self.black_m.minimum_stock), (12, 4))
+
+        response = self.client.get(
+            reverse("product:api-product-stock-grid", args=[self.product.pk])
+        )
+        self.assertEqual(self._cell(response.json(), self.black, self.size_m)["stock"], 12)
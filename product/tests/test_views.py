@@ -11,6 +11,7 @@ from product.models import (
     Size,
     ProductVariation,
 )
+from product.utils import generate_sku_base
 
 User = get_user_model()
 
@@ -239,3 +240,183 @@ class SizeCreateAjaxViewTests(TestCase):
         self.assertEqual(data['status'], 'success')
         self.assertTrue(Size.objects.filter(name='Xxg').exists())
 
+
+
+class ProductVariationMatrixViewTests(TestCase):
+    """Testes para a view product_variation_matrix_view"""
+
+    def setUp(self):
+        """Configuração inicial"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            email='teste@exemplo.com',
+            password='senha123'
+        )
+        self.category = Category.objects.create(name="Teste")
+        self.product = Product.objects.create(
+            name="Body Amamentação",
+            selling_price=Decimal("80.00"),
+            category=self.category
+        )
+        self.color = Color.objects.create(name="Preto")
+        self.sizes = [Size.objects.create(name=name) for name in ("P", "M", "G")]
+        self.url = reverse('product:product-variation-matrix', kwargs={'pk': self.product.pk})
+
+    def test_formulario_exibe_cores_e_tamanhos(self):
+        """Teste que a página lista as cores e tamanhos disponíveis"""
+        self.client.login(username='teste@exemplo.com', password='senha123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'product/variation_matrix.html')
+        self.assertContains(response, "Preto")
+
+    def test_gera_grade_e_exibe_resultado(self):
+        """Teste que o POST cria as variações e exibe a grade de resultado"""
+        self.client.login(username='teste@exemplo.com', password='senha123')
+        response = self.client.post(self.url, {
+            'colors': [self.color.pk],
+            'sizes': [size.pk for size in self.sizes],
+            'minimum_stock': 2,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result']['created'], 3)
+        self.assertEqual(
+            ProductVariation.objects.filter(product=self.product, minimum_stock=2).count(), 3
+        )
+        self.assertContains(response, "Criada", count=3)
+
+
+class ProductUpdateViewTests(TestCase):
+    """Testes para a view ProductUpdateView"""
+
+    def setUp(self):
+        """Configuração inicial"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            email='teste@exemplo.com',
+            password='senha123'
+        )
+        self.category = Category.objects.create(name="Teste")
+        self.supplier = Supplier.objects.create(name="Fornecedor Teste")
+        self.product = Product.objects.create(
+            name="Sutiã Amamentação",
+            selling_price=Decimal("80.00"),
+            category=self.category
+        )
+        self.product.productsupplier_set.create(
+            supplier=self.supplier, cost_price=Decimal("40.00")
+        )
+        self.colors = [Color.objects.create(name=f"Cor {i}") for i in range(10)]
+        self.sizes = [Size.objects.create(name=name) for name in ("P", "M", "G", "Gg", "Xg", "Xxg")]
+        for color in self.colors:
+            for size in self.sizes:
+                ProductVariation.objects.create(
+                    product=self.product, color=color, size=size, stock=5
+                )
+        self.url = reverse('product:product-update', kwargs={'pk': self.product.pk})
+
+    def post_data(self, changes=None, new=None):
+        """Monta o POST do formulário com todas as variações do produto"""
+        changes = changes or {}
+        data = {
+            'name': self.product.name,
+            'description': '',
+            'selling_price': '80.00',
+            'category': self.category.pk,
+            'is_active': 'on',
+            'suppliers-TOTAL_FORMS': 1,
+            'suppliers-INITIAL_FORMS': 1,
+            'suppliers-MIN_NUM_FORMS': 1,
+            'suppliers-MAX_NUM_FORMS': 1000,
+            'suppliers-0-id': self.product.productsupplier_set.get().pk,
+            'suppliers-0-supplier': self.supplier.pk,
+            'suppliers-0-cost_price': '40.00',
+        }
+        variations = list(self.product.variations.order_by('color', 'size'))
+        rows = [
+            {
+                'id': variation.pk,
+                'color': variation.color_id,
+                'size': variation.size_id,
+                'stock': variation.stock,
+                'minimum_stock': variation.minimum_stock,
+                'is_active': 'on',
+                **changes.get(variation.pk, {}),
+            }
+            for variation in variations
+        ]
+        rows += new or []
+        for index, row in enumerate(rows):
+            for field, value in row.items():
+                data[f'variations-{index}-{field}'] = value
+        data.update({
+            'variations-TOTAL_FORMS': len(rows),
+            'variations-INITIAL_FORMS': len(variations),
+            'variations-MIN_NUM_FORMS': 1,
+            'variations-MAX_NUM_FORMS': 1000,
+        })
+        return data
+
+    def test_salvar_sem_alteracoes_nao_grava_variacoes(self):
+        """Teste que salvar sem alterações só valida, sem gravar as 60 variações"""
+        self.client.login(username='teste@exemplo.com', password='senha123')
+        self.client.get(self.url)  # aquece o cache de referência
+        data = self.post_data()
+        with self.assertNumQueries(11):
+            response = self.client.post(self.url, data)
+        self.assertRedirects(response, reverse('product:product-list'))
+
+    def test_salvar_produto_com_60_variacoes_alteradas(self):
+        """Teste que as 60 variações alteradas e uma nova são gravadas em lote"""
+        self.client.login(username='teste@exemplo.com', password='senha123')
+        self.client.get(self.url)  # aquece o cache de referência
+        new_color = Color.objects.create(name="Nova")
+        self.client.get(self.url)
+        changes = {
+            variation.pk: {'stock': 7, 'minimum_stock': 2}
+            for variation in self.product.variations.all()
+        }
+        new = [{
+            'id': '',
+            'color': new_color.pk,
+            'size': self.sizes[0].pk,
+            'stock': 3,
+            'minimum_stock': 0,
+            'is_active': 'on',
+        }]
+        data = self.post_data(changes=changes, new=new)
+
+        # Antes: ~10 consultas por variação (validação + UPDATE + signals)
+        with self.assertNumQueries(21):
+            response = self.client.post(self.url, data)
+        self.assertRedirects(response, reverse('product:product-list'))
+
+        self.assertEqual(self.product.variations.filter(stock=7, minimum_stock=2).count(), 60)
+        created = self.product.variations.get(color=new_color)
+        self.assertTrue(
+            created.sku.startswith(generate_sku_base(self.product.name, "Nova", "P"))
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_stock, 60 * 7 + 3)
+        self.assertIn(created.sku.lower(), self.product.search_document)
+
+    def test_variacao_duplicada_com_registro_fora_do_formulario(self):
+        """Teste que a unicidade considera variações gravadas fora do formset"""
+        self.client.login(username='teste@exemplo.com', password='senha123')
+        new_color = Color.objects.create(name="Nova")
+        data = self.post_data(new=[{
+            'id': '',
+            'color': new_color.pk,
+            'size': self.sizes[0].pk,
+            'stock': 1,
+            'minimum_stock': 0,
+        }])
+        # Criada por outro usuário depois que a página foi aberta
+        ProductVariation.objects.create(
+            product=self.product, color=new_color, size=self.sizes[0]
+        )
+
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Variações duplicadas")
+        self.assertEqual(self.product.variations.filter(color=new_color).count(), 1)
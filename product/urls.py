@@ -7,9 +7,19 @@ urlpatterns = [
     # Product URLs
     path('list/', views.product_list_view, name='product-list'),
     path('detail/<int:pk>/', views.product_detail_view, name='product-detail'),
+    path('api/facets/', views.product_facets_api, name='api-product-facets'),
     path('create/', views.ProductCreateView.as_view(), name='product-create'),
     path('update/<int:pk>/', views.ProductUpdateView.as_view(), name='product-update'),
     path('delete/<int:pk>/', views.product_delete_view, name='product-delete'),
+    path('catalog/export/', views.catalog_export_view, name='catalog-export'),
+    path('catalog/import/', views.catalog_import_view, name='catalog-import'),
+    path('labels/', views.label_job_view, name='label-job'),
+    path('prices/', views.price_change_view, name='price-change'),
+    path('prices/<int:pk>/cancel/', views.price_change_cancel_view, name='price-change-cancel'),
+    path('variations/matrix/<int:pk>/', views.product_variation_matrix_view, name='product-variation-matrix'),
+    path('stock-grid/<int:pk>/', views.product_stock_grid_view, name='product-stock-grid'),
+    path('api/stock-grid/product/<int:pk>/', views.product_stock_grid_api, name='api-product-stock-grid'),
+    path('api/stock-grid/category/<int:pk>/', views.category_stock_grid_api, name='api-category-stock-grid'),
     # Category URLs
     path('category/create', views.category_create_view, name='category-create'),
     # Supplier URLs
@@ -1,2 +1,3 @@
-from .generate_sku import generate_sku
-from .standardize_name import standardize_name
\ No newline at end of file
+from .generate_sku import generate_random_suffix, generate_sku, generate_sku_base
+from .standardize_name import standardize_name
+from .normalize_search_text import normalize_search_text
@@ -51,14 +51,24 @@ def generate_random_suffix():
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=3))
 
 
+def generate_sku_base(product_name, color_name, size_name):
+    """
+    Parte fixa do SKU (sem o sufixo aleatório).
+    Formato: PRODUTO-COR-TAMANHO
+    """
+    product_part = generate_product_part(product_name)
+    color_part = _generate_color_part(color_name)
+    size_part = generate_size_part(size_name)
+
+    return f"{product_part}-{color_part}-{size_part}"
+
+
 def generate_sku(variation):
     """
     Cria SKU final para um objeto ProductVariation com sufixo único.
     Formato: PRODUTO-COR-TAMANHO-XXX
     """
-    product_part = generate_product_part(variation.product.name)
-    color_part = _generate_color_part(variation.color.name)
-    size_part = generate_size_part(variation.size.name)
-    suffix = generate_random_suffix()
-
-    return f"{product_part}-{color_part}-{size_part}-{suffix}"
\ No newline at end of file
+    base = generate_sku_base(
+        variation.product.name, variation.color.name, variation.size.name
+    )
+    return f"{base}-{generate_random_suffix()}"
@@ -0,0 +1,16 @@
+# product/utils/normalize_search_text.py
+import unicodedata
+
+
+def normalize_search_text(text):
+    """
+    Normaliza um texto para busca: remove acentos (ç -> c, ã -> a),
+    converte para minúsculas e colapsa espaços.
+    Ex: "  Sutiã   AMAMENTAÇÃO " -> "sutia amamentacao"
+    """
+    if not text:
+        return ""
+
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(without_accents.lower().split())
@@ -1,10 +1,13 @@
 import json
-from django.http import JsonResponse
+import tempfile
+from urllib.parse import urlencode
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.views import View
 from django.db import transaction
+from django.utils import timezone
 from django.views.decorators.http import require_POST
 from product.services import (
     ServiceDuplicateError,
@@ -13,12 +16,36 @@ from product.services import (
     create_supplier,
     create_color,
     create_size,
+    create_variation_matrix,
+    default_product_ordering,
     get_filtered_products,
+    PRODUCT_ORDERINGS,
 )
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
-from .models import Product
-from .forms import ProductForm, ProductSupplierFormSet, ProductVariationFormSet
+from .catalog import (
+    XLSX,
+    CatalogFormatError,
+    detect_format,
+    import_catalog,
+    iter_catalog_csv,
+    iter_catalog_rows,
+    write_catalog_xlsx,
+)
+from .labels import PDF, iter_labels
+from .facets import filters_querystring, get_facets, has_filters, parse_facet_filters
+from .models import Category, PriceChange, Product
+from .pricing import cancel_price_change, create_price_change, record_price_edit
+from .stock_grid import get_category_stock_grid, get_product_stock_grid, update_stock_grid
+from .forms import (
+    CatalogImportForm,
+    LabelJobForm,
+    PriceChangeForm,
+    ProductForm,
+    ProductSupplierFormSet,
+    ProductVariationFormSet,
+    VariationMatrixForm,
+)
 
 
 class ProductCreateView(LoginRequiredMixin, View):
@@ -108,6 +135,7 @@ class ProductUpdateView(LoginRequiredMixin, View):
     @transaction.atomic
     def post(self, request, pk, *args, **kwargs):
         product = get_object_or_404(Product, pk=pk)
+        old_price = product.selling_price
 
         product_form = ProductForm(request.POST, instance=product)
         supplier_formset = ProductSupplierFormSet(
@@ -127,9 +155,13 @@ class ProductUpdateView(LoginRequiredMixin, View):
             and is_variation_formset_valid
         ):
 
-            product = product_form.save()
+            # Sem alterações no produto, evita o UPDATE e o recálculo via signal
+            if product_form.has_changed():
+                product = product_form.save()
+            # Grava só as linhas alteradas, em lote (BulkInlineFormSet)
             supplier_formset.save()
             variation_formset.save()
+            record_price_edit(product, old_price, user=request.user)
 
             messages.success(
                 request, f'Produto "{product.name}" atualizado com sucesso!'
@@ -150,18 +182,39 @@ class ProductUpdateView(LoginRequiredMixin, View):
 @login_required
 def product_list_view(request):
     query = request.GET.get("query", "").strip()
-    page_number = request.GET.get("page", 1)
-
-    service_data = get_filtered_products(query=query, page_number=page_number)
+    cursor = request.GET.get("cursor")
+    filters = parse_facet_filters(request.GET)
+    sort = request.GET.get("sort")
+    if sort not in PRODUCT_ORDERINGS:
+        sort = default_product_ordering(query)
+
+    service_data = get_filtered_products(
+        query=query, cursor=cursor, filters=filters, ordering=sort
+    )
 
+    params = ([("query", query)] if query else []) + filters_querystring(filters)
+    if sort != default_product_ordering(query):
+        params.append(("sort", sort))
     context = {
         "query": query,
+        "sort": sort,
+        "facets": get_facets(filters, query),
+        "has_filters": has_filters(filters),
+        "pagination_query": urlencode(params),
         **service_data,  # products, paginator e page_obj
     }
 
     return render(request, "product/product_list.html", context)
 
 
+@login_required
+def product_facets_api(request):
+    """Facetas com contagens para a busca e os filtros informados, em JSON."""
+    query = request.GET.get("query", "").strip()
+    filters = parse_facet_filters(request.GET)
+    return JsonResponse(get_facets(filters, query))
+
+
 @login_required
 def product_detail_view(request, pk):
     product = get_object_or_404(Product.objects.with_average_profit_margin(), pk=pk)
@@ -169,16 +222,20 @@ def product_detail_view(request, pk):
     variations = product.variations.select_related("color", "size").order_by(
         "color", "size"
     )
-    suppliers = product.productsupplier_set.select_related("supplier").order_by(
-        "supplier__name"
+    suppliers = list(
+        product.productsupplier_set.select_related("supplier").order_by("supplier__name")
     )
     # Escolhe um fornecedor primário (o primeiro ordenado por nome) para exibir nas variações
-    primary_supplier = suppliers.first() if suppliers.exists() else None
+    primary_supplier = suppliers[0] if suppliers else None
     profit_value = product.selling_price - product.average_cost_price
 
+    price_history = product.price_history.select_related("user", "price_change")[:10]
+
     context = {
         "product": product,
         "variations": variations,
+        "price_history": price_history,
+        "stock_grid": get_product_stock_grid(product.pk),
         "suppliers": suppliers,
         "primary_supplier": primary_supplier,
         "profit_value": profit_value,
@@ -188,6 +245,262 @@ def product_detail_view(request, pk):
     return render(request, "product/product_detail.html", context)
 
 
+@login_required
+def product_variation_matrix_view(request, pk):
+    """
+    Gera a grade de variações (cores × tamanhos) de um produto em lote e
+    exibe o resultado por célula.
+    """
+    product = get_object_or_404(Product, pk=pk)
+    result = None
+
+    if request.method == "POST":
+        form = VariationMatrixForm(request.POST)
+        if form.is_valid():
+            try:
+                result = create_variation_matrix(
+                    product,
+                    colors=form.cleaned_data["colors"],
+                    sizes=form.cleaned_data["sizes"],
+                    minimum_stock=form.cleaned_data["minimum_stock"],
+                )
+                messages.success(
+                    request,
+                    f"{result['created']} variação(ões) criada(s); "
+                    f"{result['existing']} já existia(m).",
+                )
+            except (ServiceValidationError, ServiceDuplicateError) as e:
+                messages.error(request, str(e))
+        else:
+            messages.error(request, "Por favor, corrija os erros abaixo.")
+    else:
+        form = VariationMatrixForm()
+
+    context = {
+        "product": product,
+        "form": form,
+        "result": result,
+        "page_title": f"Grade de Variações: {product.name}",
+    }
+    return render(request, "product/variation_matrix.html", context)
+
+
+@login_required
+def catalog_export_view(request):
+    """Exporta o catálogo em CSV (streaming) ou XLSX (?format=xlsx)."""
+    rows = iter_catalog_rows()
+    filename = f"catalogo-{timezone.localdate():%Y%m%d}"
+
+    if request.GET.get("format") == XLSX:
+        # O modo write-only grava as linhas em disco à medida que são geradas
+        target = tempfile.TemporaryFile()
+        try:
+            write_catalog_xlsx(rows, target)
+        except CatalogFormatError as e:
+            target.close()
+            messages.error(request, str(e))
+            return redirect("product:product-list")
+        target.seek(0)
+        return FileResponse(target, as_attachment=True, filename=f"{filename}.xlsx")
+
+    response = StreamingHttpResponse(
+        iter_catalog_csv(rows), content_type="text/csv; charset=utf-8"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+@login_required
+def catalog_import_view(request):
+    """Importa o catálogo de um arquivo CSV/XLSX e exibe o resumo com os erros por linha."""
+    result = None
+
+    if request.method == "POST":
+        form = CatalogImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            try:
+                result = import_catalog(
+                    upload.file,
+                    request.user,
+                    file_format=detect_format(upload.name),
+                )
+            except CatalogFormatError as e:
+                messages.error(request, str(e))
+            else:
+                if result.error_count:
+                    messages.error(
+                        request,
+                        f"{result.error_count} linha(s) com erro não foram importadas.",
+                    )
+                messages.success(
+                    request,
+                    f"{result.imported_rows} de {result.rows} linha(s) importada(s).",
+                )
+        else:
+            messages.error(request, "Por favor, corrija os erros abaixo.")
+    else:
+        form = CatalogImportForm()
+
+    context = {
+        "form": form,
+        "result": result,
+        "page_title": "Importar Catálogo",
+    }
+    return render(request, "product/catalog_import.html", context)
+
+
+@login_required
+def label_job_view(request):
+    """Gera um lote de etiquetas (PDF ou ZPL) enviado em streaming."""
+    if request.method == "POST":
+        form = LabelJobForm(request.POST)
+        if form.is_valid():
+            output_format = form.cleaned_data["output_format"]
+            response = StreamingHttpResponse(
+                iter_labels(
+                    form.get_variations(),
+                    output_format=output_format,
+                    symbology=form.cleaned_data["symbology"],
+                ),
+                content_type=(
+                    "application/pdf" if output_format == PDF else "text/plain; charset=utf-8"
+                ),
+            )
+            filename = f"etiquetas-{timezone.localtime():%Y%m%d-%H%M}.{output_format}"
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+        messages.error(request, "Por favor, corrija os erros abaixo.")
+    else:
+        form = LabelJobForm(initial={"received_on": timezone.localdate()})
+
+    context = {
+        "form": form,
+        "page_title": "Etiquetas de Preço",
+    }
+    return render(request, "product/label_job.html", context)
+
+
+@login_required
+def price_change_view(request):
+    """Reajuste de preços em lote (imediato ou agendado) e lista dos últimos reajustes."""
+    if request.method == "POST":
+        form = PriceChangeForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            try:
+                price_change = create_price_change(
+                    adjustment_type=data["adjustment_type"],
+                    value=data["value"],
+                    category=data["category"],
+                    supplier=data["supplier"],
+                    query=data["query"],
+                    round_to_90=data["round_to_90"],
+                    effective_at=data["effective_at"],
+                    description=data["description"],
+                    user=request.user,
+                )
+            except ServiceValidationError as e:
+                messages.error(request, str(e))
+            else:
+                if price_change.status == PriceChange.Status.APLICADO:
+                    messages.success(
+                        request,
+                        f"Reajuste aplicado a {price_change.affected_products} produto(s).",
+                    )
+                else:
+                    messages.success(
+                        request,
+                        f"Reajuste agendado para {timezone.localtime(price_change.effective_at):%d/%m/%Y %H:%M}.",
+                    )
+                return redirect("product:price-change")
+        else:
+            messages.error(request, "Por favor, corrija os erros abaixo.")
+    else:
+        form = PriceChangeForm()
+
+    price_changes = PriceChange.objects.select_related(
+        "category", "supplier", "created_by"
+    )[:30]
+
+    context = {
+        "form": form,
+        "price_changes": price_changes,
+        "page_title": "Reajuste de Preços",
+    }
+    return render(request, "product/price_change.html", context)
+
+
+@login_required
+@require_POST
+def price_change_cancel_view(request, pk):
+    price_change = get_object_or_404(PriceChange, pk=pk)
+    try:
+        cancel_price_change(price_change)
+        messages.success(request, "Reajuste agendado cancelado.")
+    except ServiceValidationError as e:
+        messages.error(request, str(e))
+    return redirect("product:price-change")
+
+
+@login_required
+@require_POST
+def product_stock_grid_view(request, pk):
+    """
+    Grava as edições da grade de estoque da página de detalhes
+    (campos "stock-<id>" e "minimum-<id>" por variação).
+    """
+    product = get_object_or_404(Product, pk=pk)
+    changes = {}
+    for key, value in request.POST.items():
+        field, _, variation_id = key.partition("-")
+        if field in ("stock", "minimum") and variation_id.isdigit():
+            name = "stock" if field == "stock" else "minimum_stock"
+            changes.setdefault(int(variation_id), {})[name] = value.strip()
+
+    try:
+        updated = update_stock_grid(product.pk, changes, request.user)
+        if updated:
+            messages.success(request, f"{updated} variação(ões) atualizada(s) na grade.")
+        else:
+            messages.info(request, "Nenhuma alteração na grade.")
+    except ServiceValidationError as e:
+        messages.error(request, str(e))
+
+    return redirect("product:product-detail", pk=product.pk)
+
+
+@login_required
+def product_stock_grid_api(request, pk):
+    """
+    GET: grade cor × tamanho do produto em JSON.
+    POST: {"changes": {variation_id: {"stock": n, "minimum_stock": m}}}; devolve a grade atualizada.
+    """
+    product = get_object_or_404(Product, pk=pk)
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            if not isinstance(data, dict):
+                raise ServiceValidationError('O corpo deve ser um objeto {"changes": {...}}.')
+            update_stock_grid(product.pk, data.get("changes", {}), request.user)
+        except json.JSONDecodeError:
+            return JsonResponse(
+                {"status": "error", "message": "Corpo da requisição JSON inválido."},
+                status=400,
+            )
+        except ServiceValidationError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    return JsonResponse(get_product_stock_grid(product.pk))
+
+
+@login_required
+def category_stock_grid_api(request, pk):
+    """Grade cor × tamanho somando os produtos da categoria, em JSON."""
+    category = get_object_or_404(Category, pk=pk)
+    return JsonResponse(get_category_stock_grid(category.pk))
+
+
 @login_required
 @require_POST
 def category_create_view(request):
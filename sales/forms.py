@@ -1,7 +1,10 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from product.labels import variation_id_from_ean13
 from product.models import ProductVariation
 from customer.models import Customer
+from customer.validators import only_digits
+from stock.services import get_available_stock
 from .models import CashRegister, SalePayment
 
 
@@ -33,10 +36,12 @@ class AddItemForm(forms.Form):
     def clean_sku_or_barcode(self):
         code = self.cleaned_data["sku_or_barcode"]
 
-        # Tenta buscar exato pelo SKU (case insensitive)
-        # Futuramente pode adicionar: OR barcode__exact=code
+        # Etiquetas EAN-13 internas trazem o id da variação; os demais
+        # códigos são buscados pelo SKU (case insensitive)
+        variation_id = variation_id_from_ean13(code.strip())
+        lookup = {"pk": variation_id} if variation_id else {"sku__iexact": code}
         variation = ProductVariation.objects.filter(
-            sku__iexact=code, is_active=True, product__is_active=True
+            is_active=True, product__is_active=True, **lookup
         ).first()
 
         if not variation:
@@ -46,6 +51,12 @@ class AddItemForm(forms.Form):
         if variation.stock <= 0:
             raise ValidationError(f"O produto '{variation}' está sem estoque físico.")
 
+        # Unidades já reservadas em carrinhos de outros caixas não estão disponíveis
+        if get_available_stock(variation) <= 0:
+            raise ValidationError(
+                f"O produto '{variation}' está reservado em outros carrinhos."
+            )
+
         return variation
 
 
@@ -71,18 +82,17 @@ class IdentifyCustomerForm(forms.Form):
         if not raw_value:
             return None
 
-        # Remove caracteres não numéricos para busca flexível
-        clean_value = "".join(filter(str.isdigit, raw_value))
+        # Aceita o documento com ou sem máscara
+        clean_value = only_digits(raw_value)
+        if len(clean_value) not in (11, 14):
+            raise ValidationError("Informe o CPF (11 dígitos) ou o CNPJ (14 dígitos) completo.")
 
-        # Tenta buscar o cliente pelo CPF ou CNPJ limpo (contém)
-        # Isso ajuda caso o usuário não digite a pontuação exata
-        customer = Customer.objects.filter(cpf_cnpj__icontains=clean_value).first()
-
-        if not customer:
+        # Igualdade no documento sem máscara: busca pelo índice único
+        try:
+            return Customer.objects.get(document_digits=clean_value)
+        except Customer.DoesNotExist:
             raise ValidationError("Cliente não encontrado com este CPF/CNPJ.")
 
-        return customer
-
 
 class OpenRegisterForm(forms.ModelForm):
     """
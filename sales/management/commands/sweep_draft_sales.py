@@ -0,0 +1,34 @@
+# sales/management/commands/sweep_draft_sales.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from sales.services import sweep_stale_drafts
+
+
+class Command(BaseCommand):
+    help = (
+        "Arquiva em lotes as vendas em Rascunho abandonadas (sem atividade "
+        "ou de caixas já fechados) e libera as reservas de estoque."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=48,
+            help="Horas sem atividade para considerar o rascunho abandonado (padrão: 48)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Quantidade de rascunhos arquivados por lote (padrão: 500)",
+        )
+
+    def handle(self, *args, **options):
+        archived = sweep_stale_drafts(
+            older_than=timedelta(hours=options["hours"]),
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"✅ {archived} rascunhos arquivados."))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-19 04:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'DRAFT')), fields=['user'], name='sale_open_draft_user_idx'),
+        ),
+    ]
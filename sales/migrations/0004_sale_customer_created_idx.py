@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-19 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_sale_open_draft_user_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer', '-created_at', '-id'], name='sale_customer_created_idx'),
+        ),
+    ]
@@ -5,9 +5,16 @@ from django.utils import timezone
 from decimal import Decimal
 
 from base.models import SoftDeleteModel
+from customer.stats import record_cancellation, record_purchase
+from product.best_sellers import SALES_WINDOW, record_units_sold
 from product.models import ProductVariation
 
-from stock.services import remove_stock, add_stock
+from stock.services import (
+    add_stock,
+    refresh_sale_reservations,
+    release_sale_reservations,
+    remove_stock,
+)
 from stock.models import StockMovement
 
 
@@ -153,6 +160,18 @@ class Sale(SoftDeleteModel):
         verbose_name = "Venda"
         verbose_name_plural = "Vendas"
         ordering = ["-created_at"]
+        indexes = [
+            # Índice parcial: só os carrinhos abertos, consultados por usuário em todo o PDV
+            models.Index(
+                fields=["user"],
+                condition=models.Q(status="DRAFT", is_active=True),
+                name="sale_open_draft_user_idx",
+            ),
+            # Linha do tempo de compras do cliente (paginação por cursor)
+            models.Index(
+                fields=["customer", "-created_at", "-id"], name="sale_customer_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Venda #{self.pk} - {self.user} ({self.get_status_display()})"
@@ -175,7 +194,8 @@ class Sale(SoftDeleteModel):
         if self.net_amount < Decimal("0.00"):
             self.net_amount = Decimal("0.00")
 
-        self.save(update_fields=["gross_amount", "net_amount"])
+        # updated_at acompanha a atividade do carrinho (usado pela limpeza de rascunhos)
+        self.save(update_fields=["gross_amount", "net_amount", "updated_at"])
 
     @property
     def total_paid(self):
@@ -231,8 +251,19 @@ class Sale(SoftDeleteModel):
         if self.cash_register_session.status != CashRegister.Status.OPEN:
             raise ValidationError("O caixa desta venda já está fechado.")
 
+        # Reservas vencidas são refeitas: nesse meio tempo outro caixa pode ter
+        # reservado as mesmas unidades
+        unreserved = refresh_sale_reservations(self.pk)
+        if unreserved:
+            raise ValidationError(
+                "Estoque disponível insuficiente (reservado em outro caixa) para: "
+                + ", ".join(str(item.variation) for item in unreserved)
+            )
+
         # BAIXA DE ESTOQUE VIA SERVIÇO
+        sold = []
         for item in self.items.all():
+            sold.append((item.variation_id, item.variation.product_id, item.quantity))
             try:
                 # O remove_stock cuida do lock (select_for_update), validação e criação do log
                 remove_stock(
@@ -241,6 +272,8 @@ class Sale(SoftDeleteModel):
                     user=self.user,
                     movement_type=StockMovement.MovementType.VENDA,
                     notes=f"Venda PDV #{self.pk}",
+                    sale_id=self.pk,
+                    sale_item_id=item.pk,
                 )
             except ValueError as e:
                 # O serviço lança ValueError se faltar estoque ou dados inválidos
@@ -248,10 +281,18 @@ class Sale(SoftDeleteModel):
                     f"Erro ao processar item '{item.variation}': {str(e)}"
                 )
 
+        # As unidades já saíram do estoque físico; as reservas do carrinho deixam de valer
+        release_sale_reservations(self.pk)
+
         self.status = self.Status.COMPLETED
         self.completed_at = timezone.now()
         self.save()
 
+        # Contadores de mais vendidos (variação e produto)
+        record_units_sold(sold)
+        # Resumo de compras do cliente
+        record_purchase(self)
+
     @transaction.atomic
     def cancel_sale(self):
         """
@@ -262,7 +303,9 @@ class Sale(SoftDeleteModel):
             raise ValidationError("Apenas vendas concluídas podem ser canceladas.")
 
         # DEVOLUÇÃO DE ESTOQUE VIA SERVIÇO
+        returned = []
         for item in self.items.all():
+            returned.append((item.variation_id, item.variation.product_id, item.quantity))
             try:
                 add_stock(
                     product_variation_id=item.variation.pk,
@@ -271,14 +314,24 @@ class Sale(SoftDeleteModel):
                     unit_price=item.unit_price,  # Valor que entra no estoque (baseado na venda)
                     movement_type=StockMovement.MovementType.DEVOLUCAO,
                     notes=f"Estorno da Venda #{self.pk}",
+                    sale_id=self.pk,
+                    sale_item_id=item.pk,
                 )
             except ValueError as e:
                 raise ValidationError(
                     f"Erro ao estornar item '{item.variation}': {str(e)}"
                 )
 
+        # A janela de 30 dias só inclui a venda se ela ainda não "saiu" dela
+        in_window = (
+            self.completed_at is not None
+            and self.completed_at >= timezone.now() - SALES_WINDOW
+        )
+        record_units_sold(returned, sign=-1, in_window=in_window)
+
         self.status = self.Status.CANCELED
         self.delete()
+        record_cancellation(self)
 
 
 class SaleItem(models.Model):
@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from stock.models import StockReservation
+from .models import CashRegister, Sale
+
+# Chaves de sessão do contexto do caixa (operador logado neste navegador)
+REGISTER_SESSION_KEY = "pdv_register_id"
+DRAFT_SESSION_KEY = "pdv_draft_id"
+
+
+def _one_or_none(queryset):
+    """Busca direcionada: LIMIT 1 sem o ORDER BY que o .first() acrescenta."""
+    return next(iter(queryset.order_by()[:1]), None)
+
+
+def get_open_register(request):
+    """
+    Retorna o caixa aberto do operador. O id fica guardado na sessão, então
+    a busca normal é uma consulta por chave primária.
+    """
+    register_id = request.session.get(REGISTER_SESSION_KEY)
+    if register_id:
+        register = _one_or_none(
+            CashRegister.objects.filter(
+                pk=register_id, user=request.user, status=CashRegister.Status.OPEN
+            )
+        )
+        if register:
+            return register
+
+    register = _one_or_none(
+        CashRegister.objects.filter(user=request.user, status=CashRegister.Status.OPEN)
+    )
+    remember_register(request, register)
+    return register
+
+
+def get_current_draft(request):
+    """
+    Retorna a venda em Rascunho do operador, usando o id guardado na sessão.
+    Vendas concluídas ou arquivadas deixam de casar com o filtro e caem na
+    busca completa.
+    """
+    draft_id = request.session.get(DRAFT_SESSION_KEY)
+    if draft_id:
+        sale = _one_or_none(
+            Sale.objects.filter(pk=draft_id, user=request.user, status=Sale.Status.DRAFT)
+        )
+        if sale:
+            return sale
+
+    sale = (
+        Sale.objects.filter(status=Sale.Status.DRAFT, user=request.user)
+        .order_by("-created_at")
+        .first()
+    )
+    remember_draft(request, sale)
+    return sale
+
+
+def get_or_create_current_draft(request, register):
+    """Rascunho do operador vinculado ao caixa aberto (cria se não existir)."""
+    sale = get_current_draft(request)
+    if sale and sale.cash_register_session_id == register.pk:
+        return sale
+
+    sale, created = Sale.objects.get_or_create(
+        status=Sale.Status.DRAFT,
+        user=request.user,
+        cash_register_session=register,
+    )
+    remember_draft(request, sale)
+    return sale
+
+
+def remember_register(request, register):
+    if register:
+        request.session[REGISTER_SESSION_KEY] = register.pk
+    else:
+        request.session.pop(REGISTER_SESSION_KEY, None)
+
+
+def remember_draft(request, sale):
+    if sale:
+        request.session[DRAFT_SESSION_KEY] = sale.pk
+    else:
+        request.session.pop(DRAFT_SESSION_KEY, None)
+
+
+def clear_lane_context(request, draft_only=False):
+    """Invalida o contexto guardado (fechamento de caixa ou venda concluída)."""
+    request.session.pop(DRAFT_SESSION_KEY, None)
+    if not draft_only:
+        request.session.pop(REGISTER_SESSION_KEY, None)
+
+
+def get_stale_drafts(older_than: timedelta):
+    """
+    Rascunhos abandonados: sem atividade desde o corte ou presos a um caixa
+    que já foi fechado (não podem mais ser concluídos).
+    """
+    cutoff = timezone.now() - older_than
+    return Sale.objects.filter(status=Sale.Status.DRAFT).filter(
+        Q(updated_at__lt=cutoff)
+        | Q(cash_register_session__isnull=True, created_at__lt=cutoff)
+        | Q(cash_register_session__status=CashRegister.Status.CLOSED)
+    )
+
+
+def sweep_stale_drafts(older_than: timedelta = timedelta(days=2), batch_size: int = 500) -> int:
+    """
+    Arquiva (soft delete) os rascunhos abandonados em lotes, liberando as
+    reservas de estoque dos seus itens. Itens e pagamentos permanecem
+    vinculados à venda arquivada para auditoria.
+    """
+    archived = 0
+    while True:
+        ids = list(get_stale_drafts(older_than).order_by().values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+
+        with transaction.atomic():
+            StockReservation.objects.filter(sale_item__sale_id__in=ids).delete()
+            now = timezone.now()
+            archived += Sale.all_objects.filter(pk__in=ids).update(
+                is_active=False, deleted_at=now, updated_at=now
+            )
+    return archived
@@ -1,3 +1,117 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from product.models import Category, Product, ProductVariation
+from sales.models import CashRegister, Sale, SaleItem
+from sales.services import (
+    DRAFT_SESSION_KEY,
+    REGISTER_SESSION_KEY,
+    sweep_stale_drafts,
+)
+from stock.models import StockReservation
+from stock.services import add_stock, reserve_stock
+from user.models import UserGesthar
+
+
+class SalesTestMixin:
+    """Dados básicos compartilhados pelos testes do módulo sales."""
+
+    def setUp(self):
+        self.user = UserGesthar.objects.create_user(
+            email="caixa@exemplo.com", password="senha123"
+        )
+        self.category = Category.objects.create(name="Vestidos")
+        self.product = Product.objects.create(
+            name="Vestido Gestante",
+            selling_price=Decimal("100.00"),
+            category=self.category,
+        )
+        self.variation = ProductVariation.objects.create(product=self.product)
+        add_stock(
+            product_variation_id=self.variation.pk,
+            quantity=10,
+            user=self.user,
+            unit_price=Decimal("40.00"),
+        )
+        self.register = CashRegister.objects.create(
+            user=self.user, opening_balance=Decimal("0.00")
+        )
+
+
+class SweepStaleDraftsTests(SalesTestMixin, TestCase):
+    """Testes da limpeza de rascunhos abandonados"""
+
+    def test_arquiva_rascunho_sem_atividade_e_libera_reservas(self):
+        """Teste que rascunhos antigos são arquivados e suas reservas liberadas"""
+        sale = Sale.objects.create(user=self.user, cash_register_session=self.register)
+        item = SaleItem.objects.create(
+            sale=sale, variation=self.variation, quantity=2, unit_price=None
+        )
+        reserve_stock(item, 2)
+        Sale.objects.filter(pk=sale.pk).update(
+            updated_at=timezone.now() - timedelta(days=3)
+        )
+
+        self.assertEqual(sweep_stale_drafts(older_than=timedelta(days=2), batch_size=1), 1)
+
+        self.assertFalse(Sale.objects.filter(pk=sale.pk).exists())
+        archived = Sale.all_objects.get(pk=sale.pk)
+        self.assertEqual(archived.status, Sale.Status.DRAFT)
+        self.assertEqual(archived.items.count(), 1)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_arquiva_rascunho_de_caixa_fechado(self):
+        """Teste que rascunhos de caixas fechados são arquivados mesmo se recentes"""
+        sale = Sale.objects.create(user=self.user, cash_register_session=self.register)
+        self.register.close_session(Decimal("0.00"))
+
+        self.assertEqual(sweep_stale_drafts(older_than=timedelta(days=2)), 1)
+        self.assertFalse(Sale.objects.filter(pk=sale.pk).exists())
+
+    def test_mantem_rascunho_ativo(self):
+        """Teste que o carrinho em uso não é tocado"""
+        sale = Sale.objects.create(user=self.user, cash_register_session=self.register)
+
+        self.assertEqual(sweep_stale_drafts(older_than=timedelta(days=2)), 0)
+        self.assertTrue(Sale.objects.filter(pk=sale.pk).exists())
+
+
+class LaneContextTests(SalesTestMixin, TestCase):
+    """Testes do contexto do caixa guardado na sessão"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="caixa@exemplo.com", password="senha123")
+
+    def test_pdv_guarda_caixa_e_rascunho_na_sessao(self):
+        """Teste que o PDV grava os ids do caixa e do rascunho na sessão"""
+        self.client.get(reverse("sales:pdv"))
+
+        sale = Sale.objects.get(status=Sale.Status.DRAFT, user=self.user)
+        self.assertEqual(self.client.session[REGISTER_SESSION_KEY], self.register.pk)
+        self.assertEqual(self.client.session[DRAFT_SESSION_KEY], sale.pk)
+
+    def test_acao_do_carrinho_usa_rascunho_da_sessao(self):
+        """Teste que adicionar item resolve o rascunho pela sessão"""
+        self.client.get(reverse("sales:pdv"))
+
+        self.client.post(
+            reverse("sales:add-item"),
+            {"sku_or_barcode": self.variation.sku, "quantity": 1},
+        )
+
+        sale = Sale.objects.get(pk=self.client.session[DRAFT_SESSION_KEY])
+        self.assertEqual(sale.items.get().quantity, 1)
+
+    def test_fechar_caixa_invalida_contexto(self):
+        """Teste que fechar o caixa limpa o contexto da sessão"""
+        self.client.get(reverse("sales:pdv"))
+
+        self.client.post(reverse("sales:close-register"), {"closing_balance": "0.00"})
 
-# Create your tests here.
+        self.assertNotIn(REGISTER_SESSION_KEY, self.client.session)
+        self.assertNotIn(DRAFT_SESSION_KEY, self.client.session)
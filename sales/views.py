@@ -5,10 +5,23 @@ from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView
+from django.db import transaction
 from django.db.models import Q
 from django.http import JsonResponse
 
+from base.pagination import CursorPaginationMixin
+from product.autocomplete import search_variations
+from product.best_sellers import top_selling_variations
 from product.models import ProductVariation
+from product.recommendations import recommend_for_products
+from stock.services import reserve_stock, refresh_sale_reservations
+from .services import (
+    clear_lane_context,
+    get_current_draft,
+    get_open_register,
+    get_or_create_current_draft,
+    remember_register,
+)
 from .models import Sale, SaleItem, CashRegister, SalePayment
 from .forms import (
     AddItemForm,
@@ -25,9 +38,7 @@ def open_register_view(request):
     Tela para informar o fundo de troco e abrir o caixa.
     Bloqueia abertura se já existir um caixa aberto para este usuário.
     """
-    if CashRegister.objects.filter(
-        user=request.user, status=CashRegister.Status.OPEN
-    ).exists():
+    if get_open_register(request):
         messages.info(request, "Você já possui um caixa aberto.")
         return redirect("sales:pdv")
 
@@ -39,6 +50,7 @@ def open_register_view(request):
             session.user = request.user
             session.status = CashRegister.Status.OPEN
             session.save()
+            remember_register(request, session)
 
             return redirect("sales:pdv")
 
@@ -49,9 +61,7 @@ def open_register_view(request):
 def close_register_view(request):
     """Tela para conferir valores e fechar o caixa."""
     # Tenta buscar a sessão de forma segura
-    session = CashRegister.objects.filter(
-        user=request.user, status=CashRegister.Status.OPEN
-    ).first()
+    session = get_open_register(request)
 
     # Se não tiver caixa aberto, redireciona com aviso ao invés de dar erro 404
     if not session:
@@ -65,6 +75,7 @@ def close_register_view(request):
             final_value = form.cleaned_data["closing_balance"]
             try:
                 session.close_session(final_value)
+                clear_lane_context(request)
                 messages.success(
                     request, f"Caixa fechado. Valor final: R$ {final_value}"
                 )
@@ -83,33 +94,26 @@ def pdv_view(request):
     Tela Principal do PDV.
     Busca ou Cria um Rascunho vinculado ao usuário logado.
     """
-    cash_register_session = CashRegister.objects.filter(
-        user=request.user, status=CashRegister.Status.OPEN
-    ).first()
+    cash_register_session = get_open_register(request)
 
     if not cash_register_session:
         return redirect("sales:open-register")
 
-    # Busca a última venda em aberto (RASCUNHO)
-    # Em produção, filtraria por request.user ou caixa_id
-    sale, created = Sale.objects.get_or_create(
-        status=Sale.Status.DRAFT,
-        user=request.user,
-        cash_register_session=cash_register_session,  # <--- ADICIONE ESTA LINHA NO FILTRO
-        defaults={
-            "status": Sale.Status.DRAFT,
-            "user": request.user,
-            "cash_register_session": cash_register_session,
-        },
-    )
-
-    if not sale.cash_register_session:
-        sale.cash_register_session = cash_register_session
-        sale.save(update_fields=["cash_register_session"])
+    # Busca (ou cria) o rascunho do operador vinculado ao caixa aberto
+    sale = get_or_create_current_draft(request, cash_register_session)
 
     sale.calculate_totals()
+    # Carrinho em uso: mantém as reservas dos itens válidas (e sinaliza os
+    # itens cuja reserva venceu e não pôde ser refeita)
+    unreserved_ids = {item.pk for item in refresh_sale_reservations(sale.pk)}
+    if unreserved_ids:
+        messages.error(
+            request,
+            "Alguns itens não têm mais estoque disponível (reservado em outro caixa). "
+            "Ajuste a quantidade ou remova-os antes de finalizar.",
+        )
 
-    items = sale.items.select_related("variation__product").all().order_by("-id")
+    items = list(sale.items.select_related("variation__product").all().order_by("-id"))
 
     # busca pagamentos relacionados
     payments = sale.payments.all().order_by("created_at")
@@ -120,10 +124,13 @@ def pdv_view(request):
     context = {
         "sale": sale,
         "items": items,
+        "unreserved_ids": unreserved_ids,
         "payments": payments,
         "form": AddItemForm(),
         "payment_form": payment_form,
         "available_products": available_products, 
+        "top_sellers": top_selling_variations(),
+        "suggestions": recommend_for_products({item.variation.product_id for item in items}),
         "customer_form": IdentifyCustomerForm(),
     }
     return render(request, "sales/pdv.html", context)
@@ -133,7 +140,7 @@ def pdv_view(request):
 @login_required
 def add_item_view(request):
     """Processa a adição de item via código de barras/SKU"""
-    sale = Sale.objects.filter(status=Sale.Status.DRAFT, user=request.user).first()
+    sale = get_current_draft(request)
     if not sale:
         return redirect("sales:pdv")
 
@@ -143,16 +150,23 @@ def add_item_view(request):
         variation = form.cleaned_data["sku_or_barcode"]
         quantity = form.cleaned_data["quantity"]
 
-        item, created = SaleItem.objects.get_or_create(
-            sale=sale,
-            variation=variation,
-            defaults={"quantity": 0, "unit_price": variation.product.selling_price},
-        )
+        try:
+            with transaction.atomic():
+                item, created = SaleItem.objects.get_or_create(
+                    sale=sale,
+                    variation=variation,
+                    defaults={"quantity": 0, "unit_price": variation.product.selling_price},
+                )
 
-        item.quantity += quantity
-        item.save()
+                item.quantity += quantity
+                # Reserva as unidades antes de gravar o item: o carrinho nunca
+                # contém mais do que o disponível para venda
+                reserve_stock(item, item.quantity)
+                item.save()
 
-        messages.success(request, f"Adicionado: {variation}")
+            messages.success(request, f"Adicionado: {variation}")
+        except ValueError as e:
+            messages.error(request, str(e))
     else:
         # Retorna erro do formulário (ex: Produto não encontrado)
         for error in form.errors.values():
@@ -178,7 +192,7 @@ def remove_item_view(request, item_id):
 @require_POST
 @login_required
 def add_payment_view(request):
-    sale = Sale.objects.filter(status=Sale.Status.DRAFT, user=request.user).first()
+    sale = get_current_draft(request)
     if not sale:
         return redirect("sales:pdv")
 
@@ -230,7 +244,7 @@ def complete_sale_view(request, sale_id):
         Sale, pk=sale_id, status=Sale.Status.DRAFT, user=request.user
     )
 
-    cash_register_session = CashRegister.objects.filter(user=request.user, status=CashRegister.Status.OPEN).first()
+    cash_register_session = get_open_register(request)
     if not cash_register_session:
         messages.error(request, "Seu caixa está fechado. Não é possível finalizar.")
         return redirect('sales:open-register')
@@ -241,7 +255,8 @@ def complete_sale_view(request, sale_id):
 
     try:
         sale.complete_sale()
-        
+        clear_lane_context(request, draft_only=True)
+
         msg = f"Venda #{sale.pk} finalizada com sucesso!"
         if sale.change_amount > 0:
             msg += f" TROCO: R$ {sale.change_amount:,.2f}"
@@ -261,7 +276,7 @@ def complete_sale_view(request, sale_id):
 @login_required
 def identify_customer_view(request):
     """Vincula um cliente à venda atual (Rascunho)."""
-    sale = Sale.objects.filter(status=Sale.Status.DRAFT, user=request.user).first()
+    sale = get_current_draft(request)
     if not sale:
         return redirect("sales:pdv")
 
@@ -277,13 +292,13 @@ def identify_customer_view(request):
 
     return redirect("sales:pdv")
 
-class SaleListView(LoginRequiredMixin, ListView):
+class SaleListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """Lista o histórico de vendas concluídas."""
     model = Sale
     template_name = 'sales/sale_list.html'
     context_object_name = 'sales'
     paginate_by = 20
-    ordering = ['-created_at']
+    cursor_ordering = ['-created_at', '-pk']
 
     def get_queryset(self):
         # Filtra apenas vendas concluídas (exclui rascunhos e canceladas se desejar)
@@ -318,35 +333,8 @@ def search_products_api(request):
     results = []
 
     if len(query) > 2:
-        # Adicionamos 'color' e 'size' no select_related para otimizar
-        variations = ProductVariation.active.select_related('product', 'color', 'size').filter(
-            Q(product__name__icontains=query) |
-            Q(sku__icontains=query)
-        )[:10]
-
-        for v in variations:
-            full_name = v.product.name
-            
-            # Monta os detalhes da variação (Cor e Tamanho)
-            details = []
-            
-            # Verifica se a cor é relevante (diferente de N/A)
-            if v.color and v.color.name.upper() != "N/A":
-                details.append(v.color.name)
-                
-            # Verifica se o tamanho é relevante
-            if v.size and v.size.name.upper() != "N/A":
-                details.append(v.size.name)
-            
-            # Se tiver detalhes, adiciona ao nome (Ex: "Sutiã - Vermelho M")
-            if details:
-                full_name += f" - {' '.join(details)}"
-            
-            results.append({
-                'label': full_name,
-                'value': v.sku,
-                'price': float(v.product.selling_price)
-            })
+        # Índice em memória: rótulos prontos, sem consulta ao banco
+        results = search_variations(query, limit=10)
 
     return JsonResponse(results, safe=False)
 
@@ -355,7 +343,7 @@ def search_products_api(request):
 @login_required
 def apply_discount_view(request):
     """Aplica desconto no total da venda"""
-    sale = Sale.objects.filter(status=Sale.Status.DRAFT, user=request.user).first()
+    sale = get_current_draft(request)
     if not sale:
         messages.error(request, "Nenhuma venda em andamento.")
         return redirect("sales:pdv")
@@ -0,0 +1,82 @@
+# stock/management/commands/backfill_movement_sales.py
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from sales.models import Sale, SaleItem
+from stock.models import StockMovement
+
+# Formatos de observação gravados por Sale.complete_sale e Sale.cancel_sale
+SALE_NOTES_PATTERN = re.compile(r"^(?:Venda PDV|Estorno da Venda) #(\d+)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche os vínculos de venda (sale/sale_item) dos movimentos de estoque "
+        "antigos a partir do texto das observações, em lotes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de movimentos processados por lote (padrão: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pending = StockMovement.objects.filter(sale__isnull=True).filter(
+            Q(notes__startswith="Venda PDV #") | Q(notes__startswith="Estorno da Venda #")
+        )
+
+        last_pk = 0
+        linked = 0
+        while True:
+            batch = list(
+                pending.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", "notes", "product_variation_id")[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            linked += self._link_batch(batch)
+            self.stdout.write(f"  ... até o movimento #{last_pk}: {linked} vinculados")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {linked} movimentos vinculados às vendas."))
+
+    @transaction.atomic
+    def _link_batch(self, movements):
+        sale_ids = {}
+        for movement in movements:
+            match = SALE_NOTES_PATTERN.match(movement.notes or "")
+            if match:
+                sale_ids[movement.pk] = int(match.group(1))
+
+        # Vendas canceladas são soft-deleted, por isso consultamos all_objects
+        existing_sales = set(
+            Sale.all_objects.filter(pk__in=set(sale_ids.values())).values_list(
+                "pk", flat=True
+            )
+        )
+        items = {
+            (item["sale_id"], item["variation_id"]): item["pk"]
+            for item in SaleItem.objects.filter(sale_id__in=existing_sales).values(
+                "pk", "sale_id", "variation_id"
+            )
+        }
+
+        to_update = []
+        for movement in movements:
+            sale_id = sale_ids.get(movement.pk)
+            if sale_id not in existing_sales:
+                continue
+            movement.sale_id = sale_id
+            movement.sale_item_id = items.get((sale_id, movement.product_variation_id))
+            to_update.append(movement)
+
+        StockMovement.objects.bulk_update(to_update, ["sale", "sale_item"])
+        return len(to_update)
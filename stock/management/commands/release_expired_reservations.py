@@ -0,0 +1,23 @@
+# stock/management/commands/release_expired_reservations.py
+from django.core.management.base import BaseCommand
+
+from stock.services import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Libera em lotes as reservas de estoque expiradas ou de carrinhos "
+        "que não estão mais em Rascunho."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de reservas removidas por lote (padrão: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"✅ {released} reservas liberadas."))
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-19 04:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_initial'),
+        ('stock', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='sale',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='sales.sale', verbose_name='Venda'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='sale_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='sales.saleitem', verbose_name='Item da Venda'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2 on 2026-10-19 04:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_initial'),
+        ('product', '0001_initial'),
+        ('stock', '0003_stockmovement_sale_link'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Quantidade')),
+                ('expires_at', models.DateTimeField(verbose_name='Expira em')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criada em')),
+                ('product_variation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='product.productvariation', verbose_name='Variação de Produto')),
+                ('sale_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reservation', to='sales.saleitem', verbose_name='Item da Venda')),
+            ],
+            options={
+                'verbose_name': 'Reserva de Estoque',
+                'verbose_name_plural': 'Reservas de Estoque',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(fields=['product_variation', 'expires_at'], include=('quantity',), name='stock_reservation_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(fields=['expires_at'], name='stock_reservation_expiry_idx'),
+        ),
+    ]
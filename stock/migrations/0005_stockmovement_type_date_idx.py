@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-19 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stock', '0004_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product_variation', 'movement_type', 'movement_date'], name='stock_movement_type_date_idx'),
+        ),
+    ]
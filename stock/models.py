@@ -48,11 +48,36 @@ class StockMovement(models.Model):
         related_name="stock_movements",
         verbose_name="Fornecedor",
     )
+    # Vínculo direto com a venda de origem (baixa ou estorno), evitando buscas
+    # textuais em 'notes' para auditoria e reversão.
+    sale = models.ForeignKey(
+        "sales.Sale",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="stock_movements",
+        verbose_name="Venda",
+    )
+    sale_item = models.ForeignKey(
+        "sales.SaleItem",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="stock_movements",
+        verbose_name="Item da Venda",
+    )
 
     class Meta:
         verbose_name = "Movimento de Estoque"
         verbose_name_plural = "Movimentos de Estoque"
         ordering = ["-movement_date"]
+        indexes = [
+            # Anti-join do relatório de estoque parado e última venda por variação
+            models.Index(
+                fields=["product_variation", "movement_type", "movement_date"],
+                name="stock_movement_type_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.get_movement_type_display()} - {self.product_variation.sku} - {self.quantity}"
@@ -79,3 +104,43 @@ class StockMovement(models.Model):
 
         if errors:
             raise ValidationError(errors)
+
+
+class StockReservation(models.Model):
+    """
+    Reserva de unidades para um item de venda em Rascunho (carrinho aberto).
+    O disponível para venda é o estoque físico menos as reservas ainda válidas.
+    """
+
+    product_variation = models.ForeignKey(
+        ProductVariation,
+        on_delete=models.CASCADE,
+        related_name="reservations",
+        verbose_name="Variação de Produto",
+    )
+    sale_item = models.OneToOneField(
+        "sales.SaleItem",
+        on_delete=models.CASCADE,
+        related_name="reservation",
+        verbose_name="Item da Venda",
+    )
+    quantity = models.PositiveIntegerField(verbose_name="Quantidade")
+    expires_at = models.DateTimeField(verbose_name="Expira em")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criada em")
+
+    class Meta:
+        verbose_name = "Reserva de Estoque"
+        verbose_name_plural = "Reservas de Estoque"
+        indexes = [
+            # Soma das reservas ativas por variação sem tocar na tabela (index-only)
+            models.Index(
+                fields=["product_variation", "expires_at"],
+                include=["quantity"],
+                name="stock_reservation_active_idx",
+            ),
+            # Varredura das reservas expiradas
+            models.Index(fields=["expires_at"], name="stock_reservation_expiry_idx"),
+        ]
+
+    def __str__(self):
+        return f"Reserva de {self.quantity} - {self.product_variation_id} até {self.expires_at:%d/%m %H:%M}"
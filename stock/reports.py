@@ -0,0 +1,125 @@
+# stock/reports.py
+"""
+Relatório de estoque parado (dead stock).
+
+Lista as variações com estoque que não tiveram nenhuma venda nos últimos
+N dias (90 ou 180). A busca é um anti-join (NOT EXISTS) entre as variações
+com estoque e os movimentos de VENDA recentes: para cada variação o banco
+só verifica se existe uma entrada no índice (variação, tipo, data) depois
+do corte, sem agregar o histórico de movimentos. A data da última venda sai
+do mesmo índice (varredura reversa com LIMIT 1).
+
+O valor parado é o estoque vezes o custo médio do produto.
+"""
+from datetime import timedelta
+
+from django.db.models import DecimalField, Exists, ExpressionWrapper, F, OuterRef, Subquery
+from django.utils import timezone
+
+from base.streaming import stream_csv
+from product.models import ProductVariation
+from .models import StockMovement
+
+# Cortes oferecidos no relatório (dias sem venda)
+AGING_DAYS = (90, 180)
+
+DEAD_STOCK_COLUMNS = [
+    "SKU",
+    "Produto",
+    "Categoria",
+    "Cor",
+    "Tamanho",
+    "Estoque",
+    "Custo Médio",
+    "Valor em Estoque",
+    "Última Venda",
+    "Dias sem Venda",
+]
+
+
+def _sales_since(since):
+    return StockMovement.objects.filter(
+        product_variation=OuterRef("pk"),
+        movement_type=StockMovement.MovementType.VENDA,
+        movement_date__gte=since,
+    )
+
+
+def dead_stock_variations(days=AGING_DAYS[0], now=None):
+    """
+    Variações com estoque e sem venda nos últimos `days` dias, da maior para a
+    menor em valor parado. Variações cadastradas depois do corte ficam de
+    fora: ainda não tiveram tempo de vender.
+    """
+    since = (now or timezone.now()) - timedelta(days=days)
+    last_sale = (
+        StockMovement.objects.filter(
+            product_variation=OuterRef("pk"),
+            movement_type=StockMovement.MovementType.VENDA,
+        )
+        .order_by("-movement_date")
+        .values("movement_date")[:1]
+    )
+    return (
+        ProductVariation.objects.filter(stock__gt=0, created_at__lt=since)
+        .filter(~Exists(_sales_since(since)))
+        .annotate(
+            last_sale=Subquery(last_sale),
+            stock_value=ExpressionWrapper(
+                F("stock") * F("product__average_cost"),
+                output_field=DecimalField(max_digits=20, decimal_places=2),
+            ),
+        )
+        .order_by("-stock_value", "sku")
+    )
+
+
+def iter_dead_stock_rows(days=AGING_DAYS[0], now=None, chunk_size=2000):
+    """Gera as linhas do relatório (na ordem de DEAD_STOCK_COLUMNS) via cursor."""
+    now = now or timezone.now()
+    rows = (
+        dead_stock_variations(days, now)
+        .values_list(
+            "sku",
+            "product__name",
+            "product__category__name",
+            "color__name",
+            "size__name",
+            "stock",
+            "product__average_cost",
+            "stock_value",
+            "last_sale",
+            "created_at",
+        )
+    )
+    for (
+        sku,
+        product,
+        category,
+        color,
+        size,
+        stock,
+        average_cost,
+        stock_value,
+        last_sale,
+        created_at,
+    ) in rows.iterator(chunk_size=chunk_size):
+        # Nunca vendida: conta desde o cadastro
+        idle_since = last_sale or created_at
+        yield [
+            sku,
+            product,
+            category,
+            color,
+            size,
+            stock,
+            f"{average_cost:.2f}",
+            f"{stock_value:.2f}",
+            f"{timezone.localtime(last_sale):%d/%m/%Y}" if last_sale else "",
+            (now - idle_since).days,
+        ]
+
+
+def iter_dead_stock_csv(rows, delimiter=";"):
+    """Gera o CSV (com BOM, para abrir direto no Excel) linha a linha."""
+    return stream_csv(DEAD_STOCK_COLUMNS, rows, delimiter)
@@ -1,8 +1,32 @@
 from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
 from user.models import UserGesthar
-from product.models import ProductVariation
-from .models import StockMovement
+from product.facets import invalidate_facets
+from product.models import Product, ProductVariation
+from .models import StockMovement, StockReservation
+
+# Tempo de vida de uma reserva de carrinho sem atividade no PDV
+RESERVATION_TTL = timedelta(minutes=30)
+
+def _update_product_total_stock(product_variation: ProductVariation, delta: int):
+    """Atualiza de forma incremental o estoque total desnormalizado do produto."""
+    if product_variation.is_active:
+        Product.objects.filter(pk=product_variation.product_id).update(
+            total_stock=F("total_stock") + delta
+        )
+
+
+def _invalidate_facets_on_zero_crossing(product_variation: ProductVariation, previous_stock: int):
+    """
+    O índice de facetas só guarda se a variação tem ou não estoque: ele é
+    descartado apenas quando o estoque cruza o zero, e não a cada venda.
+    """
+    if product_variation.is_active and (previous_stock > 0) != (product_variation.stock > 0):
+        invalidate_facets()
+
 
 @transaction.atomic
 def add_stock(
@@ -13,6 +37,8 @@ def add_stock(
     supplier_id: int = None,
     movement_type: str = StockMovement.MovementType.ENTRADA,
     notes: str = None,
+    sale_id: int = None,
+    sale_item_id: int = None,
 ):
     """
     Adiciona uma quantidade de estoque a uma variação de produto e registra o movimento de forma atômica.
@@ -33,8 +59,11 @@ def add_stock(
         raise ValueError("Variação de produto não encontrada.")
 
     # Atualiza o estoque da variação do produto
+    previous_stock = product_variation.stock
     product_variation.stock += quantity
-    product_variation.save()
+    product_variation.save(update_fields=["stock", "updated_at"])
+    _update_product_total_stock(product_variation, quantity)
+    _invalidate_facets_on_zero_crossing(product_variation, previous_stock)
 
     # Registra o movimento de estoque
     StockMovement.objects.create(
@@ -45,6 +74,8 @@ def add_stock(
         supplier_id=supplier_id,
         movement_type=movement_type,
         notes=notes,
+        sale_id=sale_id,
+        sale_item_id=sale_item_id,
     )
 
     return product_variation
@@ -57,6 +88,8 @@ def remove_stock(
     user: UserGesthar,
     movement_type: str = StockMovement.MovementType.SAIDA,
     notes: str = None,
+    sale_id: int = None,
+    sale_item_id: int = None,
 ):
     """
     Remove uma quantidade de estoque de uma variação de produto e registra o movimento de forma atômica. Garante que o estoque não fique negativo.
@@ -85,8 +118,11 @@ def remove_stock(
             f"Estoque insuficiente para a remoção solicitada. Estoque atual: {product_variation.stock}, Quantidade solicitada: {quantity}"
         )
 
+    previous_stock = product_variation.stock
     product_variation.stock -= quantity
-    product_variation.save()
+    product_variation.save(update_fields=["stock", "updated_at"])
+    _update_product_total_stock(product_variation, -quantity)
+    _invalidate_facets_on_zero_crossing(product_variation, previous_stock)
 
     StockMovement.objects.create(
         product_variation=product_variation,
@@ -94,6 +130,118 @@ def remove_stock(
         user=user,
         movement_type=movement_type,
         notes=notes,
+        sale_id=sale_id,
+        sale_item_id=sale_item_id,
+    )
+
+    return product_variation
+
+
+def get_reserved_quantity(product_variation_id: int, exclude_sale_item_id: int = None) -> int:
+    """
+    Soma as reservas ainda válidas de uma variação (coberta pelo índice
+    stock_reservation_active_idx).
+    """
+    reservations = StockReservation.objects.filter(
+        product_variation_id=product_variation_id, expires_at__gt=timezone.now()
+    )
+    if exclude_sale_item_id:
+        reservations = reservations.exclude(sale_item_id=exclude_sale_item_id)
+    return reservations.aggregate(total=Sum("quantity"))["total"] or 0
+
+
+def get_available_stock(product_variation: ProductVariation, exclude_sale_item_id: int = None) -> int:
+    """Disponível para venda: estoque físico menos as reservas ativas."""
+    return product_variation.stock - get_reserved_quantity(
+        product_variation.pk, exclude_sale_item_id
+    )
+
+
+@transaction.atomic
+def reserve_stock(sale_item, quantity: int):
+    """
+    Reserva (ou ajusta a reserva de) um item de venda em Rascunho.
+    Trava a variação para que dois caixas não reservem a mesma última unidade.
+    """
+    if quantity <= 0:
+        raise ValueError("A quantidade a ser reservada deve ser maior que zero.")
+
+    try:
+        product_variation = ProductVariation.objects.select_for_update().get(
+            id=sale_item.variation_id
+        )
+    except ProductVariation.DoesNotExist:
+        raise ValueError("Variação de produto não encontrada.")
+
+    available = get_available_stock(product_variation, exclude_sale_item_id=sale_item.pk)
+    if quantity > available:
+        raise ValueError(
+            f"Estoque disponível insuficiente. Disponível: {max(available, 0)}, Quantidade solicitada: {quantity}"
+        )
+
+    reservation, _ = StockReservation.objects.update_or_create(
+        sale_item=sale_item,
+        defaults={
+            "product_variation": product_variation,
+            "quantity": quantity,
+            "expires_at": timezone.now() + RESERVATION_TTL,
+        },
+    )
+    return reservation
+
+
+def refresh_sale_reservations(sale_id: int) -> list:
+    """
+    Mantém as reservas de um carrinho ainda em uso: renova o prazo das que
+    ainda valem e refaz via reserve_stock (com trava e nova checagem do
+    disponível) as que expiraram ou não existem, já que nesse meio tempo
+    outro caixa pode ter reservado as mesmas unidades.
+    Retorna os itens que não puderam ser reservados.
+    """
+    from sales.models import SaleItem
+
+    now = timezone.now()
+    StockReservation.objects.filter(sale_item__sale_id=sale_id, expires_at__gt=now).update(
+        expires_at=now + RESERVATION_TTL
+    )
+
+    unreserved = []
+    expired = (
+        SaleItem.objects.filter(sale_id=sale_id)
+        .exclude(reservation__expires_at__gt=now)
+        .select_related("variation__product")
+        .order_by("pk")
+    )
+    for item in expired:
+        try:
+            reserve_stock(item, item.quantity)
+        except ValueError:
+            unreserved.append(item)
+    return unreserved
+
+
+def release_sale_reservations(sale_id: int) -> int:
+    """Libera todas as reservas de uma venda (conclusão ou descarte do carrinho)."""
+    deleted, _ = StockReservation.objects.filter(sale_item__sale_id=sale_id).delete()
+    return deleted
+
+
+def release_expired_reservations(batch_size: int = 1000) -> int:
+    """
+    Libera em lotes as reservas expiradas e as de vendas que não estão mais
+    em Rascunho (concluídas, canceladas ou descartadas).
+    """
+    stale = StockReservation.objects.filter(
+        Q(expires_at__lte=timezone.now())
+        | ~Q(sale_item__sale__status="DRAFT")
+        | Q(sale_item__sale__is_active=False)
     )
 
-    return product_variation
\ No newline at end of file
+    released = 0
+    while True:
+        ids = list(stale.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        StockReservation.objects.filter(pk__in=ids).delete()
+        released += len(ids)
+    return released
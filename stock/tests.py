@@ -1,3 +1,244 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from product.models import Category, Product, ProductSupplier, ProductVariation, Supplier
+from sales.models import CashRegister, Sale, SaleItem, SalePayment
+from stock.models import StockMovement, StockReservation
+from stock.reports import dead_stock_variations, iter_dead_stock_rows
+from stock.services import (
+    add_stock,
+    get_available_stock,
+    refresh_sale_reservations,
+    release_expired_reservations,
+    reserve_stock,
+)
+from user.models import UserGesthar
+
+
+class StockTestMixin:
+    """Dados básicos compartilhados pelos testes do módulo stock."""
+
+    def setUp(self):
+        self.user = UserGesthar.objects.create_user(
+            email="estoque@exemplo.com", password="senha123"
+        )
+        self.category = Category.objects.create(name="Vestidos")
+        self.product = Product.objects.create(
+            name="Vestido Gestante",
+            selling_price=Decimal("100.00"),
+            category=self.category,
+        )
+        self.variation = ProductVariation.objects.create(product=self.product)
+        add_stock(
+            product_variation_id=self.variation.pk,
+            quantity=10,
+            user=self.user,
+            unit_price=Decimal("40.00"),
+        )
+        self.register = CashRegister.objects.create(
+            user=self.user, opening_balance=Decimal("0.00")
+        )
+
+    def create_completed_sale(self, quantity=2):
+        sale = Sale.objects.create(user=self.user, cash_register_session=self.register)
+        item = SaleItem.objects.create(
+            sale=sale, variation=self.variation, quantity=quantity, unit_price=None
+        )
+        SalePayment.objects.create(sale=sale, amount=sale.net_amount)
+        sale.complete_sale()
+        return sale, item
+
+
+class StockMovementSaleLinkTests(StockTestMixin, TestCase):
+    """Testes do vínculo entre movimentos de estoque e vendas"""
+
+    def test_venda_concluida_vincula_movimento(self):
+        """Teste que a baixa da venda grava sale e sale_item no movimento"""
+        sale, item = self.create_completed_sale()
+
+        movement = StockMovement.objects.get(
+            movement_type=StockMovement.MovementType.VENDA
+        )
+        self.assertEqual(movement.sale_id, sale.pk)
+        self.assertEqual(movement.sale_item_id, item.pk)
+
+    def test_cancelamento_vincula_estorno(self):
+        """Teste que o estorno aponta para a mesma venda"""
+        sale, item = self.create_completed_sale()
+        sale.cancel_sale()
+
+        movements = StockMovement.objects.filter(sale_id=sale.pk)
+        self.assertEqual(
+            set(movements.values_list("movement_type", flat=True)),
+            {StockMovement.MovementType.VENDA, StockMovement.MovementType.DEVOLUCAO},
+        )
+
+    def test_backfill_vincula_movimentos_antigos(self):
+        """Teste que o comando de backfill interpreta as observações antigas"""
+        sale, item = self.create_completed_sale()
+        StockMovement.objects.update(sale=None, sale_item=None)
+
+        call_command("backfill_movement_sales", batch_size=1, stdout=StringIO())
+
+        movement = StockMovement.objects.get(
+            movement_type=StockMovement.MovementType.VENDA
+        )
+        self.assertEqual(movement.sale_id, sale.pk)
+        self.assertEqual(movement.sale_item_id, item.pk)
+        # Entradas comuns não possuem venda
+        self.assertIsNone(
+            StockMovement.objects.get(
+                movement_type=StockMovement.MovementType.ENTRADA
+            ).sale_id
+        )
+
+
+class StockReservationTests(StockTestMixin, TestCase):
+    """Testes das reservas de estoque dos carrinhos em Rascunho"""
+
+    def create_draft_item(self, quantity):
+        sale = Sale.objects.create(user=self.user, cash_register_session=self.register)
+        item = SaleItem.objects.create(
+            sale=sale, variation=self.variation, quantity=quantity, unit_price=None
+        )
+        return item
+
+    def test_reserva_reduz_disponivel(self):
+        """Teste que o disponível para venda desconta as reservas ativas"""
+        item = self.create_draft_item(3)
+        reserve_stock(item, 3)
+
+        self.variation.refresh_from_db()
+        self.assertEqual(get_available_stock(self.variation), 7)
+        self.assertEqual(
+            get_available_stock(self.variation, exclude_sale_item_id=item.pk), 10
+        )
+
+    def test_segundo_carrinho_nao_reserva_ultima_unidade(self):
+        """Teste que dois caixas não reservam as mesmas unidades"""
+        reserve_stock(self.create_draft_item(10), 10)
+
+        with self.assertRaises(ValueError):
+            reserve_stock(self.create_draft_item(1), 1)
+
+    def test_reserva_expirada_nao_conta_e_e_liberada(self):
+        """Teste que reservas vencidas liberam o estoque e são varridas em lote"""
+        reserve_stock(self.create_draft_item(10), 10)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        self.variation.refresh_from_db()
+        self.assertEqual(get_available_stock(self.variation), 10)
+        self.assertEqual(release_expired_reservations(batch_size=1), 1)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_renovacao_nao_ressuscita_reserva_vencida(self):
+        """Teste que a reserva vencida só volta se o estoque ainda estiver disponível"""
+        first = self.create_draft_item(8)
+        reserve_stock(first, 8)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        # Outro caixa reserva as unidades liberadas pelo vencimento
+        second = self.create_draft_item(5)
+        reserve_stock(second, 5)
+
+        self.assertEqual(refresh_sale_reservations(first.sale_id), [first])
+        self.assertLessEqual(
+            StockReservation.objects.get(sale_item=first).expires_at, timezone.now()
+        )
+        SalePayment.objects.create(sale=first.sale, amount=first.sale.net_amount)
+        with self.assertRaises(ValidationError):
+            first.sale.complete_sale()
+
+        # Com o segundo carrinho menor, a reserva é refeita e renovada
+        reserve_stock(second, 2)
+        self.assertEqual(refresh_sale_reservations(first.sale_id), [])
+        self.assertGreater(
+            StockReservation.objects.get(sale_item=first).expires_at, timezone.now()
+        )
+
+    def test_conclusao_da_venda_libera_reservas(self):
+        """Teste que concluir a venda remove as reservas do carrinho"""
+        item = self.create_draft_item(2)
+        reserve_stock(item, 2)
+        SalePayment.objects.create(sale=item.sale, amount=item.sale.net_amount)
+
+        item.sale.complete_sale()
+
+        self.assertFalse(StockReservation.objects.exists())
+        self.variation.refresh_from_db()
+        self.assertEqual(self.variation.stock, 8)
+
+
+class DeadStockReportTests(StockTestMixin, TestCase):
+    """Testes do relatório de estoque parado"""
+
+    def setUp(self):
+        super().setUp()
+        self.idle = ProductVariation.objects.create(
+            product=Product.objects.create(
+                name="Camisola Amamentação",
+                selling_price=Decimal("80.00"),
+                category=self.category,
+            )
+        )
+        add_stock(self.idle.pk, 5, self.user, Decimal("30.00"))
+        # Custo médio do produto: média dos custos dos fornecedores
+        supplier = Supplier.objects.create(name="Fornecedor Gestante")
+        ProductSupplier.objects.create(
+            product=self.product, supplier=supplier, cost_price=Decimal("40.00")
+        )
+        ProductSupplier.objects.create(
+            product=self.idle.product, supplier=supplier, cost_price=Decimal("30.00")
+        )
+        # Cadastro antigo: as duas variações já poderiam ter vendido
+        ProductVariation.objects.update(created_at=timezone.now() - timedelta(days=365))
+
+    def age_sales(self, days):
+        StockMovement.objects.filter(movement_type=StockMovement.MovementType.VENDA).update(
+            movement_date=timezone.now() - timedelta(days=days)
+        )
+
+    def test_anti_join_pelas_vendas_recentes(self):
+        """Teste que só entram as variações com estoque e sem venda no período"""
+        self.create_completed_sale()
+        self.assertEqual(list(dead_stock_variations(90)), [self.idle])
+
+        self.age_sales(120)
+        self.assertEqual(list(dead_stock_variations(90)), [self.variation, self.idle])
+        self.assertEqual(list(dead_stock_variations(180)), [self.idle])
+
+        # Sem estoque ou cadastrada depois do corte: não é estoque parado
+        ProductVariation.objects.filter(pk=self.idle.pk).update(stock=0)
+        ProductVariation.objects.filter(pk=self.variation.pk).update(created_at=timezone.now())
+        self.assertEqual(list(dead_stock_variations(90)), [])
+
+    def test_linhas_com_valor_a_custo_e_dias_sem_venda(self):
+        """Teste o valor parado (custo médio) e a data da última venda"""
+        self.create_completed_sale()
+        self.age_sales(100)
+
+        rows = {row[0]: row for row in iter_dead_stock_rows(90)}
+        sold = rows[self.variation.sku]
+        self.assertEqual(sold[5:8], [8, "40.00", "320.00"])
+        self.assertEqual(sold[9], 100)
+        self.assertTrue(sold[8])
+        never_sold = rows[self.idle.sku]
+        self.assertEqual(never_sold[5:10], [5, "30.00", "150.00", "", 365])
 
-# Create your tests here.
+    def test_view_exporta_csv_em_streaming(self):
+        """Teste a exportação em CSV com o corte escolhido"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("stock:dead-stock-report"), {"days": 180})
+        self.assertTrue(response.streaming)
+        self.assertIn("estoque-parado-180d", response["Content-Disposition"])
+        content = b"".join(response.streaming_content).decode()
+        lines = content.lstrip("\ufeff").splitlines()
+        self.assertTrue(lines[0].startswith("SKU;Produto;Categoria"))
+        self.assertEqual(len(lines), 3)
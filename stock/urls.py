@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'stock'
+
+urlpatterns = [
+    path('reports/dead-stock/', views.dead_stock_report_view, name='dead-stock-report'),
+]
@@ -1,3 +1,23 @@
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 
-# Create your views here.
+from .reports import AGING_DAYS, iter_dead_stock_csv, iter_dead_stock_rows
+
+
+@login_required
+def dead_stock_report_view(request):
+    """Exporta em CSV (streaming) as variações com estoque e sem venda há ?days= dias."""
+    try:
+        days = int(request.GET.get("days", AGING_DAYS[0]))
+    except ValueError:
+        days = AGING_DAYS[0]
+    if days not in AGING_DAYS:
+        days = AGING_DAYS[0]
+
+    filename = f"estoque-parado-{days}d-{timezone.localdate():%Y%m%d}"
+    response = StreamingHttpResponse(
+        iter_dead_stock_csv(iter_dead_stock_rows(days)), content_type="text/csv; charset=utf-8"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import DetailView, ListView
 from django.db.models import Q
+from base.pagination import CursorPaginationMixin
 import re  # Importação necessária para limpar a busca
 
 from .models import UserGesthar
@@ -16,11 +17,12 @@ class UserDetailView(LoginRequiredMixin, DetailView):
     context_object_name = "user_obj"
 
 
-class UserListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class UserListView(LoginRequiredMixin, UserPassesTestMixin, CursorPaginationMixin, ListView):
     model = UserGesthar
     template_name = "user/user_list.html"
     context_object_name = "users"
     paginate_by = 10
+    cursor_ordering = ["first_name", "last_name", "pk"]
 
     def test_func(self):
         return self.request.user.is_staff